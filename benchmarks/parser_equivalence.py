@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+
+from benchmarks.stand_in_server import PTT_POSTS_PER_PAGE, StandInServer
+from utils.ptt_parser import available_parsers, get_parser
+
+# 作為比對基準的解析器
+REFERENCE_PARSER = 'bs4'
+
+
+def synthetic_pages(pages=3, board='Gossiping'):
+    """替身伺服器產生的 PTT 列表頁與文章頁
+
+    Returns:
+        list: (名稱, 種類, 原始位元組) 元組的列表，種類為 'index' 或 'article'
+    """
+    server = StandInServer(ptt_pages=pages)
+    result = []
+    for page in range(1, pages + 1):
+        result.append((f'{board}/index{page}.html', 'index', server.ptt_index(board, page).encode('utf-8')))
+        for index in range(PTT_POSTS_PER_PAGE):
+            post_time = server.ptt_post_time(page, index)
+            result.append((f'{board}/M.{post_time}.html', 'article',
+                           server.ptt_article(board, post_time).encode('utf-8')))
+    return result
+
+
+def recorded_pages(directory):
+    """讀取錄製的 PTT 頁面，檔名以 index 開頭者視為列表頁，其餘 .html 視為文章頁
+
+    Returns:
+        list: (名稱, 種類, 原始位元組) 元組的列表
+    """
+    result = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            kind = 'index' if name.startswith('index') else 'article'
+            result.append((os.path.relpath(path, directory), kind, data))
+    return result
+
+
+def check_equivalence(pages, parsers=None):
+    """比較各解析器與 BeautifulSoup 的解析結果
+
+    Args:
+        pages (list): synthetic_pages 或 recorded_pages 回傳的頁面
+        parsers (list): 要比較的解析器名稱，預設為目前環境可用的全部解析器
+
+    Returns:
+        list: (解析器, 頁面名稱) 元組的列表，為結果不一致的頁面
+    """
+    reference = get_parser(REFERENCE_PARSER)
+    candidates = [get_parser(name) for name in (parsers or available_parsers())
+                  if name != REFERENCE_PARSER]
+    mismatches = []
+    for name, kind, data in pages:
+        parse = 'parse_index' if kind == 'index' else 'parse_article'
+        expected = getattr(reference, parse)(data)
+        for parser in candidates:
+            if getattr(parser, parse)(data) != expected:
+                mismatches.append((parser.name, name))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='檢查各 PTT 解析器與 BeautifulSoup 的結果是否一致')
+    parser.add_argument('directories', nargs='*', help='錄製頁面的目錄，未指定時使用替身伺服器的合成頁面')
+    args = parser.parse_args()
+
+    pages = []
+    for directory in args.directories:
+        pages.extend(recorded_pages(directory))
+    if not args.directories:
+        pages = synthetic_pages()
+
+    mismatches = check_equivalence(pages)
+    print(f"比對 {len(pages)} 個頁面，解析器: {', '.join(available_parsers())}")
+    for parser_name, page_name in mismatches:
+        print(f"不一致: {parser_name} {page_name}")
+    if mismatches:
+        sys.exit(1)
+    print("結果一致")
+
+
+if __name__ == "__main__":
+    main()
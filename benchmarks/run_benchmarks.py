@@ -0,0 +1,317 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import jieba
+
+from benchmarks.parser_equivalence import check_equivalence, recorded_pages
+from benchmarks.stand_in_server import PTT_POSTS_PER_PAGE, StandInServer
+from ptt_dcard_crawler import PTTDcardCrawler
+from utils.parallel_counter import count_terms_per_article
+from utils.ptt_parser import available_parsers, get_parser
+
+# 與基準比較時，變化超過此比例視為退步
+DEFAULT_THRESHOLD = 0.10
+
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    """隱藏爬蟲逐篇輸出的訊息"""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _crawler(args, server, db_path):
+    return PTTDcardCrawler(
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.host_concurrency,
+        requests_per_second=args.rps,
+        db_path=db_path,
+        tokenize_workers=args.workers,
+        ptt_base_url=server.url,
+        dcard_base_url=server.url,
+        html_parser=args.html_parser
+    )
+
+
+def bench_ptt_fetch(args, server, crawler):
+    """PTT 列表頁與文章頁的抓取與解析（含 over18 驗證）"""
+    server.reset_counters()
+    start = time.perf_counter()
+    with _quiet(not args.verbose):
+        articles = crawler.fetch_articles('ptt', args.ptt_board, args.pages)
+    seconds = time.perf_counter() - start
+    return articles, {
+        'seconds': round(seconds, 3),
+        'requests': server.request_count,
+        'injected_errors': server.error_count,
+        'articles': len(articles),
+        'requests_per_sec': _rate(server.request_count, seconds),
+        'articles_per_sec': _rate(len(articles), seconds)
+    }
+
+
+def bench_dcard_fetch(args, server, crawler):
+    """Dcard 列表與文章 API 的抓取（每篇都抓取內容）"""
+    server.reset_counters()
+    start = time.perf_counter()
+    with _quiet(not args.verbose):
+        articles = crawler.fetch_articles('dcard', args.dcard_board, args.pages, dcard_bodies='all')
+    seconds = time.perf_counter() - start
+    return articles, {
+        'seconds': round(seconds, 3),
+        'requests': server.request_count,
+        'injected_errors': server.error_count,
+        'articles': len(articles),
+        'requests_per_sec': _rate(server.request_count, seconds),
+        'articles_per_sec': _rate(len(articles), seconds)
+    }
+
+
+def _time_parse(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in pages:
+            parse(data)
+    return time.perf_counter() - start
+
+
+def bench_parse(args, server, crawler):
+    """不經網路解析 PTT 列表頁與文章頁（原始位元組），並比較各解析器的速度與結果"""
+    pages = [server.ptt_index(args.ptt_board, page).encode('utf-8')
+             for page in range(1, args.pages + 1)]
+    posts = [(server.ptt_post_time(page, index), page)
+             for page in range(1, args.pages + 1) for index in range(PTT_POSTS_PER_PAGE)]
+    articles = [server.ptt_article(args.ptt_board, post_time).encode('utf-8') for post_time, _ in posts]
+
+    index_seconds = _time_parse(crawler._parse_ptt_index_page, pages, args.repeat)
+    url = f'{server.url}/bbs/{args.ptt_board}/M.0.A.000.html'
+    article_seconds = _time_parse(
+        lambda data: crawler._parse_ptt_article(args.ptt_board, '標題', url, data), articles, args.repeat)
+
+    result = {
+        'parser': crawler.ptt_parser.name,
+        'index_pages': len(pages) * args.repeat,
+        'articles': len(articles) * args.repeat,
+        'ms_per_index_page': round(index_seconds * 1000 / (len(pages) * args.repeat), 3),
+        'ms_per_article': round(article_seconds * 1000 / (len(articles) * args.repeat), 3)
+    }
+    for name in available_parsers():
+        parser = get_parser(name)
+        seconds = _time_parse(parser.parse_article, articles, args.repeat)
+        result[f'ms_per_article_{name}'] = round(seconds * 1000 / (len(articles) * args.repeat), 3)
+
+    checked = [(f'index{page}', 'index', data) for page, data in enumerate(pages, 1)]
+    checked += [(f'article{index}', 'article', data) for index, data in enumerate(articles)]
+    if args.fixtures:
+        checked += recorded_pages(args.fixtures)
+    result['checked_pages'] = len(checked)
+    result['mismatches'] = len(check_equivalence(checked))
+    return result
+
+
+def bench_tokenize(args, contents):
+    """不使用快取的斷詞與詞頻計算"""
+    jieba.initialize()
+    start = time.perf_counter()
+    results = count_terms_per_article(contents, workers=args.workers)
+    seconds = time.perf_counter() - start
+    tokens = sum(sum(counts.values()) for counts in results)
+    return {
+        'seconds': round(seconds, 3),
+        'articles': len(contents),
+        'tokens': tokens,
+        'tokens_per_sec': _rate(tokens, seconds),
+        'articles_per_sec': _rate(len(contents), seconds)
+    }
+
+
+def bench_save(args, server, db_path, articles):
+    """寫入新資料庫；斷詞結果先寫入快取，量測以資料庫寫入為主"""
+    crawler = _crawler(args, server, db_path)
+    try:
+        count_terms_per_article([article['content'] for article in articles],
+                                workers=args.workers, cache=crawler.token_cache)
+        crawler.conn.commit()
+        start = time.perf_counter()
+        with _quiet(not args.verbose):
+            new_count = crawler.save_articles(articles)
+        seconds = time.perf_counter() - start
+    finally:
+        crawler.close()
+    return {
+        'seconds': round(seconds, 3),
+        'inserted': new_count,
+        'inserts_per_sec': _rate(new_count, seconds)
+    }
+
+
+def _shard_boards(args):
+    return [f'{args.ptt_board}{i}' for i in range(1, args.shard_boards + 1)]
+
+
+def bench_sharded(args, server, db_path, workers):
+    """以多個抓取行程與單一寫入行程抓取多個 PTT 看板並寫入資料庫（禮貌預算由各行程平分）"""
+    boards = [('ptt', board) for board in _shard_boards(args)]
+    crawler = _crawler(args, server, db_path)
+    try:
+        server.reset_counters()
+        with _quiet(not args.verbose):
+            stats = crawler.crawl_boards(boards, args.pages, workers=workers, batch_size=50)
+    finally:
+        crawler.close()
+    return {
+        'seconds': stats['seconds'],
+        'requests': server.request_count,
+        'articles': stats['new'],
+        'articles_per_sec': _rate(stats['new'], stats['seconds'])
+    }
+
+
+def run(args):
+    """執行所有階段並回傳結果字典"""
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare', 'verbose')}
+        },
+        'stages': {}
+    }
+    stages = results['stages']
+
+    server = StandInServer(
+        ptt_pages=max(args.pages, 2),
+        dcard_posts=args.pages * 30,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        over18_boards=('Gossiping',) + tuple(_shard_boards(args)),
+        fixtures_dir=args.fixtures,
+        seed=args.seed
+    )
+    with server, tempfile.TemporaryDirectory() as tmp:
+        crawler = _crawler(args, server, os.path.join(tmp, 'fetch.db'))
+        try:
+            ptt_articles, stages['ptt_fetch'] = bench_ptt_fetch(args, server, crawler)
+            dcard_articles, stages['dcard_fetch'] = bench_dcard_fetch(args, server, crawler)
+            stages['parse'] = bench_parse(args, server, crawler)
+        finally:
+            crawler.close()
+
+        articles = ptt_articles + dcard_articles
+        stages['tokenize'] = bench_tokenize(args, [article['content'] for article in articles])
+        stages['save'] = bench_save(args, server, os.path.join(tmp, 'save.db'), articles)
+        for workers in args.shard_workers:
+            stages[f'sharded_{workers}'] = bench_sharded(
+                args, server, os.path.join(tmp, f'sharded{workers}.db'), workers)
+    return results
+
+
+def _higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+
+def _lower_is_better(metric):
+    return metric.startswith('ms_per_')
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """比較兩次結果，回傳退步的指標列表
+
+    只比較 *_per_sec（越高越好）與 ms_per_*（越低越好）指標。
+
+    Returns:
+        list: (階段, 指標, 基準值, 目前值, 變化比例) 元組的列表
+    """
+    regressions = []
+    print(f"\n{'階段':<12}{'指標':<22}{'基準':>12}{'目前':>12}{'變化':>10}")
+    for stage, metrics in current['stages'].items():
+        base_metrics = baseline.get('stages', {}).get(stage, {})
+        for metric, value in metrics.items():
+            if not (_higher_is_better(metric) or _lower_is_better(metric)):
+                continue
+            base = base_metrics.get(metric)
+            if not base or value is None:
+                continue
+            change = (value - base) / base
+            worse = -change if _higher_is_better(metric) else change
+            flag = ' 退步' if worse > threshold else ''
+            print(f"{stage:<12}{metric:<22}{base:>12}{value:>12}{change:>+10.1%}{flag}")
+            if worse > threshold:
+                regressions.append((stage, metric, base, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以本機替身伺服器離線量測爬蟲各階段效能')
+    parser.add_argument('--pages', type=int, default=5, help='PTT 與 Dcard 各抓取的頁數（預設為5）')
+    parser.add_argument('--ptt-board', default='Gossiping', help='PTT 看板名稱（預設需 over18 驗證）')
+    parser.add_argument('--dcard-board', default='bench', help='Dcard 看板名稱')
+    parser.add_argument('--latency', type=float, default=20, help='每個請求的延遲毫秒數（預設為20）')
+    parser.add_argument('--jitter', type=float, default=10, help='額外的隨機延遲毫秒數上限（預設為10）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回傳 503 的機率（預設為0）')
+    parser.add_argument('--fixtures', help='錄製頁面的目錄，路徑與請求相同的檔案會取代合成頁面')
+    parser.add_argument('--seed', type=int, default=0, help='延遲與錯誤注入的亂數種子')
+    parser.add_argument('--concurrency', type=int, default=16, help='全域同時請求數上限')
+    parser.add_argument('--host-concurrency', type=int, default=4, help='每個主機同時請求數上限')
+    parser.add_argument('--rps', type=float, default=0, help='每個主機每秒請求數上限（預設為0，不限制）')
+    parser.add_argument('--html-parser', choices=['auto', 'lxml', 'fast', 'bs4'], default='auto',
+                        help='爬蟲使用的 PTT 頁面解析器（預設為 auto）')
+    parser.add_argument('--workers', type=int, help='斷詞工作行程數，預設為 CPU 核心數')
+    parser.add_argument('--shard-workers', type=lambda value: [int(n) for n in value.split(',')],
+                        default=[], help='以逗號分隔的抓取行程數，各量測一次多看板多行程抓取，例如 1,2,4')
+    parser.add_argument('--shard-boards', type=int, default=8, help='多行程抓取的看板數（預設為8）')
+    parser.add_argument('--repeat', type=int, default=5, help='解析階段重複次數（預設為5）')
+    parser.add_argument('--output', help='結果 JSON 的輸出路徑')
+    parser.add_argument('--compare', help='作為基準的結果 JSON，退步超過門檻時以狀態碼 1 結束')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='視為退步的變化比例（預設為0.10）')
+    parser.add_argument('--verbose', action='store_true', help='顯示爬蟲的逐篇輸出')
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps(results['stages'], ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 項指標退步超過 {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
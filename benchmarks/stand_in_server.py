@@ -0,0 +1,285 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 每個 PTT 列表頁的文章數
+PTT_POSTS_PER_PAGE = 20
+
+# 合成文章的起始發文時間與間隔（秒）
+BASE_POST_TIME = 1718000000
+POST_INTERVAL = 60
+
+# 合成文章使用的詞彙
+VOCABULARY = [
+    '今天', '天氣', '台北', '颱風', '停電', '政府', '政策', '股票', '投資', '房價',
+    '工作', '薪水', '老闆', '同事', '學生', '老師', '考試', '捷運', '公車', '高鐵',
+    '手機', '電腦', '遊戲', '電影', '音樂', '美食', '餐廳', '咖啡', '夜市', '旅遊',
+    '日本', '美國', '中國', '選舉', '立委', '市長', '新聞', '記者', '網友', '留言',
+    '覺得', '真的', '其實', '應該', '可能', '已經', '還是', '因為', '所以', '但是',
+    '問題', '時間', '朋友', '家人', '健康', '醫院', '疫苗', '口罩', '超商', '便當'
+]
+
+
+def _sentence(rng, words):
+    return ''.join(rng.choice(VOCABULARY) for _ in range(words)) + '。'
+
+
+def synthetic_content(seed, sentences=12):
+    """產生固定種子的合成文章內容"""
+    rng = random.Random(seed)
+    return '\n'.join(_sentence(rng, rng.randint(4, 12)) for _ in range(sentences))
+
+
+class StandInServer:
+    """模擬 PTT 與 Dcard 的本機 HTTP 伺服器，供離線效能測試使用
+
+    PTT：/bbs/<看板>/index.html、index<N>.html、M.<時間>.A.<編號>.html，
+    over18_boards 中的看板未帶 over18 cookie 時會轉址到 /ask/over18。
+    Dcard：/_api/forums/<看板>/posts?before=<id> 與 /_api/posts/<id>。
+    fixtures_dir 中存在與請求路徑相同的檔案時，改為回傳該錄製檔案。
+    """
+
+    def __init__(self, ptt_pages=10, dcard_posts=300, latency=0.0, jitter=0.0, error_rate=0.0,
+                 over18_boards=('Gossiping',), fixtures_dir=None, seed=0, content_sentences=12):
+        """
+        Args:
+            ptt_pages (int): 每個 PTT 看板的列表頁數
+            dcard_posts (int): 每個 Dcard 看板的文章數
+            latency (float): 每個請求的固定延遲秒數
+            jitter (float): 額外的隨機延遲上限秒數
+            error_rate (float): 回傳 503 的機率
+            over18_boards (tuple): 需要 over18 驗證的看板
+            fixtures_dir (str): 錄製頁面的目錄
+            seed (int): 錯誤注入與延遲的亂數種子
+            content_sentences (int): 合成文章的句數
+        """
+        self.ptt_pages = ptt_pages
+        self.dcard_posts = dcard_posts
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.over18_boards = set(over18_boards)
+        self.fixtures_dir = fixtures_dir
+        self.content_sentences = content_sentences
+        self.request_count = 0
+        self.error_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, host='127.0.0.1', port=0):
+        """在背景執行緒啟動伺服器，port 為 0 時自動選擇可用的埠"""
+        server = self
+
+        class Handler(StandInHandler):
+            stand_in = server
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止伺服器"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.error_count = 0
+
+    def _before_request(self):
+        """計數並套用延遲，回傳是否注入錯誤"""
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    # PTT 頁面
+
+    def ptt_post_time(self, page, index):
+        return BASE_POST_TIME + ((page - 1) * PTT_POSTS_PER_PAGE + index) * POST_INTERVAL
+
+    def ptt_index(self, board, page):
+        entries = []
+        for index in range(PTT_POSTS_PER_PAGE):
+            post_time = self.ptt_post_time(page, index)
+            entries.append(
+                f'<div class="r-ent"><div class="nrec"><span class="hl f2">{index % 10}</span></div>'
+                f'<div class="title"><a href="/bbs/{board}/M.{post_time}.A.{post_time % 4096:03X}.html">'
+                f'[問卦] 合成文章 {post_time}</a></div>'
+                f'<div class="meta"><div class="author">user{index}</div></div></div>')
+        if page == self.ptt_pages:
+            entries.append('<div class="r-list-sep"></div>'
+                           f'<div class="r-ent"><div class="title"><a href="/bbs/{board}/M.1.A.000.html">'
+                           '[公告] 置底文章</a></div></div>')
+        prev_link = (f'<a class="btn wide" href="/bbs/{board}/index{page - 1}.html">&lsaquo; 上頁</a>'
+                     if page > 1 else '<a class="btn wide disabled">&lsaquo; 上頁</a>')
+        return ('<html><head><meta charset="utf-8"></head><body>'
+                '<div class="btn-group btn-group-paging">'
+                f'<a class="btn wide" href="/bbs/{board}/index1.html">最舊</a>{prev_link}'
+                f'<a class="btn wide" href="/bbs/{board}/index.html">最新</a></div>'
+                f'<div class="r-list-container action-bar-margin bbs-screen">{"".join(entries)}</div>'
+                '</body></html>')
+
+    def ptt_article(self, board, post_time):
+        published = time.strftime('%a %b %d %H:%M:%S %Y', time.gmtime(post_time + 8 * 3600))
+        content = synthetic_content(post_time, self.content_sentences)
+        pushes = ''.join(
+            f'<div class="push"><span class="hl push-tag">推 </span>'
+            f'<span class="f3 hl push-userid">user{i}</span>'
+            f'<span class="f3 push-content">: {VOCABULARY[(post_time + i) % len(VOCABULARY)]}</span>'
+            f'<span class="push-ipdatetime"> 06/21 12:{i:02d}\n</span></div>'
+            for i in range(5))
+        return ('<html><head><meta charset="utf-8"></head><body><div id="main-content" class="bbs-screen bbs-content">'
+                '<div class="article-metaline"><span class="article-meta-tag">作者</span>'
+                f'<span class="article-meta-value">user{post_time % 97} (合成)</span></div>'
+                '<div class="article-metaline-right"><span class="article-meta-tag">看板</span>'
+                f'<span class="article-meta-value">{board}</span></div>'
+                '<div class="article-metaline"><span class="article-meta-tag">標題</span>'
+                f'<span class="article-meta-value">[問卦] 合成文章 {post_time}</span></div>'
+                '<div class="article-metaline"><span class="article-meta-tag">時間</span>'
+                f'<span class="article-meta-value">{published}</span></div>'
+                f'{content}\n--\n<span class="f2">※ 發信站: 批踢踢實業坊(ptt.cc), 來自: 127.0.0.1</span>\n'
+                f'{pushes}</div></body></html>')
+
+    # Dcard 資料
+
+    def dcard_post(self, board, post_id, full=True):
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(BASE_POST_TIME + post_id * POST_INTERVAL))
+        content = synthetic_content(post_id, self.content_sentences)
+        post = {
+            'id': post_id,
+            'title': f'合成文章 {post_id}',
+            'excerpt': content[:30],
+            'createdAt': created,
+            'updatedAt': created,
+            'school': None if post_id % 3 else '合成大學',
+            'forumAlias': board
+        }
+        if full:
+            post['content'] = content
+        return post
+
+    def dcard_list(self, board, before, limit):
+        newest = self.dcard_posts
+        start = min(newest, before - 1) if before is not None else newest
+        ids = range(start, max(0, start - limit), -1)
+        return [self.dcard_post(board, post_id, full=False) for post_id in ids]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    stand_in = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fixture(self, path):
+        fixtures_dir = self.stand_in.fixtures_dir
+        if not fixtures_dir:
+            return None
+        root = os.path.abspath(fixtures_dir)
+        file_path = os.path.abspath(os.path.join(root, path.lstrip('/')))
+        if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def _over18(self):
+        return 'over18=1' in (self.headers.get('Cookie') or '')
+
+    def do_GET(self):
+        server = self.stand_in
+        if server._before_request():
+            self._send(503, 'Service Unavailable', headers={'Retry-After': '1'})
+            return
+
+        parts = urlsplit(self.path)
+        path = parts.path
+        fixture = self._fixture(path)
+        if fixture is not None:
+            content_type = 'application/json' if path.startswith('/_api/') else 'text/html; charset=utf-8'
+            self._send(200, fixture, content_type)
+            return
+
+        segments = path.strip('/').split('/')
+        if segments[0] == 'bbs' and len(segments) == 3:
+            board, name = segments[1], segments[2]
+            if board in server.over18_boards and not self._over18():
+                self._send(302, headers={'Location': f'/ask/over18?from=/bbs/{board}/{name}'})
+                return
+            if name == 'index.html':
+                self._send(200, server.ptt_index(board, server.ptt_pages))
+                return
+            if name.startswith('index') and name.endswith('.html'):
+                page = int(name[5:-5] or server.ptt_pages)
+                if 1 <= page <= server.ptt_pages:
+                    self._send(200, server.ptt_index(board, page))
+                    return
+            if name.startswith('M.'):
+                self._send(200, server.ptt_article(board, int(name.split('.')[1])))
+                return
+        elif path == '/ask/over18':
+            self._send(200, '<form method="post"><button name="yes" value="yes">我同意</button></form>')
+            return
+        elif path.startswith('/_api/forums/') and segments[-1] == 'posts':
+            query = parse_qs(parts.query)
+            before = int(query['before'][0]) if 'before' in query else None
+            limit = int(query.get('limit', ['30'])[0])
+            body = json.dumps(server.dcard_list(segments[2], before, limit), ensure_ascii=False)
+            self._send(200, body, 'application/json')
+            return
+        elif path.startswith('/_api/posts/'):
+            post_id = int(segments[-1])
+            if 1 <= post_id <= server.dcard_posts:
+                body = json.dumps(server.dcard_post('bench', post_id), ensure_ascii=False)
+                self._send(200, body, 'application/json')
+                return
+        self._send(404, 'Not Found')
+
+    def do_POST(self):
+        self.stand_in._before_request()
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if urlsplit(self.path).path == '/ask/over18' and form.get('yes') == ['yes']:
+            target = form.get('from', ['/'])[0]
+            self._send(302, headers={'Location': target, 'Set-Cookie': 'over18=1; Path=/'})
+            return
+        self._send(404, 'Not Found')
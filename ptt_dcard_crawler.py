@@ -1,16 +1,179 @@
 import requests
-from bs4 import BeautifulSoup
 import sqlite3
 import time
 import random
 import json
-from datetime import datetime, timedelta
+import os
+import re
+from datetime import datetime, timedelta, timezone
 import argparse
-from utils.word_counter import analyze_articles
+import asyncio
+import threading
+import jieba
+from requests.adapters import HTTPAdapter
+from utils.article import Article, ArticleSink
+from utils.async_engine import AsyncFetcher
+from utils.content_store import DICTIONARY_SAMPLES, ContentStore
+from utils.exporter import ExportState, write_export
+from utils.http_transport import HttpTransport, interruptible_sleep
+from utils.metrics import METRICS
+from utils.near_duplicates import NearDuplicateIndex, simhash
+from utils.parallel_counter import count_terms_per_article
+from utils.pipeline import DEFAULT_BATCH_SIZE, ArticlePipeline, stream_articles
+from utils.ptt_parser import get_parser
+from utils.scheduler import CrawlScheduler, load_board_config
+from utils.sharded_crawl import ShardedCrawl, parse_board_list
+from utils.sketch import DEFAULT_EPSILON, SpaceSaving
+from utils.token_cache import TokenCache
+
+# PTT 文章網址中的發文時間戳，例如 M.1718900000.A.ABC.html
+PTT_POST_TIME_PATTERN = re.compile(r'/M\.(\d+)\.')
+
+# PTT 推文行，例如「推 user: 內容  06/21 12:34」，時間與 IP 不保留
+PTT_PUSH_PATTERN = re.compile(
+    r'^(推|噓|→) ?([A-Za-z0-9_]+) *:\s*(.*?)\s*(?:\d{1,3}(?:\.\d{1,3}){3}\s*)?(?:\d{1,2}/\d{1,2}(?: \d{1,2}:\d{2})?)?\s*$')
+
+# 資料庫結構版本，記錄於 PRAGMA user_version
+SCHEMA_VERSION = 10
+
+# 預設的網站位址，可在建立爬蟲時改為本機替身伺服器（見 benchmarks/）
+PTT_BASE_URL = 'https://www.ptt.cc'
+DCARD_BASE_URL = 'https://www.dcard.tw'
+
+# SQLite 單一語句可綁定參數數量的保守上限
+SQL_VARIABLE_CHUNK = 500
+
+# 斷詞結果以不可見分隔符號連接，FTS5 的 unicode61 會將其視為分隔字元，
+# 顯示摘要時再移除，不影響原文中的空白
+SEGMENT_SEPARATOR = '\u2063'
+
+# iter_articles 可選擇讀取的欄位與預設欄位
+ARTICLE_COLUMNS = ('id', 'title', 'url', 'publish_time', 'published_at', 'source',
+                   'author', 'content', 'word_freq', 'created_at', 'canonical_id')
+DEFAULT_ARTICLE_COLUMNS = ('title', 'url', 'publish_time', 'source', 'author', 'content')
+# export_articles 預設匯出的欄位
+EXPORT_COLUMNS = ('id', 'title', 'url', 'publish_time', 'published_at', 'source', 'author', 'content')
+# 讀取時需要轉換的欄位：content 可能為壓縮或封存後的值
+COLUMN_EXPRESSIONS = {'content': 'content_text(content)'}
+
+# 刪除文章時一併刪除其斷詞結果。全文檢索索引由程式在寫入斷詞結果時直接維護，
+# 觸發器只用純 SQL，其他 SQLite 用戶端（未註冊 content_text）也能寫入 articles
+SEARCH_TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+        DELETE FROM article_segments WHERE article_id = old.id;
+    END;
+'''
+
+# PTT 的發文時間為台灣時間且不含時區
+PTT_TIMEZONE = timezone(timedelta(hours=8))
+# 每日詞頻彙總以台灣時間切分日期，day 為 (published_at + 偏移) // 86400
+DAY_OFFSET = 8 * 3600
+MONTHS = {name: index for index, name in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+
+def parse_publish_time(value):
+    """將來源網站的發文時間轉為 Unix 時間戳
+    
+    支援 PTT 的 'Mon Jun 21 12:34:56 2025' 與 Dcard 的 ISO-8601 格式，
+    不含時區的時間視為台灣時間。
+    
+    Args:
+        value (str): 發文時間字串
+        
+    Returns:
+        int: Unix 時間戳，無法解析（例如「未知」）時回傳 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    
+    parts = value.split()
+    if len(parts) == 5 and parts[1] in MONTHS:
+        try:
+            hour, minute, second = (int(part) for part in parts[3].split(':'))
+            published = datetime(int(parts[4]), MONTHS[parts[1]], int(parts[2]),
+                                 hour, minute, second, tzinfo=PTT_TIMEZONE)
+        except ValueError:
+            return None
+        return int(published.timestamp())
+    
+    try:
+        published = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=PTT_TIMEZONE)
+    return int(published.timestamp())
+
+
+def to_timestamp(value):
+    """將時間戳、datetime 或時間字串轉為 Unix 時間戳
+    
+    不含時區的 datetime 視為本機時間，不含時區的字串視為台灣時間。
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    timestamp = parse_publish_time(value)
+    if timestamp is None:
+        raise ValueError(f"無法解析的時間: {value}")
+    return timestamp
+
+
+def ptt_push_lines(text):
+    """從 PTT 文章頁的主內容文字取出簽名檔分隔線之後的推文
+    
+    Returns:
+        list: 「推 user: 內容」格式的推文列表
+    """
+    if '--' not in text:
+        return []
+    pushes = []
+    for line in text.split('--', 1)[1].split('\n'):
+        match = PTT_PUSH_PATTERN.match(line.strip())
+        if match:
+            pushes.append(f"{match.group(1)} {match.group(2)}: {match.group(3)}")
+    return pushes
+
+
+def source_label(site, board):
+    """回傳資料庫中使用的來源名稱，例如 'PTT-Gossiping'、'Dcard-funny'"""
+    return f"{'PTT' if site.lower() == 'ptt' else 'Dcard'}-{board}"
+
+
+def window_start_day(days):
+    """回傳「最近 days 天」統計範圍的第一天（台灣時間），與每日詞頻彙總的 day 相同單位"""
+    return (int(time.time()) - days * 86400 + DAY_OFFSET) // 86400
+
 
 class PTTDcardCrawler:
-    def __init__(self):
-        """初始化爬蟲"""
+    def __init__(self, max_concurrency=16, per_host_concurrency=4, requests_per_second=4.0,
+                 db_path='articles.db', tokenize_workers=None, ptt_base_url=PTT_BASE_URL,
+                 dcard_base_url=DCARD_BASE_URL, html_parser='auto', compression=None,
+                 archive_dir=None, keep_pushes=False, init_schema=True):
+        """初始化爬蟲
+        
+        Args:
+            max_concurrency (int): 非同步模式的全域同時請求數上限
+            per_host_concurrency (int): 非同步模式下每個主機的同時請求數上限
+            requests_per_second (float): 非同步模式下每個主機每秒請求數上限
+            db_path (str): SQLite 資料庫路徑
+            tokenize_workers (int): 大量文章斷詞時的工作行程數，預設為 CPU 核心數
+            ptt_base_url (str): PTT 網站位址
+            dcard_base_url (str): Dcard 網站位址
+            html_parser (str): PTT 頁面解析器，'auto'、'lxml'、'fast' 或 'bs4'
+            compression (str): 新寫入文章內容的壓縮方式，None、'zlib' 或 'zstd'；
+                不論設定為何，已壓縮或已封存的內容都會在讀取時還原
+            archive_dir (str): 封存區段檔的目錄，預設為資料庫路徑加上 .archive
+            keep_pushes (bool): PTT 文章內容是否保留推文（不含時間），
+                搭配 refresh 模式可讓熱門文章的新推文反映在內容與詞頻
+            init_schema (bool): 是否建立資料表並升級資料庫結構；資料庫已由其他行程準備好時
+                （例如 crawl_boards 的子行程）設為 False，略過建表與遷移以縮短啟動時間
+        """
         # 設定 User-Agent
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
@@ -21,22 +184,77 @@ class PTTDcardCrawler:
             'Cache-Control': 'max-age=0'
         }
         
+        self.db_path = db_path
+        self.tokenize_workers = tokenize_workers
+        self.html_parser = html_parser
+        self.ptt_base_url = ptt_base_url.rstrip('/')
+        self.dcard_base_url = dcard_base_url.rstrip('/')
+        self.ptt_parser = get_parser(html_parser)
+        self.keep_pushes = keep_pushes
+        
+        # 非同步抓取設定
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.requests_per_second = requests_per_second
+        
+        # open_session() 開啟後由所有抓取共用的 session 與抓取引擎
+        self._shared_session = None
+        self._shared_fetcher = None
+        
         # 初始化資料庫
-        self.conn = sqlite3.connect('articles.db', check_same_thread=False)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.cursor = self.conn.cursor()
         
-        # 建立資料表
+        # 多個執行緒共用同一個連線時（例如排程器），抓取與保存過程的資料庫存取以此鎖序列化
+        self.db_lock = threading.RLock()
+        
+        # WAL 模式讓讀取不阻塞寫入，搭配 synchronous=NORMAL 減少每次提交的 fsync
+        self.cursor.execute('PRAGMA journal_mode=WAL')
+        self.cursor.execute('PRAGMA synchronous=NORMAL')
+        self.cursor.execute('PRAGMA temp_store=MEMORY')
+        
+        # 最近一次 save_articles 的寫入統計
+        self.last_save_stats = {}
+        
+        # 完整抓完、等文章保存後才推進的增量抓取檢查點，見 commit_checkpoint
+        self.pending_checkpoints = {}
+        
+        if init_schema:
+            self._create_schema()
+        
+        # 斷詞結果快取，內容未變的文章不再重新斷詞；詞彙 id 對照表也由此與文章詞頻共用
+        self.token_cache = TokenCache(self.conn)
+        
+        # 近似重複文章的指紋索引，重複文章的 canonical_id 指向最早收錄的同內容文章
+        self.near_duplicates = NearDuplicateIndex(self.conn)
+        
+        # 文章內容的壓縮與封存；查詢中以 content_text(content) 還原為文字
+        self.archive_dir = archive_dir or f'{db_path}.archive'
+        self.content_store = ContentStore(self.conn, compression, self.archive_dir)
+        self.conn.create_function('content_text', 1, self.content_store.decode)
+        
+        # 增量匯出的水位
+        self.export_state = ExportState(self.conn)
+        
+        if init_schema:
+            self._migrate()
+    
+    def _create_schema(self):
+        """建立資料表、索引與全文檢索"""
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS articles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 title TEXT NOT NULL,
                 url TEXT NOT NULL,
                 publish_time TEXT,
+                published_at INTEGER,
                 source TEXT NOT NULL,
                 author TEXT,
                 content TEXT,
                 word_freq TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                remote_rev TEXT,
+                canonical_id INTEGER
             )
         ''')
         
@@ -45,282 +263,964 @@ class PTTDcardCrawler:
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_source ON articles(source)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_publish_time ON articles(publish_time)')
         
+        # 建立增量抓取的檢查點資料表（每個看板的高水位）
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                source TEXT PRIMARY KEY,
+                last_url TEXT,
+                last_post_time INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_crawled_at INTEGER
+            )
+        ''')
+        
+        # 建立詞彙字典與每篇文章的詞頻資料表
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_terms (
+                article_id INTEGER NOT NULL,
+                term_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (article_id, term_id)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_article_terms_term ON article_terms(term_id, count)')
+        
+        # 建立每日詞頻彙總表，供時間窗查詢合併日桶
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS term_daily (
+                source TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                term_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (source, day, term_id)
+            ) WITHOUT ROWID
+        ''')
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_term_daily_day ON term_daily(day, term_id, count)')
+        
+        # 建立全文檢索：article_segments 存放斷詞後的標題與內容（與文章內容相同，依 compression
+        # 壓縮或由 archive_articles 封存），article_segments_text 還原為文字，
+        # articles_fts 以它為外部內容表建立索引，寫入斷詞結果時由 _index_search 同步
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_segments (
+                article_id INTEGER PRIMARY KEY,
+                title TEXT,
+                content TEXT,
+                extra TEXT
+            )
+        ''')
+        self._create_search_index()
+        
         self.conn.commit()
     
-    def fetch_articles(self, source='ptt', board='Gossiping', pages=1):
+    def _create_search_index(self):
+        """建立還原斷詞結果的檢視表、全文檢索虛擬表與刪除文章的觸發器"""
+        self.cursor.execute('''
+            CREATE VIEW IF NOT EXISTS article_segments_text AS
+            SELECT article_id, content_text(title) AS title, content_text(content) AS content,
+                   content_text(extra) AS extra
+            FROM article_segments
+        ''')
+        self.cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, content, extra,
+                content='article_segments_text', content_rowid='article_id'
+            )
+        ''')
+        self.cursor.executescript(SEARCH_TRIGGERS)
+
+    def _migrate(self):
+        """將既有的 articles.db 升級到目前的資料庫結構版本"""
+        version = self.cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        
+        # 先補齊新增的欄位，後續的資料遷移會用到目前版本的程式碼
+        self._add_missing_columns()
+        
+        try:
+            if version < 1:
+                # 移除 (source, url) 重複的舊資料，保留最早的一筆後建立唯一索引
+                self.cursor.execute('''
+                    DELETE FROM articles
+                    WHERE id NOT IN (SELECT MIN(id) FROM articles GROUP BY source, url)
+                ''')
+                if self.cursor.rowcount > 0:
+                    print(f"資料庫升級：移除 {self.cursor.rowcount} 篇重複文章")
+                self.cursor.execute(
+                    'CREATE UNIQUE INDEX IF NOT EXISTS idx_source_url ON articles(source, url)')
+                self.cursor.execute('PRAGMA user_version = 1')
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        if version < 2:
+            # 為既有文章建立每篇文章的詞頻
+            self.rebuild_article_terms()
+            self.cursor.execute('PRAGMA user_version = 2')
+            self.conn.commit()
+        
+        if version < 3:
+            # 為既有文章建立全文檢索索引
+            self.rebuild_search_index()
+            self.cursor.execute('PRAGMA user_version = 3')
+            self.conn.commit()
+        
+        if version < 4:
+            # 為正規化的發文時間戳建立索引並回填
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_source_published_at
+                ON articles(source, published_at)
+            ''')
+            self.cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_published_at ON articles(published_at)')
+            self.conn.commit()
+            self.backfill_published_at()
+            self.cursor.execute('PRAGMA user_version = 4')
+            self.conn.commit()
+        
+        if version < 5:
+            # 由既有的每篇文章詞頻建立每日彙總
+            self.rebuild_term_daily()
+            self.cursor.execute('PRAGMA user_version = 5')
+            self.conn.commit()
+        
+        if version < 6:
+            # crawl_checkpoints 新增 last_crawled_at，已由 _add_missing_columns 補上
+            self.cursor.execute('PRAGMA user_version = 6')
+            self.conn.commit()
+        
+        if version < 7:
+            # articles 新增 remote_rev，已由 _add_missing_columns 補上
+            self.cursor.execute('PRAGMA user_version = 7')
+            self.conn.commit()
+        
+        if version < 8:
+            # articles 新增 canonical_id（由 _add_missing_columns 補上），
+            # 刪除作為代表的文章時，改由其最早收錄的重複文章代表，其餘重複文章改指向它
+            self.cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_canonical_id ON articles(canonical_id)')
+            self.cursor.executescript('''
+                CREATE TRIGGER IF NOT EXISTS articles_near_duplicates_ad AFTER DELETE ON articles BEGIN
+                    DELETE FROM article_fingerprints WHERE article_id = old.id;
+                    DELETE FROM fingerprint_bands WHERE article_id = old.id;
+                    UPDATE articles
+                    SET canonical_id = (SELECT MIN(id) FROM articles WHERE canonical_id = old.id)
+                    WHERE canonical_id = old.id
+                      AND id > (SELECT MIN(id) FROM articles WHERE canonical_id = old.id);
+                    UPDATE articles SET canonical_id = NULL WHERE canonical_id = old.id;
+                END;
+            ''')
+            self.conn.commit()
+            # 為既有文章建立指紋並標記近似重複
+            self.rebuild_near_duplicates()
+            self.cursor.execute('PRAGMA user_version = 8')
+            self.conn.commit()
+        
+        if version < 9:
+            # articles_fts 改以還原文字的 article_segments_text 為外部內容表，
+            # 之後斷詞結果可與文章內容一同壓縮與封存；重新建立虛擬表與觸發器後重建索引
+            self.cursor.executescript('''
+                DROP TRIGGER IF EXISTS article_segments_ai;
+                DROP TRIGGER IF EXISTS article_segments_ad;
+                DROP TRIGGER IF EXISTS article_segments_au;
+                DROP TABLE IF EXISTS articles_fts;
+            ''')
+            self._create_search_index()
+            self.cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+            self.cursor.execute('PRAGMA user_version = 9')
+            self.conn.commit()
+        
+        if version < 10:
+            # 移除呼叫 content_text() 的同步觸發器，改由 _index_search 直接維護索引；
+            # 觸發器至今都與索引同步，不需重建
+            self.cursor.executescript('''
+                DROP TRIGGER IF EXISTS article_segments_ai;
+                DROP TRIGGER IF EXISTS article_segments_ad;
+                DROP TRIGGER IF EXISTS article_segments_au;
+            ''')
+            self.cursor.execute('PRAGMA user_version = 10')
+            self.conn.commit()
+    
+    def _add_missing_columns(self):
+        """為舊版資料庫的資料表補上新增的欄位"""
+        columns = {row[1] for row in self.cursor.execute('PRAGMA table_info(articles)')}
+        if 'published_at' not in columns:
+            self.cursor.execute('ALTER TABLE articles ADD COLUMN published_at INTEGER')
+        if 'remote_rev' not in columns:
+            self.cursor.execute('ALTER TABLE articles ADD COLUMN remote_rev TEXT')
+        if 'canonical_id' not in columns:
+            self.cursor.execute('ALTER TABLE articles ADD COLUMN canonical_id INTEGER')
+        columns = {row[1] for row in self.cursor.execute('PRAGMA table_info(crawl_checkpoints)')}
+        if 'last_crawled_at' not in columns:
+            self.cursor.execute('ALTER TABLE crawl_checkpoints ADD COLUMN last_crawled_at INTEGER')
+        self.conn.commit()
+    
+    def fetch_articles(self, source='ptt', board='Gossiping', pages=1, mode='async', incremental=False,
+                       on_articles=None, cancel_event=None, dcard_bodies='changed', collect=True,
+                       refresh=False):
         """抓取指定來源和看板的文章
         
         Args:
             source (str): 來源網站 ('ptt' 或 'dcard')
             board (str): 看板名稱
-            pages (int): 要抓取的頁數
+            pages (int): 要抓取的頁數（增量模式下為最多往回翻的頁數）
+            mode (str): 'async' 為並發抓取，'sequential' 為逐篇抓取的備援模式
+            incremental (bool): 是否從最新頁往回抓到已知文章為止（僅支援 PTT）
+            on_articles (callable): 每解析完文章即以文章列表呼叫，在抓取所在的執行緒執行
+            cancel_event (threading.Event): 觸發後停止送出新請求，回傳已抓到的文章
+            dcard_bodies (str): Dcard 文章內容的抓取方式，見 get_dcard_articles
+            collect (bool): 是否保留並回傳所有文章；只透過 on_articles 串流處理時設為 False
+            refresh (bool): 只抓取新文章與推文數改變的文章，見 get_ptt_articles（僅支援 PTT；
+                Dcard 以 dcard_bodies='changed' 依 updatedAt 判斷）
             
         Returns:
-            list: 文章列表
+            list: 文章列表，collect 為 False 時為空列表
         """
         try:
             if source.lower() == 'ptt':
-                return self.get_ptt_articles(board, pages)
+                return self.get_ptt_articles(board, pages, mode, incremental,
+                                             on_articles, cancel_event, collect, refresh)
             elif source.lower() == 'dcard':
-                return self.get_dcard_articles(board, pages)
+                return self.get_dcard_articles(board, pages, mode, on_articles, cancel_event,
+                                               dcard_bodies, collect)
             else:
                 raise ValueError(f"不支援的來源: {source}")
         except Exception as e:
             print(f"抓取文章時發生錯誤: {str(e)}")
             return []
 
-    def get_ptt_articles(self, board='Gossiping', pages=1):
+    def stream_articles(self, source='ptt', board='Gossiping', pages=1, **fetch_kwargs):
+        """以產生器逐篇取得抓取中的文章，參數同 fetch_articles，見 utils.pipeline.stream_articles
+        
+        Yields:
+            Article: 文章
+        """
+        return stream_articles(self, source, board, pages, **fetch_kwargs)
+
+    def crawl_to_db(self, source='ptt', board='Gossiping', pages=1, batch_size=DEFAULT_BATCH_SIZE,
+                    **fetch_kwargs):
+        """抓取並以串流管線逐批寫入資料庫，不在記憶體累積所有文章
+        
+        抓取、斷詞與寫入同時進行，每 batch_size 篇提交一次，中途中斷時已提交的文章不會遺失。
+        增量抓取完整抓完且每批都寫入成功後才推進檢查點。
+        
+        Args:
+            source (str): 'ptt' 或 'dcard'
+            board (str): 看板名稱
+            pages (int): 頁數
+            batch_size (int): 每批寫入的文章數
+            **fetch_kwargs: 傳給 fetch_articles 的其他參數（mode、incremental、cancel_event 等）
+            
+        Returns:
+            dict: 抓取與寫入統計，見 ArticlePipeline.run
+        """
+        stats = ArticlePipeline(self, batch_size).run(source, board, pages, **fetch_kwargs)
+        if stats['errors']:
+            self.pending_checkpoints.pop(source_label(source, board), None)
+        else:
+            self.commit_checkpoint(source_label(source, board))
+        print(f"串流寫入完成：抓取 {stats['fetched']} 篇，新增 {stats['new']} 篇，"
+              f"更新 {stats['updated']} 篇，共 {stats['batches']} 批")
+        return stats
+
+    def crawl_boards(self, boards, pages=1, workers=2, batch_size=DEFAULT_BATCH_SIZE, **fetch_kwargs):
+        """以多個行程同時抓取多個看板，由單一寫入行程批次寫入資料庫
+        
+        各抓取行程以相同設定建立自己的爬蟲（HTTP session、over18 cookie 與連線池各自獨立），
+        每個主機的禮貌預算（requests_per_second 與 per_host_concurrency）平均分配給各行程，
+        總請求速率不超過單一行程時的設定；per_host_concurrency 每個行程至少為 1。
+        子行程開啟資料庫時結構已由本爬蟲升級；抓取行程只讀取資料庫，寫入都由寫入行程進行。
+        
+        Args:
+            boards (list): (來源, 看板) 元組列表，或以逗號分隔的字串（見 parse_board_list）
+            pages (int): 每個看板的頁數
+            workers (int): 抓取行程數
+            batch_size (int): 每批寫入的文章數
+            **fetch_kwargs: 傳給 fetch_articles 的其他參數（mode、incremental、refresh、dcard_bodies 等）
+            
+        Returns:
+            dict: 抓取與寫入統計，見 ShardedCrawl.run
+        """
+        if isinstance(boards, str):
+            boards = parse_board_list(boards)
+        workers = max(1, min(workers, len(boards)))
+        options = {
+            'max_concurrency': self.max_concurrency,
+            'per_host_concurrency': max(1, self.per_host_concurrency // workers),
+            'requests_per_second': self.requests_per_second / workers,
+            'db_path': self.db_path,
+            'tokenize_workers': self.tokenize_workers,
+            'ptt_base_url': self.ptt_base_url,
+            'dcard_base_url': self.dcard_base_url,
+            'html_parser': self.html_parser,
+            'compression': self.content_store.compression,
+            'archive_dir': self.archive_dir,
+            'keep_pushes': self.keep_pushes
+        }
+        stats = ShardedCrawl(type(self), options, workers, batch_size).run(boards, pages, **fetch_kwargs)
+        print(f"多行程抓取完成：{len(stats['boards'])} 個看板，抓取 {stats['fetched']} 篇，"
+              f"新增 {stats['new']} 篇，更新 {stats['updated']} 篇，共 {stats['batches']} 批，"
+              f"耗時 {stats['seconds']} 秒")
+        return stats
+
+    def _create_session(self):
+        """建立共用連線池的 HTTP session"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.max_concurrency,
+                              pool_maxsize=self.max_concurrency)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def open_session(self, cancel_event=None):
+        """開啟共用的 session 與抓取引擎，之後的非同步抓取都重複使用
+        
+        連線池、over18 cookie 與每個主機的禮貌預算由所有抓取共享，
+        適合長時間執行、輪流抓取多個看板的情境。呼叫 close_session() 或 close() 釋放。
+        
+        Args:
+            cancel_event (threading.Event): 觸發後所有共用抓取停止送出新請求，
+                共用期間個別呼叫傳入的 cancel_event 不再生效
+        """
+        if self._shared_session is None:
+            self._shared_session = self._create_session()
+            self._shared_fetcher = self._create_fetcher(self._shared_session, cancel_event)
+        return self._shared_session
+
+    def close_session(self):
+        """關閉共用的 session 與抓取引擎"""
+        if self._shared_session is not None:
+            self._shared_fetcher.close()
+            self._shared_session.close()
+            self._shared_session = None
+            self._shared_fetcher = None
+
+    def _acquire_fetcher(self, cancel_event=None):
+        """取得本次抓取使用的 session 與抓取引擎
+        
+        Returns:
+            tuple: (session, fetcher, 是否由呼叫端負責關閉)
+        """
+        if self._shared_session is not None:
+            return self._shared_session, self._shared_fetcher, False
+        session = self._create_session()
+        return session, self._create_fetcher(session, cancel_event), True
+
+    def _ptt_session(self, board, transport):
+        """讓傳輸層的 session 通過 PTT 的 over18 驗證，已驗證時直接沿用
+        
+        驗證請求與一般抓取同樣經由 HttpTransport 送出，套用逾時、退避重試、Retry-After、
+        速率調整與斷路器。
+        
+        Returns:
+            requests.Session: 已驗證的 session
+        """
+        session = transport.session
+        if session.cookies.get('over18') == '1':
+            return session
+        
+        # 先訪問看板首頁以獲取 cookie
+        index_url = f'{self.ptt_base_url}/bbs/{board}/index.html'
+        response = transport.get(index_url, board)
+        
+        # 檢查是否需要年齡驗證
+        if response is not None and 'over18' in response.url:
+            # 提交年齡驗證表單
+            data = {
+                'from': f'/bbs/{board}/index.html',
+                'yes': 'yes'
+            }
+            transport.post(f'{self.ptt_base_url}/ask/over18', board, data=data)
+        return session
+
+    def _create_transport(self, session, cancel_event=None):
+        """建立帶有速率調整、重試與斷路器的 HTTP 傳輸層"""
+        return HttpTransport(
+            session,
+            per_host_concurrency=self.per_host_concurrency,
+            requests_per_second=self.requests_per_second,
+            cancel_event=cancel_event
+        )
+
+    def _create_fetcher(self, session, cancel_event=None):
+        """建立非同步抓取引擎"""
+        return AsyncFetcher(self._create_transport(session, cancel_event),
+                            max_concurrency=self.max_concurrency)
+
+    def _parse_ptt_index(self, html):
+        """解析 PTT 看板列表頁
+        
+        Args:
+            html (bytes): 列表頁的原始內容（也可傳入文字）
+        
+        Returns:
+            list: (標題, 文章網址, 推文數) 元組的列表
+        """
+        start = time.perf_counter()
+        links, _, _ = self.ptt_parser.parse_index(html)
+        METRICS.observe('parse_seconds', time.perf_counter() - start, kind='ptt_index')
+        return [(title, f"{self.ptt_base_url}{href}", nrec) for title, href, nrec in links]
+
+    def _parse_ptt_index_page(self, html):
+        """解析 PTT 看板列表頁，略過置底文章並取得「上頁」連結
+        
+        Returns:
+            tuple: ((標題, 文章網址, 推文數) 列表, 上一頁網址或 None)
+        """
+        start = time.perf_counter()
+        links, pinned_from, prev_href = self.ptt_parser.parse_index(html)
+        METRICS.observe('parse_seconds', time.perf_counter() - start, kind='ptt_index')
+        # 分隔線之後為置底文章
+        if pinned_from is not None:
+            links = links[:pinned_from]
+        prev_url = f"{self.ptt_base_url}{prev_href}" if prev_href else None
+        return [(title, f"{self.ptt_base_url}{href}", nrec) for title, href, nrec in links], prev_url
+
+    def _parse_ptt_article(self, board, title, article_url, html, nrec=None):
+        """解析 PTT 文章頁
+        
+        Args:
+            html (bytes): 文章頁的原始內容（也可傳入文字）
+            nrec (str): 列表頁上的推文數，存為 remote_rev 供之後判斷文章是否有新推文
+        
+        Returns:
+            Article: 文章資料
+        """
+        start = time.perf_counter()
+        author, publish_time, content = self.ptt_parser.parse_article(html)
+        parsed = time.perf_counter()
+        if content:
+            # 清理內容
+            pushes = ptt_push_lines(content) if self.keep_pushes else []
+            content = content.split('--')[0]  # 移除簽名檔
+            content = '\n'.join(line for line in content.split('\n') 
+                              if not line.startswith('※ 發信站:'))
+            if pushes:
+                content = content.rstrip('\n') + '\n\n' + '\n'.join(pushes)
+        METRICS.observe('parse_seconds', parsed - start, kind='ptt_article')
+        METRICS.observe('clean_seconds', time.perf_counter() - parsed, kind='ptt_article')
+        
+        return Article(
+            title=title,
+            url=article_url,
+            publish_time=publish_time or "未知",
+            source=f'PTT-{board}',
+            author=author or "未知",
+            content=content,
+            remote_rev=nrec
+        )
+
+    def _parse_dcard_post(self, board, post):
+        """將 Dcard 文章 API 或列表 API 的回應轉為文章資料
+        
+        列表 API 沒有完整內容，改存摘要，remote_rev 設為 None，
+        之後以 'changed' 模式抓取時會補抓完整內容。
+        
+        Returns:
+            Article: 文章資料
+        """
+        full = 'content' in post
+        return Article(
+            title=post['title'],
+            url=f"{self.dcard_base_url}/f/{board}/p/{post['id']}",
+            publish_time=post['createdAt'],
+            source=f'Dcard-{board}',
+            author=post.get('school') or '匿名',
+            content=post['content'] if full else post.get('excerpt', ''),
+            remote_rev=post.get('updatedAt') if full else None
+        )
+
+    def _dcard_list_url(self, board, before=None):
+        """Dcard 看板列表 API 網址，before 為上一頁最後一篇文章的 id"""
+        url = f'{self.dcard_base_url}/_api/forums/{board}/posts?popular=false&limit=30'
+        if before is not None:
+            url += f'&before={before}'
+        return url
+
+    def _select_dcard_bodies(self, board, posts, bodies):
+        """決定列表中哪些文章需要另外抓取完整內容
+        
+        Args:
+            bodies (str): 'changed' 只抓資料庫沒有或 updatedAt 改變的文章，
+                'all' 全部重新抓取，'none' 不抓內容、直接以列表欄位建立文章
+                
+        Returns:
+            tuple: (直接由列表建立的文章列表, 需要抓取內容的文章列表)
+        """
+        if bodies == 'none':
+            return [self._parse_dcard_post(board, post) for post in posts], []
+        if bodies == 'all':
+            return [], list(posts)
+        urls = [f"{self.dcard_base_url}/f/{board}/p/{post['id']}" for post in posts]
+        revisions = self._known_revisions(f'Dcard-{board}', urls)
+        need = [post for post, url in zip(posts, urls)
+                if url not in revisions or revisions[url] != post.get('updatedAt')]
+        skipped = len(posts) - len(need)
+        if skipped:
+            print(f"略過 {skipped} 篇未更新的文章")
+        return [], need
+
+    def _run_async(self, coro_factory, fallback):
+        """執行非同步抓取，事件迴圈已在執行時改用逐篇抓取"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro_factory())
+        print("偵測到執行中的事件迴圈，改用逐篇抓取模式")
+        return fallback()
+
+    def get_ptt_articles(self, board='Gossiping', pages=1, mode='async', incremental=False,
+                         on_articles=None, cancel_event=None, collect=True, refresh=False):
         """抓取 PTT 文章
         
+        每篇文章的 remote_rev 記錄列表頁上的推文數；保存時推文數改變的既有文章會以新內容覆寫，
+        並重新計算詞頻。
+        
         Args:
             board (str): 看板名稱
-            pages (int): 要抓取的頁數
+            pages (int): 要抓取的頁數（增量與更新模式下為最多往回翻的頁數）
+            mode (str): 'async' 或 'sequential'
+            incremental (bool): 是否從 index.html 往回抓到已知文章為止
+            on_articles (callable): 每解析完文章即以文章列表呼叫
+            cancel_event (threading.Event): 取消事件
+            collect (bool): 是否保留並回傳所有文章
+            refresh (bool): 從 index.html 往回 pages 頁，只抓取新文章與推文數和資料庫不同的文章
             
         Returns:
             list: 文章列表
         """
+        sink = ArticleSink(on_articles, collect)
+        # 上次抓取留下、尚未推進的檢查點已不適用於這次抓取
+        self.pending_checkpoints.pop(f'PTT-{board}', None)
+        if mode == 'sequential' and not incremental and not refresh:
+            self._get_ptt_articles_sequential(board, pages, sink, cancel_event)
+            return sink.articles
+        try:
+            session, fetcher, owned = self._acquire_fetcher(cancel_event)
+            self._ptt_session(board, fetcher.transport)
+            try:
+                if incremental or refresh:
+                    get = lambda url: fetcher.get(url, board)
+                    if refresh:
+                        links, newest = self._collect_changed_ptt_links(get, board, pages), None
+                    else:
+                        links, newest = self._collect_new_ptt_links(get, board, pages)
+                    if mode == 'sequential':
+                        self._fetch_ptt_links_sequential(fetcher.transport, board, links, sink)
+                    else:
+                        self._run_async(
+                            lambda: self._fetch_ptt_links_async(fetcher, board, links, sink),
+                            lambda: self._fetch_ptt_links_sequential(
+                                fetcher.transport, board, links, sink))
+                else:
+                    self._run_async(
+                        lambda: self._crawl_ptt_async(fetcher, board, pages, sink),
+                        lambda: self._get_ptt_articles_sequential(board, pages, sink, cancel_event))
+            finally:
+                if owned:
+                    fetcher.close()
+                    session.close()
+            
+            if fetcher.cancelled:
+                print(f"已取消抓取，保留已抓到的 {sink.count} 篇文章")
+            elif incremental and not refresh and newest is not None and sink.count == len(links):
+                # 每篇新文章都已抓到，保存後才由 commit_checkpoint 推進檢查點
+                self.pending_checkpoints[f'PTT-{board}'] = newest
+            print(f"成功抓取 PTT 文章，共 {sink.count} 篇")
+            return sink.articles
+            
+        except Exception as e:
+            print(f"抓取 PTT 文章時發生錯誤: {str(e)}")
+            return sink.articles
+
+    def _collect_new_ptt_links(self, get, board, max_pages):
+        """從 index.html 沿「上頁」往回走，收集檢查點之後的新文章連結
+        
+        遇到發文時間不晚於檢查點的文章即停止；資料庫中已存在的文章略過但繼續往回走，
+        上次抓取失敗而未保存的文章即使比已保存的文章舊也會再次收集。
+        
+        Args:
+            get (callable): 抓取網址的函式，失敗時回傳 None
+            board (str): 看板名稱
+            max_pages (int): 最多往回翻的頁數
+            
+        Returns:
+            tuple: (由新到舊排列的 (標題, 文章網址, 推文數) 列表, 高水位)；
+                高水位為走過的文章中最新一篇的 (網址, 發文時間)，所有新文章保存後可推進檢查點，
+                列表頁抓取失敗或沒有可辨識發文時間的文章時為 None
+        """
+        checkpoint = self.get_checkpoint(f'PTT-{board}')
+        high_water = checkpoint['last_post_time'] if checkpoint else None
+        
+        new_links = []
+        newest = None
+        url = f'{self.ptt_base_url}/bbs/{board}/index.html'
+        for page in range(max_pages):
+            print(f"正在抓取第 {page + 1} 頁: {url}")
+            response = get(url)
+            if response is None:
+                newest = None
+                break
+            
+            links, prev_url = self._parse_ptt_index_page(response.content)
+            # 列表頁由舊到新排列，反轉後由新到舊比對
+            links.reverse()
+            known = self._known_urls(f'PTT-{board}', [link[1] for link in links])
+            
+            reached_checkpoint = False
+            for title, article_url, nrec in links:
+                post_time = self._ptt_post_time(article_url)
+                if high_water is not None and post_time is not None and post_time <= high_water:
+                    reached_checkpoint = True
+                    break
+                if post_time is not None and (newest is None or post_time > newest[1]):
+                    newest = (article_url, post_time)
+                if article_url not in known:
+                    new_links.append((title, article_url, nrec))
+            
+            if reached_checkpoint or not prev_url:
+                break
+            url = prev_url
+        
+        print(f"找到 {len(new_links)} 篇新文章")
+        return new_links, newest
+
+    def _collect_changed_ptt_links(self, get, board, max_pages):
+        """從 index.html 沿「上頁」往回 max_pages 頁，收集新文章與推文數改變的文章連結
+        
+        推文數以列表頁上的 nrec 與資料庫的 remote_rev 比較，未變動的文章不抓取內文。
+        推文數達 100 以上時列表只顯示「爆」，之後的新推文無法由列表判斷。
+        
+        Args:
+            get (callable): 抓取網址的函式，失敗時回傳 None
+            board (str): 看板名稱
+            max_pages (int): 最多往回翻的頁數
+            
+        Returns:
+            list: 由新到舊排列的 (標題, 文章網址, 推文數) 列表
+        """
+        changed = []
+        unchanged = 0
+        url = f'{self.ptt_base_url}/bbs/{board}/index.html'
+        for page in range(max_pages):
+            print(f"正在抓取第 {page + 1} 頁: {url}")
+            response = get(url)
+            if response is None:
+                break
+            
+            links, prev_url = self._parse_ptt_index_page(response.content)
+            links.reverse()
+            revisions = self._known_revisions(f'PTT-{board}', [link[1] for link in links])
+            for link in links:
+                if link[1] in revisions and revisions[link[1]] == link[2]:
+                    unchanged += 1
+                else:
+                    changed.append(link)
+            
+            if not prev_url:
+                break
+            url = prev_url
+        
+        if unchanged:
+            METRICS.inc('refresh_skipped_total', unchanged, board=board)
+        print(f"找到 {len(changed)} 篇新文章或有新推文的文章，略過 {unchanged} 篇未變動的文章")
+        return changed
+
+    async def _fetch_ptt_links_async(self, fetcher, board, links, sink):
+        """並發抓取指定的 PTT 文章連結，每篇解析完成即送入 sink"""
+        async def fetch_article(title, article_url, nrec):
+            article_response = await fetcher.fetch(article_url, board)
+            if article_response is None:
+                return
+            try:
+                article_data = self._parse_ptt_article(
+                    board, title, article_url, article_response.content, nrec)
+                print(f"找到文章: {title}")
+            except Exception as e:
+                METRICS.inc('parse_errors_total', kind='ptt_article', board=board)
+                print(f"處理文章時發生錯誤: {str(e)}")
+                return
+            METRICS.inc('articles_fetched_total', source=f'PTT-{board}')
+            sink.emit([article_data])
+        
+        await asyncio.gather(*(fetch_article(title, article_url, nrec)
+                               for title, article_url, nrec in links))
+
+    def _fetch_ptt_links_sequential(self, transport, board, links, sink):
+        """逐篇抓取指定的 PTT 文章連結（備援模式）"""
+        for title, article_url, nrec in links:
+            if transport.cancelled:
+                break
+            article_response = transport.get(article_url, board)
+            if article_response is None:
+                continue
+            try:
+                article_data = self._parse_ptt_article(
+                    board, title, article_url, article_response.content, nrec)
+                print(f"找到文章: {title}")
+                sink.emit([article_data])
+            except Exception as e:
+                print(f"處理文章時發生錯誤: {str(e)}")
+            
+            # 隨機延遲 1-2 秒
+            interruptible_sleep(random.uniform(1, 2), transport.cancel_event)
+
+    async def _crawl_ptt_async(self, fetcher, board, pages, sink):
+        """並發抓取 PTT 列表頁與文章頁"""
+        async def crawl_page(page):
+            url = f'{self.ptt_base_url}/bbs/{board}/index{page}.html'
+            print(f"正在抓取第 {page} 頁: {url}")
+            response = await fetcher.fetch(url, board)
+            if response is None:
+                return
+            
+            links = self._parse_ptt_index(response.content)
+            if not links:
+                print("沒有更多文章")
+                return
+            
+            await self._fetch_ptt_links_async(fetcher, board, links, sink)
+        
+        await asyncio.gather(*(crawl_page(page) for page in range(1, pages + 1)))
+
+    def _get_ptt_articles_sequential(self, board, pages, sink, cancel_event=None):
+        """逐頁逐篇抓取 PTT 文章（備援模式）"""
         try:
-            articles = []
-            current_page = 0
-            max_retries = 3
-            session = requests.Session()
-            session.headers.update(self.headers)
-            
-            # 先訪問看板首頁以獲取 cookie
-            index_url = f'https://www.ptt.cc/bbs/{board}/index.html'
-            response = session.get(index_url)
-            
-            # 檢查是否需要年齡驗證
-            if 'over18' in response.url:
-                # 提交年齡驗證表單
-                data = {
-                    'from': f'/bbs/{board}/index.html',
-                    'yes': 'yes'
-                }
-                session.post('https://www.ptt.cc/ask/over18', data=data)
-            
-            while current_page < pages:
+            session = self._create_session()
+            transport = self._create_transport(session, cancel_event)
+            self._ptt_session(board, transport)
+            
+            for page in range(1, pages + 1):
+                if transport.cancelled:
+                    print(f"已取消抓取，保留已抓到的 {sink.count} 篇文章")
+                    break
+                
                 # 訪問 PTT 看板
-                url = f'https://www.ptt.cc/bbs/{board}/index{current_page + 1}.html'
-                print(f"正在抓取第 {current_page + 1} 頁: {url}")
+                url = f'{self.ptt_base_url}/bbs/{board}/index{page}.html'
+                print(f"正在抓取第 {page} 頁: {url}")
+                response = transport.get(url, board)
+                if response is None:
+                    break
                 
-                for retry in range(max_retries):
-                    try:
-                        response = session.get(url, timeout=15)
-                        
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, 'html.parser')
-                            article_links = soup.select('div.title > a')
-                            
-                            if not article_links:
-                                print('DEBUG: soup.prettify() 前 500 字如下:')
-                                print(soup.prettify()[:500])
-                            if not article_links:
-                                print("沒有更多文章")
-                                break
-                            
-                            for link in article_links:
-                                try:
-                                    article_url = f"https://www.ptt.cc{link['href']}"
-                                    article_response = session.get(article_url, timeout=15)
-                                    
-                                    if article_response.status_code == 200:
-                                        article_soup = BeautifulSoup(article_response.text, 'html.parser')
-                                        
-                                        # 提取文章資訊
-                                        title = link.text.strip()
-                                        meta_values = article_soup.select('span.article-meta-value')
-                                        if len(meta_values) >= 4:
-                                            author = meta_values[0].text.strip()
-                                            publish_time = meta_values[3].text.strip()
-                                        else:
-                                            author = "未知"
-                                            publish_time = "未知"
-                                            
-                                        content_div = article_soup.select_one('div#main-content')
-                                        if content_div:
-                                            content = content_div.text.strip()
-                                            # 清理內容
-                                            content = content.split('--')[0]  # 移除簽名檔
-                                            content = '\n'.join(line for line in content.split('\n') 
-                                                              if not line.startswith('※ 發信站:'))
-                                        else:
-                                            content = ""
-                                        
-                                        article_data = {
-                                            'title': title,
-                                            'url': article_url,
-                                            'publish_time': publish_time,
-                                            'source': f'PTT-{board}',
-                                            'author': author,
-                                            'content': content
-                                        }
-                                        
-                                        articles.append(article_data)
-                                        print(f"找到文章: {title}")
-                                        
-                                        # 隨機延遲 1-2 秒
-                                        time.sleep(random.uniform(1, 2))
-                                except Exception as e:
-                                    print(f"處理文章時發生錯誤: {str(e)}")
-                                    continue
-                            
-                            current_page += 1
-                            # 隨機延遲 2-3 秒
-                            time.sleep(random.uniform(2, 3))
-                            break
-                        else:
-                            print(f"訪問失敗 (嘗試 {retry + 1}/{max_retries}): {response.status_code}")
-                            if retry < max_retries - 1:
-                                time.sleep(random.uniform(3, 5))
-                    except requests.exceptions.Timeout:
-                        print(f"訪問超時 (嘗試 {retry + 1}/{max_retries})")
-                        if retry < max_retries - 1:
-                            time.sleep(random.uniform(3, 5))
-                    except Exception as e:
-                        print(f"訪問時發生錯誤 (嘗試 {retry + 1}/{max_retries}): {str(e)}")
-                        if retry < max_retries - 1:
-                            time.sleep(random.uniform(3, 5))
+                article_links = self._parse_ptt_index(response.content)
+                if not article_links:
+                    print("沒有更多文章")
+                    break
+                self._fetch_ptt_links_sequential(transport, board, article_links, sink)
+                
+                # 隨機延遲 2-3 秒
+                interruptible_sleep(random.uniform(2, 3), cancel_event)
             
-            print(f"成功抓取 PTT 文章，共 {len(articles)} 篇")
-            return articles
+            session.close()
+            print(f"成功抓取 PTT 文章，共 {sink.count} 篇")
             
         except Exception as e:
             print(f"抓取 PTT 文章時發生錯誤: {str(e)}")
-            return []
 
-    def get_dcard_articles(self, board='funny', pages=1):
+    def get_dcard_articles(self, board='funny', pages=1, mode='async', on_articles=None,
+                           cancel_event=None, bodies='changed', collect=True):
         """抓取 Dcard 文章
         
+        列表以上一頁最後一篇文章的 id 作為 before 游標往回翻頁。
+        
         Args:
             board (str): 看板名稱
             pages (int): 要抓取的頁數
+            mode (str): 'async' 或 'sequential'
+            on_articles (callable): 每解析完文章即以文章列表呼叫
+            cancel_event (threading.Event): 取消事件
+            bodies (str): 'changed'（預設）只為資料庫沒有或 updatedAt 改變的文章抓取內容，
+                'all' 每篇都抓取內容，'none' 只保存列表欄位（內容為摘要）
+            collect (bool): 是否保留並回傳所有文章
             
         Returns:
-            list: 文章列表
+            list: 文章列表，'changed' 模式下不含未更新的文章
         """
+        if bodies not in ('changed', 'all', 'none'):
+            raise ValueError(f"不支援的內容抓取方式: {bodies}")
+        sink = ArticleSink(on_articles, collect)
+        if mode == 'sequential':
+            self._get_dcard_articles_sequential(board, pages, sink, cancel_event, bodies)
+            return sink.articles
+        try:
+            session, fetcher, owned = self._acquire_fetcher(cancel_event)
+            try:
+                self._run_async(
+                    lambda: self._crawl_dcard_async(fetcher, board, pages, sink, bodies),
+                    lambda: self._get_dcard_articles_sequential(
+                        board, pages, sink, cancel_event, bodies))
+            finally:
+                if owned:
+                    fetcher.close()
+                    session.close()
+            
+            if fetcher.cancelled:
+                print(f"已取消抓取，保留已抓到的 {sink.count} 篇文章")
+            print(f"成功抓取 Dcard 文章，共 {sink.count} 篇")
+            return sink.articles
+            
+        except Exception as e:
+            print(f"抓取 Dcard 文章時發生錯誤: {str(e)}")
+            return sink.articles
+
+    async def _crawl_dcard_async(self, fetcher, board, pages, sink, bodies='changed'):
+        """沿游標逐頁抓取 Dcard 列表，每頁並發抓取需要的文章內容"""
+        before = None
+        for page in range(pages):
+            url = self._dcard_list_url(board, before)
+            print(f"正在抓取第 {page + 1} 頁: {url}")
+            response = await fetcher.fetch(url, board)
+            if response is None:
+                break
+            
+            start = time.perf_counter()
+            posts = response.json()
+            METRICS.observe('parse_seconds', time.perf_counter() - start, kind='dcard_list')
+            if not posts:
+                print("沒有更多文章")
+                break
+            before = posts[-1]['id']
+            
+            page_articles, need = self._select_dcard_bodies(board, posts, bodies)
+            responses = await fetcher.fetch_all(
+                [f"{self.dcard_base_url}/_api/posts/{post['id']}" for post in need], board)
+            for article_response in responses:
+                if article_response is None:
+                    continue
+                try:
+                    start = time.perf_counter()
+                    article_data = self._parse_dcard_post(board, article_response.json())
+                    METRICS.observe('parse_seconds', time.perf_counter() - start, kind='dcard_post')
+                    page_articles.append(article_data)
+                    print(f"找到文章: {article_data['title']}")
+                except Exception as e:
+                    METRICS.inc('parse_errors_total', kind='dcard_post', board=board)
+                    print(f"處理文章時發生錯誤: {str(e)}")
+            METRICS.inc('articles_fetched_total', len(page_articles), source=f'Dcard-{board}')
+            sink.emit(page_articles)
+
+    def _get_dcard_articles_sequential(self, board, pages, sink, cancel_event=None,
+                                       bodies='changed'):
+        """逐頁逐篇抓取 Dcard 文章（備援模式）"""
         try:
-            articles = []
-            current_page = 0
-            max_retries = 3
+            before = None
+            session = self._create_session()
+            transport = self._create_transport(session, cancel_event)
             
-            while current_page < pages:
+            for page in range(1, pages + 1):
+                if transport.cancelled:
+                    print(f"已取消抓取，保留已抓到的 {sink.count} 篇文章")
+                    break
+                
                 # 訪問 Dcard API
-                url = f'https://www.dcard.tw/_api/forums/{board}/posts?popular=false&limit=30&before={current_page * 30}'
-                print(f"正在抓取第 {current_page + 1} 頁: {url}")
+                url = self._dcard_list_url(board, before)
+                print(f"正在抓取第 {page} 頁: {url}")
+                response = transport.get(url, board)
+                if response is None:
+                    break
+                
+                data = response.json()
+                if not data:
+                    print("沒有更多文章")
+                    break
+                before = data[-1]['id']
+                
+                page_articles, need = self._select_dcard_bodies(board, data, bodies)
+                sink.emit(page_articles)
                 
-                for retry in range(max_retries):
+                for post in need:
+                    if transport.cancelled:
+                        break
+                    article_response = transport.get(
+                        f"{self.dcard_base_url}/_api/posts/{post['id']}", board)
+                    if article_response is None:
+                        continue
                     try:
-                        response = requests.get(
-                            url, 
-                            headers=self.headers,
-                            timeout=15
-                        )
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            
-                            if not data:
-                                print("沒有更多文章")
-                                break
-                            
-                            for post in data:
-                                try:
-                                    article_url = f"https://www.dcard.tw/f/{board}/p/{post['id']}"
-                                    article_response = requests.get(
-                                        f"https://www.dcard.tw/_api/posts/{post['id']}",
-                                        headers=self.headers,
-                                        timeout=15
-                                    )
-                                    
-                                    if article_response.status_code == 200:
-                                        article_data = article_response.json()
-                                        
-                                        # 提取文章資訊
-                                        title = article_data['title']
-                                        author = article_data['school'] or '匿名'
-                                        publish_time = article_data['createdAt']
-                                        content = article_data['content']
-                                        
-                                        article_data = {
-                                            'title': title,
-                                            'url': article_url,
-                                            'publish_time': publish_time,
-                                            'source': f'Dcard-{board}',
-                                            'author': author,
-                                            'content': content
-                                        }
-                                        
-                                        articles.append(article_data)
-                                        print(f"找到文章: {title}")
-                                        
-                                        # 隨機延遲 1-2 秒
-                                        time.sleep(random.uniform(1, 2))
-                                except Exception as e:
-                                    print(f"處理文章時發生錯誤: {str(e)}")
-                                    continue
-                            
-                            current_page += 1
-                            # 隨機延遲 2-3 秒
-                            time.sleep(random.uniform(2, 3))
-                            break
-                        else:
-                            print(f"訪問失敗 (嘗試 {retry + 1}/{max_retries}): {response.status_code}")
-                            if retry < max_retries - 1:
-                                time.sleep(random.uniform(3, 5))
-                    except requests.exceptions.Timeout:
-                        print(f"訪問超時 (嘗試 {retry + 1}/{max_retries})")
-                        if retry < max_retries - 1:
-                            time.sleep(random.uniform(3, 5))
+                        article_data = self._parse_dcard_post(board, article_response.json())
+                        print(f"找到文章: {article_data['title']}")
+                        sink.emit([article_data])
                     except Exception as e:
-                        print(f"訪問時發生錯誤 (嘗試 {retry + 1}/{max_retries}): {str(e)}")
-                        if retry < max_retries - 1:
-                            time.sleep(random.uniform(3, 5))
+                        print(f"處理文章時發生錯誤: {str(e)}")
+                    
+                    # 隨機延遲 1-2 秒
+                    interruptible_sleep(random.uniform(1, 2), cancel_event)
+                
+                # 隨機延遲 2-3 秒
+                interruptible_sleep(random.uniform(2, 3), cancel_event)
             
-            print(f"成功抓取 Dcard 文章，共 {len(articles)} 篇")
-            return articles
+            session.close()
+            print(f"成功抓取 Dcard 文章，共 {sink.count} 篇")
             
         except Exception as e:
             print(f"抓取 Dcard 文章時發生錯誤: {str(e)}")
-            return []
     
-    def save_articles(self, articles):
+    def save_articles(self, articles, bulk=True, on_conflict='ignore'):
         """保存文章到資料庫
         
         Args:
             articles (list): 文章列表
+            bulk (bool): 是否以 executemany 在單一交易中批次寫入，False 時逐篇檢查後寫入
+            on_conflict (str): 批次模式下遇到相同 (source, url) 時的處理方式，
+                'ignore' 為略過，'update' 為以新內容覆寫
+            
+        Returns:
+            int: 新增的文章數，詳細寫入統計（含每秒寫入筆數）見 self.last_save_stats
         """
+        with self.db_lock:
+            if bulk:
+                return self._save_articles_bulk(articles, on_conflict)
+            return self._save_articles_each(articles)
+
+    def _save_articles_each(self, articles):
+        """逐篇檢查後寫入文章（舊版寫入路徑）"""
         try:
+            start = time.perf_counter()
             new_count = 0
             duplicate_count = 0
+            near_duplicate_count = 0
             error_count = 0
             
-            # 分析詞頻
-            word_freq = analyze_articles(articles)
-            word_freq_json = json.dumps(dict(word_freq), ensure_ascii=False)
-            
             for article in articles:
                 try:
                     # 檢查文章是否已存在
                     self.cursor.execute('''
                         SELECT id FROM articles 
-                        WHERE title = ? AND url = ? AND source = ?
-                    ''', (article['title'], article['url'], article['source']))
+                        WHERE source = ? AND url = ?
+                    ''', (article['source'], article['url']))
                     
                     if not self.cursor.fetchone():
+                        # 分析這篇文章的詞頻
+                        counts = self._count_terms(article)
+                        
                         # 插入新文章
                         self.cursor.execute('''
-                            INSERT INTO articles (title, url, publish_time, source, author, content, word_freq)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            INSERT INTO articles (title, url, publish_time, published_at, source,
+                                                  author, content, word_freq)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                         ''', (
                             article['title'],
                             article['url'],
                             article['publish_time'],
+                            parse_publish_time(article['publish_time']),
                             article['source'],
                             article['author'],
-                            article['content'],
-                            word_freq_json
+                            self.content_store.encode(article['content']),
+                            json.dumps(counts, ensure_ascii=False)
                         ))
+                        article_id = self.cursor.lastrowid
+                        self._index_terms({article_id: counts})
+                        self._index_search({article_id: article})
+                        near_duplicate_count += self._index_near_duplicates({article_id: counts})
                         new_count += 1
                     else:
                         duplicate_count += 1
@@ -330,32 +1230,1098 @@ class PTTDcardCrawler:
                     continue
             
             self.conn.commit()
-            print(f"成功保存 {new_count} 篇新文章")
-            print(f"跳過 {duplicate_count} 篇重複文章")
-            if error_count > 0:
-                print(f"保存失敗 {error_count} 篇文章")
+            self._report_save(new_count, 0, duplicate_count, error_count, start,
+                              near_duplicate_count)
             return new_count
         except Exception as e:
             print(f"保存文章時發生錯誤: {str(e)}")
             return 0
-    
-    def get_all_articles(self):
-        """獲取所有文章
+
+    def _save_articles_bulk(self, articles, on_conflict='ignore'):
+        """以 INSERT ... ON CONFLICT 搭配 executemany 在單一交易中批次寫入文章"""
+        if on_conflict not in ('ignore', 'update'):
+            raise ValueError(f"不支援的衝突處理方式: {on_conflict}")
         
-        Returns:
-            list: 文章列表
-        """
         try:
-            self.cursor.execute('''
-                SELECT title, url, publish_time, source, author, content
-                FROM articles
-                ORDER BY publish_time DESC
+            start = time.perf_counter()
+            error_count = 0
+            
+            # 只為新文章與內容變動的文章分析詞頻與建立檢索索引；
+            # 帶有 remote_rev 且與資料庫不同的文章代表遠端已更新，即使 on_conflict='ignore' 也覆寫
+            existing = self._existing_articles(articles)
+            changed = {}
+            valid = []
+            for article in articles:
+                try:
+                    key = (article['source'], article['url'])
+                    current = existing.get(key)
+                    revised = current is not None and article.get('remote_rev') is not None and \
+                        article.get('remote_rev') != current[3]
+                    if key not in changed and (current is None or (
+                            (on_conflict == 'update' or revised) and
+                            (current[1], current[2]) != (article['title'], article['content']))):
+                        changed[key] = article
+                    valid.append((key, article))
+                except (KeyError, TypeError) as e:
+                    print(f"保存文章時發生錯誤: {str(e)}")
+                    error_count += 1
+            term_counts = dict(zip(changed, self._count_terms_batch(list(changed.values()))))
+            
+            rows = []
+            for key, article in valid:
+                try:
+                    rows.append((
+                        article['title'],
+                        article['url'],
+                        article['publish_time'],
+                        parse_publish_time(article['publish_time']),
+                        article['source'],
+                        article['author'],
+                        self.content_store.encode(article['content']),
+                        json.dumps(term_counts.get(key, {}), ensure_ascii=False),
+                        article.get('remote_rev')
+                    ))
+                except (KeyError, TypeError) as e:
+                    print(f"保存文章時發生錯誤: {str(e)}")
+                    error_count += 1
+            
+            revised_clause = 'excluded.remote_rev IS NOT NULL AND remote_rev IS NOT excluded.remote_rev'
+            if on_conflict == 'update':
+                # 內容可能以不同方式壓縮或已封存，比較還原後的文字
+                condition = (f'content_text(content) IS NOT content_text(excluded.content) '
+                             f'OR title IS NOT excluded.title '
+                             f'OR published_at IS NOT excluded.published_at OR ({revised_clause})')
+            else:
+                condition = revised_clause
+            conflict_clause = f'''
+                ON CONFLICT(source, url) DO UPDATE SET
+                    title = excluded.title,
+                    publish_time = excluded.publish_time,
+                    published_at = excluded.published_at,
+                    author = excluded.author,
+                    content = excluded.content,
+                    word_freq = CASE WHEN content_text(content) IS content_text(excluded.content)
+                                          AND title IS excluded.title
+                                     THEN word_freq ELSE excluded.word_freq END,
+                    remote_rev = COALESCE(excluded.remote_rev, remote_rev)
+                WHERE {condition}
+            '''
+            
+            try:
+                write_start = time.perf_counter()
+                max_id_before = self.cursor.execute(
+                    'SELECT COALESCE(MAX(id), 0) FROM articles').fetchone()[0]
+                changes_before = self.conn.total_changes
+                self.cursor.executemany(f'''
+                    INSERT INTO articles (title, url, publish_time, published_at, source,
+                                          author, content, word_freq, remote_rev)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    {conflict_clause}
+                ''', rows)
+                written = self.conn.total_changes - changes_before
+                
+                # 新文章的 id 一定大於寫入前的最大 id
+                self.cursor.execute(
+                    'SELECT id, source, url FROM articles WHERE id > ?', (max_id_before,))
+                inserted = {(source, url): article_id
+                            for article_id, source, url in self.cursor.fetchall()}
+                new_count = len(inserted)
+                
+                changed_ids = {}
+                for key in changed:
+                    article_id = inserted.get(key)
+                    if article_id is None and key in existing:
+                        article_id = existing[key][0]
+                    if article_id is not None:
+                        changed_ids[article_id] = key
+                # 覆寫前的發文日期由 existing 取得，每日彙總從原本的日期扣除
+                self._index_terms({article_id: term_counts[key]
+                                   for article_id, key in changed_ids.items()},
+                                  {existing[key][0]: (key[0], existing[key][4])
+                                   for key in changed if key in existing})
+                if written > new_count:
+                    # 只有發文時間改變的文章，詞頻不變但每日彙總要移到新的日期
+                    self._move_term_daily({existing[key][0]: (key[0], existing[key][4])
+                                           for key, _ in valid
+                                           if key in existing and key not in changed})
+                self._index_search({article_id: changed[key]
+                                    for article_id, key in changed_ids.items()})
+                near_duplicate_count = self._index_near_duplicates(
+                    {article_id: term_counts[key] for article_id, key in changed_ids.items()})
+                
+                self.conn.commit()
+                METRICS.observe('db_write_seconds', time.perf_counter() - write_start, op='save_articles')
+            except Exception:
+                self.conn.rollback()
+                # 回滾後詞彙 id 對照表可能含有未寫入的 id
+                self.token_cache.invalidate()
+                raise
+            
+            updated_count = written - new_count
+            duplicate_count = len(rows) - written
+            self._report_save(new_count, updated_count, duplicate_count, error_count, start,
+                              near_duplicate_count)
+            return new_count
+        except Exception as e:
+            print(f"保存文章時發生錯誤: {str(e)}")
+            # 交易已回滾，整批都算失敗，呼叫端（例如 crawl_to_db）據此不推進檢查點
+            self.last_save_stats = {'new': 0, 'updated': 0, 'duplicate': 0, 'errors': len(articles),
+                                    'near_duplicates': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+            return 0
+
+    def _existing_articles(self, articles):
+        """查詢批次中已存在於資料庫的文章
+        
+        Returns:
+            dict: (source, url) 對應 (id, title, content, remote_rev, 每日彙總的日期) 的字典，
+                沒有發文時間的文章日期為 None
+        """
+        urls_by_source = {}
+        for article in articles:
+            try:
+                urls_by_source.setdefault(article['source'], set()).add(article['url'])
+            except (KeyError, TypeError):
+                continue
+        
+        existing = {}
+        for source, urls in urls_by_source.items():
+            urls = list(urls)
+            for i in range(0, len(urls), SQL_VARIABLE_CHUNK):
+                chunk = urls[i:i + SQL_VARIABLE_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                self.cursor.execute(f'''
+                    SELECT id, url, title, content_text(content), remote_rev,
+                           (published_at + {DAY_OFFSET}) / 86400
+                    FROM articles
+                    WHERE source = ? AND url IN ({placeholders})
+                ''', [source] + chunk)
+                for article_id, url, title, content, remote_rev, day in self.cursor.fetchall():
+                    existing[(source, url)] = (article_id, title, content, remote_rev, day)
+        return existing
+
+    def _count_terms(self, article):
+        """計算單篇文章的詞頻
+        
+        Returns:
+            dict: 詞對應出現次數的字典
+        """
+        return self._count_terms_batch([article])[0]
+
+    def _count_terms_batch(self, articles):
+        """計算多篇文章各自的詞頻，先查詢斷詞快取，文章數多時以行程池平行斷詞
+        
+        已由 precompute_terms 算好詞頻（term_counts）的文章直接使用結果。
+        
+        Returns:
+            list: 與輸入順序相同的 {詞: 次數} 字典列表
+        """
+        results = [article.get('term_counts') for article in articles]
+        missing = [i for i, counts in enumerate(results) if counts is None]
+        if not missing:
+            return results
+        with METRICS.timer('tokenize_seconds'):
+            computed = count_terms_per_article([articles[i]['content'] for i in missing],
+                                               workers=self.tokenize_workers, cache=self.token_cache)
+        METRICS.inc('tokenized_articles_total', len(computed))
+        for i, counts in zip(missing, computed):
+            results[i] = counts
+        return results
+
+    def precompute_terms(self, articles):
+        """寫入前先計算文章詞頻，結果存入各文章的 term_counts
+        
+        供串流管線的斷詞階段在其他執行緒呼叫：只在查詢與寫入斷詞快取時持有資料庫鎖，
+        斷詞本身與抓取、寫入同時進行。
+        
+        Args:
+            articles (list): Article 列表
+        """
+        contents = [article['content'] or '' for article in articles]
+        with self.db_lock:
+            cached = self.token_cache.get_many(contents)
+            self.conn.commit()
+        missing = list(dict.fromkeys(content for content, counts in zip(contents, cached)
+                                     if counts is None))
+        computed = {}
+        if missing:
+            with METRICS.timer('tokenize_seconds'):
+                computed = dict(zip(missing, count_terms_per_article(
+                    missing, workers=self.tokenize_workers)))
+            METRICS.inc('tokenized_articles_total', len(missing))
+            with self.db_lock:
+                self.token_cache.put_many(missing, [computed[content] for content in missing])
+                self.conn.commit()
+        for article, content, counts in zip(articles, contents, cached):
+            article['term_counts'] = counts if counts is not None else computed[content]
+
+    def _get_term_ids(self, terms):
+        """取得詞彙在字典中的 id，不存在的詞彙會先新增；對照表與斷詞快取共用
+        
+        Returns:
+            dict: 詞對應 id 的字典
+        """
+        return self.token_cache.term_ids(terms)
+
+    def _index_terms(self, term_counts, previous_days=None):
+        """寫入文章的詞頻，覆蓋該文章原有的詞頻（不提交交易）
+        
+        Args:
+            term_counts (dict): 文章 id 對應 {詞: 次數} 的字典
+            previous_days (dict): 文章 id 對應寫入前的 (source, day)；已覆寫 articles 的呼叫端
+                須提供，原有的詞頻才會從原本的日期扣除。未提供的文章以資料表目前的值為準
+        """
+        if not term_counts:
+            return
+        
+        # 先從每日彙總扣除文章原有的詞頻，再覆寫 article_terms
+        article_ids = list(term_counts)
+        days = self._article_days(article_ids)
+        old_days = {**days, **(previous_days or {})}
+        self._add_term_daily(
+            [old_days[article_id] + (term_id, -count)
+             for article_id, term_id, count in self._article_term_rows(article_ids)
+             if old_days.get(article_id, (None, None))[1] is not None])
+        
+        self.cursor.executemany('DELETE FROM article_terms WHERE article_id = ?',
+                                [(article_id,) for article_id in article_ids])
+        term_ids = self._get_term_ids(
+            {term for counts in term_counts.values() for term in counts})
+        self.cursor.executemany(
+            'INSERT INTO article_terms (article_id, term_id, count) VALUES (?, ?, ?)',
+            [(article_id, term_ids[term], count)
+             for article_id, counts in term_counts.items()
+             for term, count in counts.items()])
+        self._add_term_daily(
+            [days[article_id] + (term_ids[term], count)
+             for article_id, counts in term_counts.items() if days[article_id][1] is not None
+             for term, count in counts.items()])
+
+    def _move_term_daily(self, previous_days):
+        """將發文日期改變的文章詞頻，從每日彙總原本的日期移到新的日期（不提交交易）
+        
+        Args:
+            previous_days (dict): 文章 id 對應寫入前的 (source, day)，day 為 None 表示原本沒有發文時間
+        """
+        if not previous_days:
+            return
+        days = self._article_days(list(previous_days))
+        moves = {article_id: (previous, days[article_id])
+                 for article_id, previous in previous_days.items()
+                 if article_id in days and days[article_id] != previous}
+        deltas = []
+        for article_id, term_id, count in self._article_term_rows(list(moves)):
+            previous, current = moves[article_id]
+            if previous[1] is not None:
+                deltas.append(previous + (term_id, -count))
+            if current[1] is not None:
+                deltas.append(current + (term_id, count))
+        self._add_term_daily(deltas)
+
+    def _article_days(self, article_ids):
+        """查詢文章在每日彙總中的日期
+        
+        Returns:
+            dict: 文章 id 對應 (source, day) 的字典，沒有發文時間的文章 day 為 None
+        """
+        days = {}
+        for i in range(0, len(article_ids), SQL_VARIABLE_CHUNK):
+            chunk = article_ids[i:i + SQL_VARIABLE_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            self.cursor.execute(f'''
+                SELECT id, source, (published_at + {DAY_OFFSET}) / 86400 FROM articles
+                WHERE id IN ({placeholders})
+            ''', chunk)
+            for article_id, source, day in self.cursor.fetchall():
+                days[article_id] = (source, day)
+        return days
+
+    def _article_term_rows(self, article_ids):
+        """查詢文章目前的詞頻
+        
+        Returns:
+            list: (article_id, term_id, count) 元組列表
+        """
+        rows = []
+        for i in range(0, len(article_ids), SQL_VARIABLE_CHUNK):
+            chunk = article_ids[i:i + SQL_VARIABLE_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            self.cursor.execute(f'''
+                SELECT article_id, term_id, count FROM article_terms
+                WHERE article_id IN ({placeholders})
+            ''', chunk)
+            rows.extend(self.cursor.fetchall())
+        return rows
+
+    def _add_term_daily(self, deltas):
+        """將 (source, day, term_id, 增減量) 累加到每日彙總（不提交交易）"""
+        merged = {}
+        for source, day, term_id, delta in deltas:
+            key = (source, day, term_id)
+            merged[key] = merged.get(key, 0) + delta
+        if not merged:
+            return
+        self.cursor.executemany('''
+            INSERT INTO term_daily (source, day, term_id, count) VALUES (?, ?, ?, ?)
+            ON CONFLICT(source, day, term_id) DO UPDATE SET count = count + excluded.count
+        ''', [key + (delta,) for key, delta in merged.items() if delta])
+        self.cursor.executemany(
+            'DELETE FROM term_daily WHERE source = ? AND day = ? AND term_id = ? AND count <= 0',
+            [key for key, delta in merged.items() if delta < 0])
+
+    def rebuild_term_daily(self):
+        """由 article_terms 重新建立每日詞頻彙總
+        
+        Returns:
+            int: 彙總表的列數
+        """
+        try:
+            self.cursor.execute('DELETE FROM term_daily')
+            self.cursor.execute(f'''
+                INSERT INTO term_daily (source, day, term_id, count)
+                SELECT a.source, (a.published_at + {DAY_OFFSET}) / 86400, at.term_id, SUM(at.count)
+                FROM article_terms at
+                JOIN articles a ON a.id = at.article_id
+                WHERE a.published_at IS NOT NULL
+                GROUP BY 1, 2, 3
             ''')
-            return self.cursor.fetchall()
+            rows = self.cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        print(f"已建立 {rows} 筆每日詞頻彙總")
+        return rows
+
+    def rebuild_article_terms(self, only_missing=True, batch_size=500):
+        """重新計算文章的詞頻並寫入 article_terms
+        
+        Args:
+            only_missing (bool): 只處理尚未建立詞頻的文章
+            batch_size (int): 每批處理並提交的文章數
+            
+        Returns:
+            int: 處理的文章數
+        """
+        reader = self.conn.cursor()
+        query = 'SELECT id, content_text(content) FROM articles WHERE id > ?'
+        if only_missing:
+            query += ' AND NOT EXISTS (SELECT 1 FROM article_terms WHERE article_id = articles.id)'
+        query += ' ORDER BY id LIMIT ?'
+        
+        processed = 0
+        last_id = 0
+        while True:
+            rows = reader.execute(query, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            counts = self._count_terms_batch([{'content': content} for _, content in rows])
+            self._index_terms({row[0]: row_counts for row, row_counts in zip(rows, counts)})
+            self.conn.commit()
+            processed += len(rows)
+            last_id = rows[-1][0]
+            print(f"已建立 {processed} 篇文章的詞頻")
+        return processed
+
+    def _segment(self, text):
+        """將文字斷詞供全文檢索使用
+        
+        Returns:
+            tuple: (精確模式斷詞結果, 搜尋模式額外的子詞)，皆以 SEGMENT_SEPARATOR 連接
+        """
+        words = jieba.lcut(text or '')
+        word_set = set(words)
+        extra = [word for word in jieba.cut_for_search(text or '')
+                 if word not in word_set and word.strip()]
+        return SEGMENT_SEPARATOR.join(words), SEGMENT_SEPARATOR.join(extra)
+
+    def _article_segments(self, article):
+        """文章的全文檢索斷詞結果，已由 precompute_segments 算好時直接使用
+        
+        Returns:
+            tuple: (標題, 內容, 搜尋模式額外的子詞)
+        """
+        segments = article.get('segments')
+        if segments is None:
+            title, _ = self._segment(article['title'])
+            content, extra = self._segment(article['content'])
+            segments = (title, content, extra)
+        return tuple(segments)
+
+    def precompute_segments(self, articles):
+        """寫入前先計算全文檢索的斷詞結果，存入各文章的 segments
+        
+        供多行程抓取的抓取行程呼叫，寫入行程不必再斷詞。
+        
+        Args:
+            articles (list): Article 列表
+        """
+        for article in articles:
+            article['segments'] = self._article_segments(article)
+
+    def _segments_text(self, article_ids):
+        """讀取已寫入的斷詞結果並還原為文字
+        
+        Args:
+            article_ids (list): 文章 id 列表
+            
+        Returns:
+            dict: 文章 id 對應 (標題, 內容, 額外子詞) 的字典，沒有斷詞結果的文章不在其中
+        """
+        decode = self.content_store.decode
+        segments = {}
+        for i in range(0, len(article_ids), SQL_VARIABLE_CHUNK):
+            chunk = article_ids[i:i + SQL_VARIABLE_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for article_id, *values in self.cursor.execute(f'''
+                SELECT article_id, title, content, extra FROM article_segments
+                WHERE article_id IN ({placeholders})
+            ''', chunk).fetchall():
+                segments[article_id] = tuple(map(decode, values))
+        return segments
+
+    def _index_search(self, articles_by_id):
+        """寫入文章的斷詞結果並同步全文檢索索引（不提交交易）
+        
+        已有斷詞結果的文章先以舊的文字移除索引項目，再寫入新的項目；
+        斷詞結果改以壓縮或封存的形式重新寫入時，還原後的文字不變，不需經過這裡。
+        
+        Args:
+            articles_by_id (dict): 文章 id 對應文章資料的字典
+        """
+        segments = {article_id: self._article_segments(article)
+                    for article_id, article in articles_by_id.items()}
+        previous = self._segments_text(list(segments))
+        self.cursor.executemany('''
+            INSERT INTO articles_fts (articles_fts, rowid, title, content, extra)
+            VALUES ('delete', ?, ?, ?, ?)
+        ''', [(article_id,) + values for article_id, values in previous.items()])
+        
+        encode = self.content_store.encode
+        self.cursor.executemany('''
+            INSERT INTO article_segments (article_id, title, content, extra)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(article_id) DO UPDATE SET
+                title = excluded.title,
+                content = excluded.content,
+                extra = excluded.extra
+        ''', [(article_id,) + tuple(map(encode, values)) for article_id, values in segments.items()])
+        self.cursor.executemany(
+            'INSERT INTO articles_fts (rowid, title, content, extra) VALUES (?, ?, ?, ?)',
+            [(article_id,) + values for article_id, values in segments.items()])
+
+    def rebuild_search_index(self, only_missing=True, batch_size=500):
+        """重新建立文章的全文檢索索引
+        
+        Args:
+            only_missing (bool): 只處理尚未建立索引的文章
+            batch_size (int): 每批處理並提交的文章數
+            
+        Returns:
+            int: 處理的文章數
+        """
+        reader = self.conn.cursor()
+        query = 'SELECT id, title, content_text(content) FROM articles WHERE id > ?'
+        if only_missing:
+            query += ' AND NOT EXISTS (SELECT 1 FROM article_segments WHERE article_id = articles.id)'
+        query += ' ORDER BY id LIMIT ?'
+        
+        processed = 0
+        last_id = 0
+        while True:
+            rows = reader.execute(query, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            self._index_search({article_id: {'title': title, 'content': content}
+                                for article_id, title, content in rows})
+            self.conn.commit()
+            processed += len(rows)
+            last_id = rows[-1][0]
+            print(f"已建立 {processed} 篇文章的檢索索引")
+        if not only_missing:
+            # 依斷詞結果重建整個索引，清除以其他用戶端刪除文章後留下的索引項目
+            self.cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+            self.conn.commit()
+        return processed
+
+    def _index_near_duplicates(self, term_counts):
+        """為新增或內容變動的文章建立指紋，並將近似重複的文章連結到代表文章（不提交交易）
+        
+        依 id 順序處理，同一批中較晚的文章也會比對到較早的文章；
+        代表文章為最早收錄的同內容文章，其 canonical_id 為 NULL。
+        
+        Args:
+            term_counts (dict): 文章 id 對應 {詞: 次數} 的字典
+            
+        Returns:
+            int: 標記為近似重複的文章數
+        """
+        links = []
+        for article_id in sorted(term_counts):
+            fingerprint = simhash(term_counts[article_id])
+            self.near_duplicates.remove([article_id])
+            canonical_id = None
+            if fingerprint is not None:
+                match = self.near_duplicates.find(fingerprint)
+                if match is not None:
+                    row = self.cursor.execute(
+                        'SELECT canonical_id FROM articles WHERE id = ?', (match,)).fetchone()
+                    canonical_id = (row[0] or match) if row else None
+                self.near_duplicates.add(article_id, fingerprint)
+            if canonical_id == article_id:
+                canonical_id = None
+            links.append((canonical_id, article_id))
+        
+        self.cursor.executemany('UPDATE articles SET canonical_id = ? WHERE id = ?', links)
+        # 內容變動後成為重複文章時，原本以它為代表的文章改指向新的代表
+        self.cursor.executemany('UPDATE articles SET canonical_id = ? WHERE canonical_id = ?',
+                                [link for link in links if link[0] is not None])
+        count = sum(1 for canonical_id, _ in links if canonical_id is not None)
+        if count:
+            METRICS.inc('near_duplicates_total', count)
+        return count
+
+    def rebuild_near_duplicates(self, batch_size=500):
+        """由已保存的詞頻重新建立所有文章的指紋與近似重複標記
+        
+        Args:
+            batch_size (int): 每批處理並提交的文章數
+            
+        Returns:
+            int: 標記為近似重複的文章數
+        """
+        try:
+            self.near_duplicates.clear()
+            self.cursor.execute('UPDATE articles SET canonical_id = NULL WHERE canonical_id IS NOT NULL')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        reader = self.conn.cursor()
+        processed = 0
+        marked = 0
+        last_id = 0
+        while True:
+            ids = [row[0] for row in reader.execute(
+                'SELECT id FROM articles WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, batch_size)).fetchall()]
+            if not ids:
+                break
+            term_counts = {article_id: {} for article_id in ids}
+            placeholders = ','.join('?' * len(ids))
+            reader.execute(f'''
+                SELECT at.article_id, t.term, at.count FROM article_terms at
+                JOIN terms t ON t.id = at.term_id
+                WHERE at.article_id IN ({placeholders})
+            ''', ids)
+            for article_id, term, count in reader.fetchall():
+                term_counts[article_id][term] = count
+            try:
+                marked += self._index_near_duplicates(term_counts)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            processed += len(ids)
+            last_id = ids[-1]
+            print(f"已建立 {processed} 篇文章的指紋")
+        print(f"共標記 {marked} 篇近似重複文章")
+        return marked
+
+    def train_content_dictionary(self, codec=None, samples=DICTIONARY_SAMPLES):
+        """以最近收錄的文章訓練內容壓縮字典，之後壓縮的內容改用新字典
+        
+        Args:
+            codec (str): 'zlib' 或 'zstd'，預設為建立爬蟲時指定的 compression
+            samples (int): 取樣的文章數
+            
+        Returns:
+            int: 字典 id，失敗時為 None
+        """
+        try:
+            reader = self.conn.cursor()
+            rows = reader.execute(
+                'SELECT content_text(content) FROM articles ORDER BY id DESC LIMIT ?',
+                (samples,)).fetchall()
+            dictionary_id = self.content_store.train([row[0] for row in rows], codec)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"訓練壓縮字典時發生錯誤: {str(e)}")
+            return None
+        print(f"已由 {len(rows)} 篇文章訓練壓縮字典 #{dictionary_id}")
+        return dictionary_id
+
+    def _recompress_rows(self, table, key, columns, batch_size):
+        """以目前的壓縮設定重新寫入資料表的文字欄位，略過已封存的值
+        
+        Returns:
+            tuple: (改寫的列數, 改寫前位元組數, 改寫後位元組數)
+        """
+        def size(value):
+            return len(value.encode('utf-8') if isinstance(value, str) else value or b'')
+        
+        reader = self.conn.cursor()
+        rewritten = 0
+        size_before = size_after = 0
+        last_id = 0
+        while True:
+            rows = reader.execute(f'''
+                SELECT {key}, {', '.join(columns)} FROM {table}
+                WHERE {key} > ? ORDER BY {key} LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, *values in rows:
+                encoded = [value if value is None or self.content_store.is_archived(value)
+                           else self.content_store.encode(self.content_store.decode(value))
+                           for value in values]
+                if encoded != values:
+                    updates.append(encoded + [row_id])
+                    size_before += sum(map(size, values))
+                    size_after += sum(map(size, encoded))
+            assignments = ', '.join(f'{column} = ?' for column in columns)
+            self.cursor.executemany(f'UPDATE {table} SET {assignments} WHERE {key} = ?', updates)
+            self.conn.commit()
+            rewritten += len(updates)
+            last_id = rows[-1][0]
+        return rewritten, size_before, size_after
+
+    def recompress_content(self, batch_size=500):
+        """以目前的壓縮設定重新寫入既有文章的內容與全文檢索的斷詞結果（不含已封存的內容）
+        
+        compression 為 None 時將壓縮過的內容還原為文字。
+        
+        Args:
+            batch_size (int): 每批處理並提交的文章數
+            
+        Returns:
+            int: 改寫的文章數
+        """
+        rewritten, size_before, size_after = self._recompress_rows(
+            'articles', 'id', ('content',), batch_size)
+        print(f"已重新寫入 {rewritten} 篇文章內容: {size_before / 1024:.0f}KB → {size_after / 1024:.0f}KB")
+        segments, size_before, size_after = self._recompress_rows(
+            'article_segments', 'article_id', ('title', 'content', 'extra'), batch_size)
+        print(f"已重新寫入 {segments} 篇文章的斷詞結果: "
+              f"{size_before / 1024:.0f}KB → {size_after / 1024:.0f}KB")
+        return rewritten
+
+    def archive_articles(self, older_than_days, batch_size=500, vacuum=True):
+        """將發文時間早於指定天數的文章內容移到封存區段檔，縮小 articles 資料表
+        
+        內容壓縮後附加到區段檔並同步到磁碟，再將 content 欄位改為指向該記錄的指標，
+        讀取時由記憶體映射的區段檔還原。全文檢索的斷詞結果（內容與搜尋模式子詞）一併封存；
+        詞頻、全文檢索與近似重複索引不受影響。
+        
+        Args:
+            older_than_days (int): 封存發文時間早於幾天前的文章
+            batch_size (int): 每批處理並提交的文章數
+            vacuum (bool): 封存後執行 VACUUM 釋放資料庫檔案的空間
+            
+        Returns:
+            int: 封存的文章數
+        """
+        cutoff = int(time.time()) - older_than_days * 86400
+        reader = self.conn.cursor()
+        archived = 0
+        last_id = 0
+        while True:
+            rows = reader.execute('''
+                SELECT id, content FROM articles
+                WHERE id > ? AND published_at < ? AND content IS NOT NULL
+                  AND NOT (typeof(content) = 'blob' AND substr(content, 1, 1) = x'61')
+                ORDER BY id LIMIT ?
+            ''', (last_id, cutoff, batch_size)).fetchall()
+            if not rows:
+                break
+            pointers = self.content_store.archive(
+                {article_id: self.content_store.decode(value) for article_id, value in rows})
+            segments = self._archive_segments([article_id for article_id, _ in rows])
+            try:
+                self.cursor.executemany('UPDATE articles SET content = ? WHERE id = ?',
+                                        [(pointer, article_id) for article_id, pointer in pointers.items()])
+                self.cursor.executemany(
+                    'UPDATE article_segments SET content = ?, extra = ? WHERE article_id = ?', segments)
+                self.conn.commit()
+            except Exception:
+                # 已寫入區段檔的記錄沒有指標指向，不影響讀取
+                self.conn.rollback()
+                raise
+            archived += len(rows)
+            last_id = rows[-1][0]
+            print(f"已封存 {archived} 篇文章")
+        if archived and vacuum:
+            self.conn.execute('VACUUM')
+        print(f"共封存 {archived} 篇 {older_than_days} 天前的文章")
+        return archived
+
+    def _archive_segments(self, article_ids):
+        """將文章的斷詞結果附加到封存區段檔
+        
+        Returns:
+            list: 寫回 article_segments 的 (內容指標, 子詞指標, 文章 id) 元組列表
+        """
+        placeholders = ','.join('?' * len(article_ids))
+        rows = self.conn.execute(f'''
+            SELECT article_id, content_text(content), content_text(extra) FROM article_segments
+            WHERE article_id IN ({placeholders})
+              AND NOT (typeof(content) = 'blob' AND substr(content, 1, 1) = x'61')
+        ''', article_ids).fetchall()
+        if not rows:
+            return []
+        contents = self.content_store.archive(
+            {article_id: content or '' for article_id, content, _ in rows})
+        extras = self.content_store.archive({article_id: extra or '' for article_id, _, extra in rows})
+        return [(contents[article_id], extras[article_id], article_id) for article_id, _, _ in rows]
+
+    def backfill_published_at(self, batch_size=1000):
+        """為既有文章解析 publish_time 並回填 published_at
+        
+        Args:
+            batch_size (int): 每批處理並提交的文章數
+            
+        Returns:
+            int: 成功回填的文章數
+        """
+        reader = self.conn.cursor()
+        filled = 0
+        last_id = 0
+        while True:
+            rows = reader.execute('''
+                SELECT id, source, publish_time FROM articles
+                WHERE id > ? AND published_at IS NULL
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            sources = {article_id: source for article_id, source, _ in rows}
+            updates = [(parse_publish_time(publish_time), article_id)
+                       for article_id, _, publish_time in rows]
+            updates = [update for update in updates if update[0] is not None]
+            self.cursor.executemany(
+                'UPDATE articles SET published_at = ? WHERE id = ?', updates)
+            # 回填發文時間的文章加入每日彙總
+            self._move_term_daily({article_id: (sources[article_id], None)
+                                   for _, article_id in updates})
+            self.conn.commit()
+            filled += len(updates)
+            last_id = rows[-1][0]
+        if filled:
+            print(f"已回填 {filled} 篇文章的發文時間")
+        return filled
+
+    def _report_save(self, new_count, updated_count, duplicate_count, error_count, start,
+                     near_duplicate_count=0):
+        """記錄並輸出最近一次保存的統計"""
+        elapsed = time.perf_counter() - start
+        written = new_count + updated_count
+        self.last_save_stats = {
+            'new': new_count,
+            'updated': updated_count,
+            'duplicate': duplicate_count,
+            'errors': error_count,
+            'near_duplicates': near_duplicate_count,
+            'seconds': elapsed,
+            'rows_per_sec': written / elapsed if elapsed > 0 else 0.0
+        }
+        for result, count in (('new', new_count), ('updated', updated_count),
+                              ('duplicate', duplicate_count), ('error', error_count)):
+            if count:
+                METRICS.inc('db_rows_total', count, result=result)
+        
+        print(f"成功保存 {new_count} 篇新文章")
+        if updated_count > 0:
+            print(f"更新 {updated_count} 篇既有文章")
+        print(f"跳過 {duplicate_count} 篇重複文章")
+        if near_duplicate_count > 0:
+            print(f"標記 {near_duplicate_count} 篇近似重複文章")
+        if error_count > 0:
+            print(f"保存失敗 {error_count} 篇文章")
+        print(f"寫入速度: {self.last_save_stats['rows_per_sec']:.1f} 篇/秒")
+
+    def _ptt_post_time(self, url):
+        """從 PTT 文章網址取出發文時間戳，無法辨識時回傳 None"""
+        match = PTT_POST_TIME_PATTERN.search(url)
+        return int(match.group(1)) if match else None
+
+    def _known_urls(self, source, urls):
+        """回傳已存在於資料庫中的文章網址集合"""
+        if not urls:
+            return set()
+        placeholders = ','.join('?' * len(urls))
+        with self.db_lock:
+            self.cursor.execute(f'''
+                SELECT url FROM articles
+                WHERE source = ? AND url IN ({placeholders})
+            ''', [source] + list(urls))
+            return {row[0] for row in self.cursor.fetchall()}
+
+    def _known_revisions(self, source, urls):
+        """回傳已存在於資料庫中的文章網址與其 remote_rev"""
+        revisions = {}
+        urls = list(urls)
+        with self.db_lock:
+            for i in range(0, len(urls), SQL_VARIABLE_CHUNK):
+                chunk = urls[i:i + SQL_VARIABLE_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                self.cursor.execute(f'''
+                    SELECT url, remote_rev FROM articles
+                    WHERE source = ? AND url IN ({placeholders})
+                ''', [source] + chunk)
+                revisions.update(self.cursor.fetchall())
+        return revisions
+
+    def get_checkpoint(self, source):
+        """獲取指定來源的增量抓取檢查點
+        
+        Args:
+            source (str): 文章來源，例如 'PTT-Gossiping'
+            
+        Returns:
+            dict: 包含 last_url、last_post_time、updated_at、last_crawled_at 的字典，
+                沒有檢查點時為 None
+        """
+        with self.db_lock:
+            self.cursor.execute('''
+                SELECT last_url, last_post_time, updated_at, last_crawled_at
+                FROM crawl_checkpoints
+                WHERE source = ?
+            ''', (source,))
+            row = self.cursor.fetchone()
+        if not row:
+            return None
+        return {'last_url': row[0], 'last_post_time': row[1], 'updated_at': row[2],
+                'last_crawled_at': row[3]}
+
+    def mark_crawled(self, source, crawled_at=None):
+        """記錄指定來源完成抓取並保存的時間，供判斷本機資料是否需要更新
+        
+        Args:
+            source (str): 文章來源，例如 'PTT-Gossiping'
+            crawled_at (int): Unix 時間戳，預設為現在
+        """
+        with self.db_lock:
+            self.cursor.execute('''
+                INSERT INTO crawl_checkpoints (source, last_crawled_at) VALUES (?, ?)
+                ON CONFLICT(source) DO UPDATE SET last_crawled_at = excluded.last_crawled_at
+            ''', (source, int(crawled_at if crawled_at is not None else time.time())))
+            self.conn.commit()
+
+    def commit_checkpoint(self, source):
+        """推進增量抓取的檢查點，在 fetch_articles 抓到的文章都保存後呼叫
+        
+        只有完整抓完、未取消且每篇新文章都抓取成功的增量抓取會留下待推進的檢查點；
+        抓取失敗或取消時檢查點不變，下次抓取會再次往回走到原本的檢查點，補抓失敗的文章。
+        
+        Args:
+            source (str): 文章來源，例如 'PTT-Gossiping'
+            
+        Returns:
+            bool: 是否推進了檢查點
+        """
+        newest = self.pending_checkpoints.pop(source, None)
+        if newest is None:
+            return False
+        self.advance_checkpoint(source, *newest)
+        return True
+
+    def advance_checkpoint(self, source, url, post_time):
+        """將指定來源的高水位推進到 post_time，已有更新的高水位時不變
+        
+        Args:
+            source (str): 文章來源，例如 'PTT-Gossiping'
+            url (str): 高水位文章的網址
+            post_time (int): 高水位文章的發文時間戳
+        """
+        with self.db_lock:
+            self.cursor.execute('''
+                INSERT INTO crawl_checkpoints (source, last_url, last_post_time, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(source) DO UPDATE SET
+                    last_url = excluded.last_url,
+                    last_post_time = excluded.last_post_time,
+                    updated_at = excluded.updated_at
+                WHERE crawl_checkpoints.last_post_time IS NULL
+                   OR excluded.last_post_time > crawl_checkpoints.last_post_time
+            ''', (source, url, post_time))
+            self.conn.commit()
+
+    def iter_articles(self, source=None, since=None, until=None, columns=None, batch_size=500,
+                      exclude_duplicates=False):
+        """由新到舊逐批讀取文章，記憶體用量只與 batch_size 有關
+        
+        以 (published_at, id) 作為 keyset 分頁游標，每批都是一次索引範圍查詢，
+        不會長時間佔用讀取交易。沒有發文時間的文章在最後依 id 輸出
+        （指定 since 或 until 時略過）。
+        
+        Args:
+            source (str): 限定文章來源
+            since: 起始發文時間（Unix 時間戳、datetime 或時間字串）
+            until: 結束發文時間
+            columns (tuple): 要讀取的欄位，預設為 DEFAULT_ARTICLE_COLUMNS，
+                例如 ('title',) 只讀取標題
+            batch_size (int): 每批讀取的筆數
+            exclude_duplicates (bool): 略過標記為近似重複的文章
+            
+        Yields:
+            tuple: 依 columns 順序的欄位值
+        """
+        columns = tuple(columns or DEFAULT_ARTICLE_COLUMNS)
+        unknown = [column for column in columns if column not in ARTICLE_COLUMNS]
+        if unknown:
+            raise ValueError(f"不支援的欄位: {', '.join(unknown)}")
+        
+        conditions = []
+        params = []
+        if source:
+            conditions.append('source = ?')
+            params.append(source)
+        if since is not None:
+            conditions.append('published_at >= ?')
+            params.append(to_timestamp(since))
+        if until is not None:
+            conditions.append('published_at <= ?')
+            params.append(to_timestamp(until))
+        if exclude_duplicates:
+            conditions.append('canonical_id IS NULL')
+        
+        select = f"SELECT {', '.join(COLUMN_EXPRESSIONS.get(column, column) for column in columns)}, " \
+                 f"published_at, id FROM articles"
+        width = len(columns)
+        reader = self.conn.cursor()
+        
+        # 第一階段：有發文時間的文章，依 (published_at, id) 由新到舊
+        dated = conditions + ['published_at IS NOT NULL']
+        cursor_value = None
+        while True:
+            where = list(dated)
+            page_params = list(params)
+            if cursor_value is not None:
+                where.append('(published_at, id) < (?, ?)')
+                page_params.extend(cursor_value)
+            reader.execute(f'''
+                {select} WHERE {' AND '.join(where)}
+                ORDER BY published_at DESC, id DESC LIMIT ?
+            ''', page_params + [batch_size])
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[:width]
+            cursor_value = (rows[-1][width], rows[-1][width + 1])
+        
+        if since is not None or until is not None:
+            return
+        
+        # 第二階段：發文時間未知的文章，依 id 由新到舊
+        undated = conditions + ['published_at IS NULL']
+        last_id = None
+        while True:
+            where = list(undated)
+            page_params = list(params)
+            if last_id is not None:
+                where.append('id < ?')
+                page_params.append(last_id)
+            reader.execute(f'''
+                {select} WHERE {' AND '.join(where)}
+                ORDER BY id DESC LIMIT ?
+            ''', page_params + [batch_size])
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row[:width]
+            last_id = rows[-1][width + 1]
+
+    def get_all_articles(self, columns=None):
+        """獲取所有文章
+        
+        會將所有文章載入記憶體，大量資料請改用 iter_articles 逐批讀取。
+        
+        Args:
+            columns (tuple): 要讀取的欄位，預設為 DEFAULT_ARTICLE_COLUMNS
+            
+        Returns:
+            list: 文章列表
+        """
+        try:
+            return list(self.iter_articles(columns=columns))
         except Exception as e:
             print(f"獲取文章時發生錯誤: {str(e)}")
             return []
     
+    def export_articles(self, path, fmt=None, source=None, since=None, until=None, columns=None,
+                        incremental=False, name=None, exclude_duplicates=False, batch_size=1000):
+        """將文章逐批匯出為 JSONL、CSV、Parquet 或 Excel，記憶體用量只與 batch_size 有關
+        
+        依 id 遞增以 keyset 分頁讀取，來源與時間條件直接在 SQL 中過濾。
+        incremental 為 True 時只匯出上次匯出（同一個 name）之後新收錄的文章，
+        檔案完整寫入後才更新水位，匯出失敗時下次會重新匯出同一批文章。
+        
+        Args:
+            path (str): 輸出路徑
+            fmt (str): 'jsonl'、'csv'、'parquet' 或 'xlsx'，預設由副檔名判斷
+            source (str): 限定文章來源
+            since: 起始發文時間（Unix 時間戳、datetime 或時間字串）
+            until: 結束發文時間
+            columns (tuple): 匯出的欄位，預設為 EXPORT_COLUMNS
+            incremental (bool): 只匯出上次匯出之後新收錄的文章
+            name (str): 增量水位的名稱，預設為輸出路徑
+            exclude_duplicates (bool): 略過標記為近似重複的文章
+            batch_size (int): 每批讀取與寫入的筆數，Parquet 的每個 row group 為一批
+            
+        Returns:
+            dict: rows（匯出筆數）、last_id（匯出的最大文章 id）與 path
+        """
+        columns = tuple(columns or EXPORT_COLUMNS)
+        unknown = [column for column in columns if column not in ARTICLE_COLUMNS]
+        if unknown:
+            raise ValueError(f"不支援的欄位: {', '.join(unknown)}")
+        
+        conditions = ['id > ?']
+        params = []
+        if source:
+            conditions.append('source = ?')
+            params.append(source)
+        if since is not None:
+            conditions.append('published_at >= ?')
+            params.append(to_timestamp(since))
+        if until is not None:
+            conditions.append('published_at <= ?')
+            params.append(to_timestamp(until))
+        if exclude_duplicates:
+            conditions.append('canonical_id IS NULL')
+        query = f'''
+            SELECT {', '.join(COLUMN_EXPRESSIONS.get(column, column) for column in columns)}, id
+            FROM articles WHERE {' AND '.join(conditions)}
+            ORDER BY id LIMIT ?
+        '''
+        
+        name = name or os.path.abspath(path)
+        start_id = self.export_state.get(name) if incremental else 0
+        last_id = start_id
+        
+        def batches():
+            nonlocal last_id
+            reader = self.conn.cursor()
+            while True:
+                rows = reader.execute(query, [last_id] + params + [batch_size]).fetchall()
+                if not rows:
+                    return
+                last_id = rows[-1][-1]
+                yield [row[:-1] for row in rows]
+        
+        start = time.perf_counter()
+        count = write_export(path, batches(), columns, fmt)
+        if incremental:
+            self.export_state.set(name, last_id, count)
+            self.conn.commit()
+        METRICS.inc('exported_rows_total', count)
+        print(f"已匯出 {count} 篇文章到 {path}（{time.perf_counter() - start:.1f} 秒）")
+        return {'rows': count, 'last_id': last_id, 'path': path}
+
     def get_statistics(self):
         """獲取統計資訊
         
@@ -377,74 +2343,358 @@ class PTTDcardCrawler:
             ''')
             stats['source_count'] = dict(self.cursor.fetchall())
             
-            # 獲取最近24小時文章數
+            # 獲取最近24小時發布的文章數
             self.cursor.execute('''
                 SELECT COUNT(*) 
                 FROM articles 
-                WHERE created_at >= datetime('now', '-1 day')
-            ''')
+                WHERE published_at >= ?
+            ''', (int(time.time()) - 86400,))
             stats['last_24h'] = self.cursor.fetchone()[0]
             
+            # 獲取標記為近似重複的文章數
+            self.cursor.execute('SELECT COUNT(*) FROM articles WHERE canonical_id IS NOT NULL')
+            stats['near_duplicates'] = self.cursor.fetchone()[0]
+            
             return stats
         except Exception as e:
             print(f"獲取統計資訊時發生錯誤: {str(e)}")
             return {
                 'total_articles': 0,
                 'source_count': {},
-                'last_24h': 0
+                'last_24h': 0,
+                'near_duplicates': 0
             }
     
     def close(self):
-        """關閉資料庫連接"""
+        """關閉共用的 session 與資料庫連接"""
+        self.close_session()
+        self.content_store.close()
         self.conn.close()
 
-    def get_word_frequency(self, source=None, days=None, top_n=10):
+    def search_by_keyword(self, keyword, source=None, limit=20, offset=0):
+        """以全文檢索搜尋文章，依 bm25 相關度排序
+        
+        Args:
+            keyword (str): 搜尋關鍵字，會以 jieba 斷詞後要求所有詞都出現
+            source (str): 限定文章來源
+            limit (int): 每頁筆數
+            offset (int): 略過的筆數
+            
+        Returns:
+            list: (標題, 網址, 發布時間, 來源, 作者, 內容摘要) 元組的列表
+        """
+        try:
+            words = [word for word in jieba.lcut(keyword) if word.strip()]
+            if not words:
+                return []
+            match = ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+            
+            query = f'''
+                SELECT a.title, a.url, a.publish_time, a.source, a.author,
+                       snippet(articles_fts, 1, '【', '】', '…', 32)
+                FROM articles_fts
+                JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ?
+            '''
+            params = [match]
+            if source:
+                query += " AND a.source = ?"
+                params.append(source)
+            query += " ORDER BY bm25(articles_fts, 5.0, 1.0, 0.5) LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+            
+            self.cursor.execute(query, params)
+            return [row[:5] + (row[5].replace(SEGMENT_SEPARATOR, ''),)
+                    for row in self.cursor.fetchall()]
+        except Exception as e:
+            print(f"搜尋文章時發生錯誤: {str(e)}")
+            return []
+
+    def search_by_source(self, source, limit=20, offset=0):
+        """搜尋指定來源的文章，由新到舊排列
+        
+        Args:
+            source (str): 文章來源，例如 'PTT-Gossiping'
+            limit (int): 每頁筆數
+            offset (int): 略過的筆數
+            
+        Returns:
+            list: (標題, 網址, 發布時間, 來源, 作者, 內容) 元組的列表
+        """
+        try:
+            self.cursor.execute('''
+                SELECT title, url, publish_time, source, author, content_text(content)
+                FROM articles
+                WHERE source = ?
+                ORDER BY published_at DESC
+                LIMIT ? OFFSET ?
+            ''', (source, limit, offset))
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"搜尋文章時發生錯誤: {str(e)}")
+            return []
+
+    def search_by_time_range(self, start, end=None, source=None, limit=20, offset=0):
+        """搜尋發文時間落在指定區間的文章，由新到舊排列
+        
+        Args:
+            start: 起始時間（Unix 時間戳、datetime 或時間字串）
+            end: 結束時間，預設為現在
+            source (str): 限定文章來源
+            limit (int): 每頁筆數
+            offset (int): 略過的筆數
+            
+        Returns:
+            list: (標題, 網址, 發布時間, 來源, 作者, 內容) 元組的列表
+        """
+        try:
+            query = '''
+                SELECT title, url, publish_time, source, author, content_text(content)
+                FROM articles
+                WHERE published_at BETWEEN ? AND ?
+            '''
+            params = [to_timestamp(start),
+                      to_timestamp(end) if end is not None else int(time.time())]
+            if source:
+                query += " AND source = ?"
+                params.append(source)
+            query += " ORDER BY published_at DESC LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+            
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"搜尋文章時發生錯誤: {str(e)}")
+            return []
+
+    def _canonical_filter(self, source=None, days=None):
+        """只含代表文章（排除近似重複）的查詢條件，文章表的別名為 a
+        
+        時間窗與每日彙總相同，從台灣時間的起始日零時起算。
+        
+        Returns:
+            tuple: (WHERE 條件, 參數列表)
+        """
+        conditions = ['a.canonical_id IS NULL']
+        params = []
+        if days:
+            start_day = window_start_day(days)
+            conditions.append('a.published_at >= ?')
+            params.append(start_day * 86400 - DAY_OFFSET)
+        if source:
+            conditions.append('a.source = ?')
+            params.append(source)
+        return ' AND '.join(conditions), params
+
+    def get_word_frequency(self, source=None, days=None, top_n=10, approximate=False,
+                           epsilon=DEFAULT_EPSILON, exclude_duplicates=False):
         """獲取指定條件的詞頻統計
         
         Args:
             source (str): 文章來源
             days (int): 最近幾天
             top_n (int): 返回前N個最常出現的詞
+            approximate (bool): 以 Space-Saving 摘要串流彙總，記憶體上限為 ceil(1 / epsilon) 個詞，
+                適合跨多個月份與看板的大範圍統計
+            epsilon (float): 串流模式的相對誤差
+            exclude_duplicates (bool): 排除近似重複的文章（轉錄、複製貼上），只計算代表文章；
+                此時不使用每日彙總，改由每篇文章的詞頻合計
             
         Returns:
             list: 包含 (詞, 頻率) 元組的列表
         """
         try:
-            query = "SELECT content FROM articles WHERE 1=1"
-            params = []
+            if approximate:
+                return self._approximate_word_frequency(source, days, top_n, epsilon,
+                                                        exclude_duplicates=exclude_duplicates)
             
-            if source:
-                query += " AND source = ?"
-                params.append(source)
+            if exclude_duplicates:
+                where, params = self._canonical_filter(source, days)
+                self.cursor.execute(f'''
+                    SELECT t.term, SUM(at.count) AS total
+                    FROM article_terms at
+                    JOIN terms t ON t.id = at.term_id
+                    JOIN articles a ON a.id = at.article_id
+                    WHERE {where}
+                    GROUP BY at.term_id ORDER BY total DESC LIMIT ?
+                ''', params + [top_n])
+                return self.cursor.fetchall()
             
             if days:
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=days)
-                query += " AND datetime(publish_time) >= datetime(?)"
-                params.append(start_date.strftime('%Y-%m-%d'))
+                # 合併時間窗內的每日彙總，成本只與天數有關
+                start_day = window_start_day(days)
+                query = '''
+                    SELECT t.term, SUM(d.count) AS total
+                    FROM term_daily d
+                    JOIN terms t ON t.id = d.term_id
+                    WHERE d.day >= ?
+                '''
+                params = [start_day]
+                if source:
+                    query += " AND d.source = ?"
+                    params.append(source)
+                query += " GROUP BY d.term_id ORDER BY total DESC LIMIT ?"
+                params.append(top_n)
+                
+                self.cursor.execute(query, params)
+                return self.cursor.fetchall()
             
-            self.cursor.execute(query, params)
-            articles = [{'content': row[0]} for row in self.cursor.fetchall()]
+            query = '''
+                SELECT t.term, SUM(at.count) AS total
+                FROM article_terms at
+                JOIN terms t ON t.id = at.term_id
+            '''
+            params = []
+            if source:
+                query += " JOIN articles a ON a.id = at.article_id WHERE a.source = ?"
+                params.append(source)
+            query += " GROUP BY at.term_id ORDER BY total DESC LIMIT ?"
+            params.append(top_n)
             
-            return analyze_articles(articles, top_n)
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
         except Exception as e:
             print(f"獲取詞頻統計時發生錯誤: {str(e)}")
             return []
 
+    def get_word_frequency_stats(self, source=None, days=None, top_n=10, exclude_duplicates=False):
+        """由資料庫中已保存的詞頻彙總統計，不需重新抓取或斷詞
+        
+        Args:
+            source (str): 文章來源
+            days (int): 最近幾天
+            top_n (int): 返回前N個最常出現的詞
+            exclude_duplicates (bool): 排除近似重複的文章，文章數與詞頻只計算代表文章
+            
+        Returns:
+            dict: 包含 articles、total_words、unique_words、top_keywords 的字典
+        """
+        try:
+            if exclude_duplicates:
+                where, term_params = self._canonical_filter(source, days)
+                term_query = f'''
+                    SELECT SUM(at.count), COUNT(DISTINCT at.term_id) FROM article_terms at
+                    JOIN articles a ON a.id = at.article_id
+                    WHERE {where}
+                '''
+                article_query = f'SELECT COUNT(*) FROM articles a WHERE {where}'
+                article_params = term_params
+            elif days:
+                start_day = window_start_day(days)
+                term_query = 'SELECT SUM(count), COUNT(DISTINCT term_id) FROM term_daily WHERE day >= ?'
+                article_query = 'SELECT COUNT(*) FROM articles WHERE published_at >= ?'
+                term_params = [start_day]
+                article_params = [start_day * 86400 - DAY_OFFSET]
+                if source:
+                    term_query += ' AND source = ?'
+                    article_query += ' AND source = ?'
+                    term_params.append(source)
+                    article_params.append(source)
+            elif source:
+                term_query = '''
+                    SELECT SUM(at.count), COUNT(DISTINCT at.term_id) FROM article_terms at
+                    JOIN articles a ON a.id = at.article_id
+                    WHERE a.source = ?
+                '''
+                article_query = 'SELECT COUNT(*) FROM articles WHERE source = ?'
+                term_params = article_params = [source]
+            else:
+                term_query = 'SELECT SUM(count), COUNT(DISTINCT term_id) FROM article_terms'
+                article_query = 'SELECT COUNT(*) FROM articles'
+                term_params = article_params = []
+            
+            self.cursor.execute(term_query, term_params)
+            total_words, unique_words = self.cursor.fetchone()
+            self.cursor.execute(article_query, article_params)
+            article_count = self.cursor.fetchone()[0]
+            
+            return {
+                'articles': article_count,
+                'total_words': total_words or 0,
+                'unique_words': unique_words,
+                'top_keywords': self.get_word_frequency(source, days, top_n,
+                                                        exclude_duplicates=exclude_duplicates)
+            }
+        except Exception as e:
+            print(f"獲取詞頻統計時發生錯誤: {str(e)}")
+            return {'articles': 0, 'total_words': 0, 'unique_words': 0, 'top_keywords': []}
+
+    def _approximate_word_frequency(self, source, days, top_n, epsilon, batch_size=5000,
+                                    exclude_duplicates=False):
+        """逐批讀取詞頻列並累加到 Space-Saving 摘要，不建立完整的 GROUP BY 結果"""
+        if exclude_duplicates:
+            where, params = self._canonical_filter(source, days)
+            query = f'''
+                SELECT at.term_id, at.count FROM article_terms at
+                JOIN articles a ON a.id = at.article_id
+                WHERE {where}
+            '''
+        elif days:
+            query = 'SELECT term_id, count FROM term_daily WHERE day >= ?'
+            params = [window_start_day(days)]
+            if source:
+                query += ' AND source = ?'
+                params.append(source)
+        elif source:
+            query = '''
+                SELECT at.term_id, at.count FROM article_terms at
+                JOIN articles a ON a.id = at.article_id
+                WHERE a.source = ?
+            '''
+            params = [source]
+        else:
+            query = 'SELECT term_id, count FROM article_terms'
+            params = []
+        
+        sketch = SpaceSaving.from_error(epsilon)
+        reader = self.conn.cursor()
+        reader.execute(query, params)
+        while True:
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            for term_id, count in rows:
+                sketch.add(term_id, count)
+        
+        top = sketch.top(top_n)
+        terms = {}
+        term_ids = [term_id for term_id, _ in top]
+        if term_ids:
+            placeholders = ','.join('?' * len(term_ids))
+            reader.execute(f'SELECT id, term FROM terms WHERE id IN ({placeholders})', term_ids)
+            terms = dict(reader.fetchall())
+        return [(terms[term_id], count) for term_id, count in top if term_id in terms]
+
 def print_articles(articles):
-    """格式化輸出文章列表"""
-    if not articles:
-        print("沒有找到符合條件的文章")
-        return
-    
+    """格式化輸出文章列表，可傳入 iter_articles 等產生器逐筆輸出"""
+    count = 0
     for article in articles:
+        count += 1
         print(f"\n標題: {article[0]}")
         print(f"URL: {article[1]}")
         print(f"發布時間: {article[2]}")
         print(f"來源: {article[3]}")
         print(f"作者: {article[4]}")
-        print(f"內容: {article[5][:200]}...")  # 只顯示前200個字符
+        print(f"內容: {(article[5] or '')[:200]}...")  # 只顯示前200個字符
         print("-" * 50)
+    
+    if count == 0:
+        print("沒有找到符合條件的文章")
+
+def write_metrics(prometheus_path=None, summary_path=None):
+    """將目前的指標寫入檔案
+
+    Args:
+        prometheus_path (str): Prometheus 文字格式的輸出路徑
+        summary_path (str): JSON 摘要的輸出路徑
+    """
+    try:
+        if prometheus_path:
+            METRICS.write_prometheus(prometheus_path)
+        if summary_path:
+            METRICS.write_summary(summary_path)
+    except Exception as e:
+        print(f"寫入指標時發生錯誤: {str(e)}")
 
 def main():
     parser = argparse.ArgumentParser(description='巴哈姆特文章爬蟲')
@@ -454,33 +2704,150 @@ def main():
     parser.add_argument('--days', type=int, help='搜尋最近幾天的文章')
     parser.add_argument('--stats', action='store_true', help='顯示統計資訊')
     parser.add_argument('--pages', type=int, default=5, help='要抓取的頁數（預設為5頁）')
+    parser.add_argument('--site', choices=['ptt', 'dcard'], default='ptt', help='要抓取的網站（預設為 ptt）')
+    parser.add_argument('--board', default='Gossiping', help='要抓取的看板（預設為 Gossiping）')
+    parser.add_argument('--boards',
+                        help='以逗號分隔的多個看板，搭配 --crawl 以多行程同時抓取，'
+                             '可加上來源前綴，例如 Gossiping,Stock,dcard/funny（未加前綴時使用 --site）')
+    parser.add_argument('--workers', type=int, default=2, help='--boards 的抓取行程數（預設為2）')
+    parser.add_argument('--incremental', action='store_true',
+                        help='從最新頁往回抓，遇到已收錄的文章即停止（僅支援 PTT）')
+    parser.add_argument('--refresh', action='store_true',
+                        help='重新檢查最新 --pages 頁，只抓取新文章與推文數改變的文章並更新內容（僅支援 PTT）')
+    parser.add_argument('--keep-pushes', action='store_true', help='PTT 文章內容保留推文')
+    parser.add_argument('--limit', type=int, default=20, help='搜尋結果每頁筆數（預設為20）')
+    parser.add_argument('--offset', type=int, default=0, help='搜尋結果略過的筆數（預設為0）')
+    parser.add_argument('--rebuild-search', action='store_true', help='重新建立全文檢索索引')
+    parser.add_argument('--rebuild-terms', action='store_true', help='重新計算所有文章的詞頻')
+    parser.add_argument('--rebuild-rollups', action='store_true', help='重新建立每日詞頻彙總')
+    parser.add_argument('--rebuild-duplicates', action='store_true', help='重新建立近似重複文章的指紋與標記')
+    parser.add_argument('--compression', choices=['none', 'zlib', 'zstd'], default='none',
+                        help='新寫入文章內容的壓縮方式，zstd 需安裝 zstandard（預設為 none）')
+    parser.add_argument('--train-dictionary', action='store_true',
+                        help='以最近的文章訓練 --compression 指定方式的壓縮字典')
+    parser.add_argument('--recompress', action='store_true',
+                        help='以 --compression 的設定重新寫入既有文章的內容')
+    parser.add_argument('--export', metavar='PATH',
+                        help='逐批匯出文章，格式由副檔名判斷（.jsonl、.csv、.parquet、.xlsx）')
+    parser.add_argument('--export-format', choices=['jsonl', 'csv', 'parquet', 'xlsx'],
+                        help='匯出格式，未指定時由副檔名判斷')
+    parser.add_argument('--export-source', help='只匯出指定來源的文章，例如 PTT-Gossiping')
+    parser.add_argument('--export-since', help='只匯出此時間之後發文的文章，例如 2025-06-01')
+    parser.add_argument('--export-until', help='只匯出此時間之前發文的文章')
+    parser.add_argument('--export-incremental', action='store_true',
+                        help='只匯出上次匯出到同一路徑之後新收錄的文章')
+    parser.add_argument('--exclude-duplicates', action='store_true', help='匯出時略過近似重複的文章')
+    parser.add_argument('--archive', type=int, metavar='DAYS',
+                        help='將發文時間早於 DAYS 天前的文章內容移到封存區段檔並壓縮資料庫')
+    parser.add_argument('--mode', choices=['async', 'sequential'], default='async',
+                        help='抓取模式：async 為並發抓取，sequential 為逐篇抓取（預設為 async）')
+    parser.add_argument('--concurrency', type=int, default=16, help='全域同時請求數上限（預設為16）')
+    parser.add_argument('--host-concurrency', type=int, default=4, help='每個主機同時請求數上限（預設為4）')
+    parser.add_argument('--rps', type=float, default=4.0, help='每個主機每秒請求數上限（預設為4）')
+    parser.add_argument('--dcard-bodies', choices=['changed', 'all', 'none'], default='changed',
+                        help='Dcard 文章內容抓取方式：changed 只抓新增或更新的文章，all 全部抓取，'
+                             'none 只保存列表欄位（預設為 changed）')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常駐執行，依 --config 的看板清單排程抓取，間隔隨各看板發文速率調整')
+    parser.add_argument('--config', default='boards.json', help='常駐模式的看板設定檔（預設為 boards.json）')
+    parser.add_argument('--jobs', type=int, default=2, help='常駐模式同時抓取的看板數（預設為2）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'抓取時每批寫入資料庫的文章數（預設為{DEFAULT_BATCH_SIZE}）')
+    parser.add_argument('--html-parser', choices=['auto', 'lxml', 'fast', 'bs4'], default='auto',
+                        help='PTT 頁面解析器：auto 在已安裝 lxml 時使用 lxml，否則使用 fast（預設為 auto）')
+    parser.add_argument('--metrics-file', help='結束時（常駐模式為每次抓取後）寫入 Prometheus 文字格式的指標')
+    parser.add_argument('--metrics-json', help='結束時寫入各階段耗時與計數的 JSON 摘要')
+    parser.add_argument('--metrics-port', type=int, help='在此埠提供 /metrics 與 /summary 端點')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help='指標端點監聽的位址，預設只接受本機連線；0.0.0.0 為所有網路介面')
     
     args = parser.parse_args()
     
-    crawler = PTTDcardCrawler()
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port, args.metrics_host)
+        print(f"指標端點: http://{args.metrics_host}:{args.metrics_port}/metrics")
+    
+    crawler = PTTDcardCrawler(
+        max_concurrency=args.concurrency,
+        per_host_concurrency=args.host_concurrency,
+        requests_per_second=args.rps,
+        html_parser=args.html_parser,
+        compression=None if args.compression == 'none' else args.compression,
+        keep_pushes=args.keep_pushes
+    )
     
     try:
-        if args.crawl:
+        if args.crawl and args.boards:
+            boards = parse_board_list(args.boards, args.site)
+            print(f"正在以 {args.workers} 個行程抓取 {len(boards)} 個看板...")
+            crawler.crawl_boards(boards, args.pages, workers=args.workers, batch_size=args.batch_size,
+                                 mode=args.mode, incremental=args.incremental,
+                                 dcard_bodies=args.dcard_bodies, refresh=args.refresh)
+        elif args.crawl:
             # 抓取巴哈姆特文章
             print("正在抓取巴哈姆特文章...")
-            articles = crawler.fetch_articles(args.source, args.source, args.pages)
-            crawler.save_articles(articles)
+            crawler.crawl_to_db(args.site, args.board, args.pages, batch_size=args.batch_size,
+                                mode=args.mode, incremental=args.incremental,
+                                dcard_bodies=args.dcard_bodies, refresh=args.refresh)
+            crawler.mark_crawled(source_label(args.site, args.board))
+        
+        if args.daemon:
+            scheduler = CrawlScheduler(crawler, load_board_config(args.config), max_jobs=args.jobs,
+                                       metrics_file=args.metrics_file)
+            scheduler.run_forever()
+        
+        if args.rebuild_terms:
+            print("正在重新計算文章詞頻...")
+            crawler.rebuild_article_terms(only_missing=False)
+            crawler.rebuild_term_daily()
+        
+        if args.rebuild_rollups and not args.rebuild_terms:
+            print("正在重新建立每日詞頻彙總...")
+            crawler.rebuild_term_daily()
+        
+        if args.rebuild_search:
+            print("正在重新建立全文檢索索引...")
+            crawler.rebuild_search_index(only_missing=False)
+        
+        if args.rebuild_duplicates:
+            print("正在重新建立近似重複文章標記...")
+            crawler.rebuild_near_duplicates()
+        
+        if args.train_dictionary:
+            print("正在訓練壓縮字典...")
+            crawler.train_content_dictionary()
+        
+        if args.recompress:
+            print("正在重新寫入文章內容...")
+            crawler.recompress_content()
+        
+        if args.archive is not None:
+            print(f"正在封存 {args.archive} 天前的文章...")
+            crawler.archive_articles(args.archive)
+        
+        if args.export:
+            print(f"正在匯出文章到 {args.export}...")
+            crawler.export_articles(args.export, fmt=args.export_format, source=args.export_source,
+                                    since=args.export_since, until=args.export_until,
+                                    incremental=args.export_incremental,
+                                    exclude_duplicates=args.exclude_duplicates)
         
         if args.keyword:
             print(f"\n搜尋關鍵字 '{args.keyword}' 的文章：")
-            articles = crawler.search_by_keyword(args.keyword)
+            articles = crawler.search_by_keyword(args.keyword, limit=args.limit, offset=args.offset)
             print_articles(articles)
         
         if args.source:
             print(f"\n搜尋來源 '{args.source}' 的文章：")
-            articles = crawler.search_by_source(args.source)
+            articles = crawler.search_by_source(args.source, limit=args.limit, offset=args.offset)
             print_articles(articles)
         
         if args.days:
-            start_date = (datetime.now() - timedelta(days=args.days)).strftime('%Y-%m-%d %H:%M:%S')
-            end_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=args.days)
             print(f"\n搜尋最近 {args.days} 天的文章：")
-            articles = crawler.search_by_time_range(start_date, end_date)
+            articles = crawler.search_by_time_range(start_date, end_date,
+                                                    limit=args.limit, offset=args.offset)
             print_articles(articles)
         
         if args.stats:
@@ -491,8 +2858,9 @@ def main():
             for source, count in stats.get('source_count', {}).items():
                 print(f"{source}: {count}")
             print(f"\n最近24小時文章數: {stats.get('last_24h', 0)}")
+            print(f"近似重複文章數: {stats.get('near_duplicates', 0)}")
         
-        if not any([args.crawl, args.keyword, args.source, args.days, args.stats]):
+        if not any([args.crawl, args.daemon, args.rebuild_terms, args.rebuild_rollups, args.rebuild_search, args.rebuild_duplicates, args.train_dictionary, args.recompress, args.archive is not None, args.export, args.keyword, args.source, args.days, args.stats]):
             parser.print_help()
     
     except Exception as e:
@@ -500,6 +2868,7 @@ def main():
     
     finally:
         crawler.close()
+        write_metrics(args.metrics_file, args.metrics_json)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
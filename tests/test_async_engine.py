@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.async_engine import AsyncFetcher
+
+
+class BlockingTransport:
+    """請求在 release 之前不會完成的傳輸層"""
+
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.release = threading.Event()
+        self.started = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def get(self, url, board=''):
+        with self._lock:
+            self.started.append(url)
+        self.release.wait(5)
+        return url
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待逾時")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def python38_shutdown(monkeypatch):
+    """以 Python 3.8 的 shutdown 簽名（沒有 cancel_futures）執行"""
+    shutdown = ThreadPoolExecutor.shutdown
+
+    def shutdown_38(self, wait=True):
+        return shutdown(self, wait)
+
+    monkeypatch.setattr(ThreadPoolExecutor, 'shutdown', shutdown_38)
+
+
+def test_fetch_all_keeps_order(python38_shutdown):
+    transport = BlockingTransport()
+    transport.release.set()
+    fetcher = AsyncFetcher(transport, max_concurrency=3)
+    urls = [f'/page{i}' for i in range(10)]
+    assert asyncio.run(fetcher.fetch_all(urls)) == urls
+    fetcher.close()
+
+
+def test_close_after_cancel_drops_queued_requests(python38_shutdown):
+    transport = BlockingTransport()
+    fetcher = AsyncFetcher(transport, max_concurrency=2)
+    results = {}
+
+    async def crawl():
+        return await asyncio.gather(*(fetcher.fetch(f'/page{i}') for i in range(10)),
+                                    return_exceptions=True)
+
+    crawler = threading.Thread(target=lambda: results.update(value=asyncio.run(crawl())))
+    crawler.start()
+    _wait_for(lambda: len(transport.started) == 2 and len(fetcher._pending) == 10)
+
+    transport.cancel_event.set()
+    closer = threading.Thread(target=fetcher.close)
+    closer.start()
+    # 排隊中的 8 個請求已取消，只剩執行中的 2 個
+    _wait_for(lambda: len(fetcher._pending) == 2)
+    transport.release.set()
+    closer.join(5)
+    crawler.join(5)
+
+    assert not closer.is_alive() and not crawler.is_alive()
+    assert len(transport.started) == 2
+    fetched = [result for result in results['value'] if isinstance(result, str)]
+    assert sorted(fetched) == sorted(transport.started)
+    assert sum(isinstance(result, asyncio.CancelledError) for result in results['value']) == 8
+    assert asyncio.run(fetcher.fetch('/late')) is None
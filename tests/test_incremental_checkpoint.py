@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from benchmarks.stand_in_server import PTT_POSTS_PER_PAGE, StandInServer
+from ptt_dcard_crawler import PTTDcardCrawler
+from utils.http_transport import HttpTransport
+
+BOARD = 'Test'
+SOURCE = f'PTT-{BOARD}'
+
+
+@pytest.fixture
+def server():
+    with StandInServer(ptt_pages=2, over18_boards=()) as server:
+        yield server
+
+
+@pytest.fixture
+def crawler(tmp_path, server):
+    crawler = PTTDcardCrawler(db_path=str(tmp_path / 'articles.db'), ptt_base_url=server.url,
+                              dcard_base_url=server.url, requests_per_second=0, tokenize_workers=1)
+    yield crawler
+    crawler.close()
+
+
+def _article_count(crawler):
+    return crawler.conn.execute('SELECT COUNT(*) FROM articles WHERE source = ?', (SOURCE,)).fetchone()[0]
+
+
+def _fail_articles(monkeypatch, should_fail):
+    """讓符合條件的文章頁請求如同重試用盡般回傳 None"""
+    get = HttpTransport.get
+
+    def flaky_get(self, url, board='', **kwargs):
+        if '/M.' in url and should_fail(url):
+            return None
+        return get(self, url, board, **kwargs)
+
+    monkeypatch.setattr(HttpTransport, 'get', flaky_get)
+
+
+def test_failed_articles_are_fetched_on_next_run(crawler, server, monkeypatch):
+    """抓取失敗的文章不會落在檢查點之下，下次增量抓取會補抓"""
+    total = server.ptt_pages * PTT_POSTS_PER_PAGE
+    _fail_articles(monkeypatch, lambda url: int(url.rsplit('/M.', 1)[1].split('.')[0]) // 60 % 4 == 0)
+
+    stats = crawler.crawl_to_db('ptt', BOARD, pages=5, incremental=True)
+    failed = total - stats['new']
+    assert failed > 0
+    assert _article_count(crawler) == total - failed
+    assert crawler.get_checkpoint(SOURCE) is None
+
+    monkeypatch.undo()
+    stats = crawler.crawl_to_db('ptt', BOARD, pages=5, incremental=True)
+    assert stats['new'] == failed
+    assert _article_count(crawler) == total
+    newest = server.ptt_post_time(server.ptt_pages, PTT_POSTS_PER_PAGE - 1)
+    assert crawler.get_checkpoint(SOURCE)['last_post_time'] == newest
+
+
+def test_cancelled_crawl_does_not_advance_checkpoint(crawler):
+    """取消的增量抓取不推進檢查點"""
+    cancel_event = threading.Event()
+
+    def cancel_after_first(articles):
+        cancel_event.set()
+
+    crawler.fetch_articles('ptt', BOARD, pages=5, incremental=True, cancel_event=cancel_event,
+                           on_articles=cancel_after_first)
+    assert crawler.commit_checkpoint(SOURCE) is False
+    assert crawler.get_checkpoint(SOURCE) is None
+
+
+def test_next_run_stops_at_checkpoint(crawler, server):
+    """完整抓完後推進檢查點，之後只抓新發表的文章"""
+    crawler.crawl_to_db('ptt', BOARD, pages=5, incremental=True)
+    server.ptt_pages += 1
+    stats = crawler.crawl_to_db('ptt', BOARD, pages=5, incremental=True)
+    assert stats['fetched'] == PTT_POSTS_PER_PAGE
+    assert stats['new'] == PTT_POSTS_PER_PAGE
+    newest = server.ptt_post_time(server.ptt_pages, PTT_POSTS_PER_PAGE - 1)
+    assert crawler.get_checkpoint(SOURCE)['last_post_time'] == newest
@@ -0,0 +1,26 @@
+import json
+
+from utils.metrics import Metrics
+
+
+def test_summary_without_observations_is_strict_json(tmp_path):
+    metrics = Metrics()
+    # 其他行程合併來、但沒有任何記錄的直方圖
+    metrics.merge(({}, {('fetch', ()): ([0] * (len(metrics.buckets) + 1), 0.0, 0)}))
+    timing = metrics.summary()['timings']['fetch']
+    assert timing['count'] == 0
+    assert timing['mean_ms'] is None and timing['p50_ms'] is None and timing['p95_ms'] is None
+
+    path = tmp_path / 'summary.json'
+    metrics.write_summary(str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['timings']['fetch']['p95_ms'] is None
+
+
+def test_quantiles_beyond_last_bucket_use_largest_bound():
+    metrics = Metrics(buckets=(0.001, 0.01))
+    metrics.observe('fetch', 0.0005)
+    for _ in range(3):
+        metrics.observe('fetch', 30.0)
+    timing = metrics.summary()['timings']['fetch']
+    assert timing['p50_ms'] == 10.0 and timing['p95_ms'] == 10.0
+    json.dumps(metrics.summary(), allow_nan=False)
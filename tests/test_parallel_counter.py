@@ -0,0 +1,37 @@
+import sqlite3
+
+from utils.parallel_counter import count_terms, count_terms_per_article, shutdown_pool
+from utils.token_cache import TokenCache
+
+CONTENTS = [
+    '颱風要來了，各縣市還沒宣布停班停課，大家覺得明天會放假嗎？',
+    '今天台北捷運很擠，下班時間的捷運真的很擠。',
+    '',
+    '2024 年的薪水還是沒有調漲…… ^_^',
+]
+
+
+def test_count_terms_skips_single_characters_and_punctuation():
+    counts = count_terms(CONTENTS[1])
+    assert counts['捷運'] == 2
+    assert all(len(term) >= 2 for term in counts)
+    assert not any(term in counts for term in ('，', '。', '的'))
+    assert count_terms('……  ^_^ ！') == {}
+    assert count_terms(None) == {}
+
+
+def test_process_pool_matches_in_process_counts():
+    expected = [count_terms(content) for content in CONTENTS]
+    try:
+        assert count_terms_per_article(CONTENTS, workers=2, threshold=1) == expected
+    finally:
+        shutdown_pool()
+
+
+def test_cache_returns_same_counts():
+    cache = TokenCache(sqlite3.connect(':memory:'))
+    expected = [count_terms(content) for content in CONTENTS]
+    assert count_terms_per_article(CONTENTS, workers=1, cache=cache) == expected
+    assert cache.misses == len(CONTENTS)
+    assert count_terms_per_article(CONTENTS, workers=1, cache=cache) == expected
+    assert cache.hits == len(CONTENTS)
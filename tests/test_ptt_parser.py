@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from benchmarks.parser_equivalence import REFERENCE_PARSER, recorded_pages
+from utils.ptt_parser import available_parsers, get_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'ptt')
+
+# 錄製的列表頁、文章頁與 over18 確認頁，含 CRLF 換行與不規則標記的頁面
+PAGES = recorded_pages(FIXTURES_DIR)
+
+CANDIDATES = [name for name in ('fast', 'lxml') if name != REFERENCE_PARSER]
+
+
+def _parser(name):
+    if name not in available_parsers():
+        pytest.skip(f"未安裝 {name} 解析器所需的套件")
+    return get_parser(name)
+
+
+@pytest.mark.parametrize('parser_name', CANDIDATES)
+@pytest.mark.parametrize('page_name, kind, data', PAGES, ids=[page[0] for page in PAGES])
+def test_matches_reference_parser(parser_name, page_name, kind, data):
+    """每個錄製頁面以頁面種類的解析方法解析，結果與 BeautifulSoup 相同"""
+    parser = _parser(parser_name)
+    reference = get_parser(REFERENCE_PARSER)
+    parse = 'parse_index' if kind == 'index' else 'parse_article'
+    assert getattr(parser, parse)(data) == getattr(reference, parse)(data)
+
+
+@pytest.mark.parametrize('parser_name', CANDIDATES)
+@pytest.mark.parametrize('page_name, kind, data', PAGES, ids=[page[0] for page in PAGES])
+def test_matches_reference_parser_on_other_kind(parser_name, page_name, kind, data):
+    """以另一種頁面的解析方法解析（例如 over18 頁被當成文章頁），結果仍與 BeautifulSoup 相同"""
+    parser = _parser(parser_name)
+    reference = get_parser(REFERENCE_PARSER)
+    parse = 'parse_article' if kind == 'index' else 'parse_index'
+    assert getattr(parser, parse)(data) == getattr(reference, parse)(data)
+
+
+@pytest.mark.parametrize('parser_name', [REFERENCE_PARSER] + CANDIDATES)
+def test_crlf_page_matches_lf_page(parser_name):
+    """CRLF 換行的頁面與 LF 換行的同一頁面解析結果相同"""
+    parser = _parser(parser_name)
+    pages = {name: data for name, _, data in PAGES}
+    assert parser.parse_index(pages['index_crlf.html']) == parser.parse_index(pages['index.html'])
+    assert parser.parse_article(pages['article_crlf.html']) == parser.parse_article(pages['article.html'])
+
+
+def test_index_fixture():
+    """列表頁：略過已刪除文章、置底文章從分隔線開始、取得上頁連結"""
+    links, pinned_from, prev_href = get_parser(REFERENCE_PARSER).parse_index(
+        dict((name, data) for name, _, data in PAGES)['index.html'])
+    assert [href for _, href, _ in links] == [
+        '/bbs/Gossiping/M.1718000000.A.1B2.html',
+        '/bbs/Gossiping/M.1718000120.A.3C4.html',
+        '/bbs/Gossiping/M.1718000240.A.5D6.html',
+        '/bbs/Gossiping/M.1700000000.A.7E8.html',
+        '/bbs/Gossiping/M.1700000100.A.9F0.html'
+    ]
+    assert [nrec for _, _, nrec in links] == ['5', '爆', 'X1', '12', '']
+    assert links[2][0] == '[問卦] 泡麵加蛋 & 加起司哪個好？'
+    assert pinned_from == 3
+    assert prev_href == '/bbs/Gossiping/index39211.html'
+
+
+def test_article_fixture():
+    """文章頁：作者、發文時間與不含 \\r 的主內容"""
+    author, publish_time, content = get_parser(REFERENCE_PARSER).parse_article(
+        dict((name, data) for name, _, data in PAGES)['article_crlf.html'])
+    assert author == 'tester01 (測試帳號)'
+    assert publish_time == 'Mon Jun 10 14:13:20 2024'
+    assert '\r' not in content
+    assert '颱風要來了 各縣市還沒宣布\n大家覺得明天會放假嗎？' in content
+    assert '→ tester04: 看風雨 <8級> 應該不會' in content
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from ptt_dcard_crawler import PTTDcardCrawler
+from utils.article import Article
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'articles.db')
+
+
+@pytest.fixture
+def crawler(db_path):
+    crawler = PTTDcardCrawler(db_path=db_path, tokenize_workers=1)
+    yield crawler
+    crawler.close()
+
+
+def _article(content, post_time=1718000000):
+    return Article(title='[問卦] 颱風假', url=f'https://www.ptt.cc/bbs/Test/M.{post_time}.A.1B2.html',
+                   publish_time='Mon Jun 10 14:13:20 2024', source='PTT-Test', author='tester01',
+                   content=content)
+
+
+def _integrity_check(conn):
+    conn.execute("INSERT INTO articles_fts (articles_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_external_client_can_write_articles(crawler, db_path):
+    """其他 SQLite 用戶端沒有註冊 content_text()，仍能新增與刪除文章"""
+    assert crawler.save_articles([_article('颱風要來了，明天會放假嗎？')]) == 1
+    crawler.conn.commit()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        INSERT INTO articles (title, url, publish_time, source, author, content)
+        VALUES ('外部寫入', 'https://example.com/1', '', 'PTT-Test', 'tool', '內容')
+    ''')
+    conn.execute("DELETE FROM articles WHERE source = 'PTT-Test'")
+    conn.commit()
+    assert conn.execute('SELECT COUNT(*) FROM article_segments').fetchone()[0] == 0
+    conn.close()
+
+    assert crawler.search_by_keyword('放假') == []
+
+
+def test_updated_article_replaces_index_entries(crawler):
+    assert crawler.save_articles([_article('颱風要來了，明天會放假嗎？')]) == 1
+    assert len(crawler.search_by_keyword('放假')) == 1
+
+    crawler.save_articles([_article('今天捷運很擠，下班時間真的很擠。')], on_conflict='update')
+    assert crawler.search_by_keyword('放假') == []
+    assert len(crawler.search_by_keyword('捷運')) == 1
+    _integrity_check(crawler.conn)
+
+
+def test_full_rebuild_keeps_search_results(crawler):
+    crawler.save_articles([_article('颱風要來了，明天會放假嗎？'),
+                           _article('今天捷運很擠，下班時間真的很擠。', post_time=1718000100)])
+    assert crawler.rebuild_search_index(only_missing=False) == 2
+    assert len(crawler.search_by_keyword('放假')) == 1
+    assert len(crawler.search_by_keyword('捷運')) == 1
+    _integrity_check(crawler.conn)
@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+import pytest
+
+from utils.sketch import SpaceSaving
+
+
+def _zipf_stream(seed=0, length=20000, vocabulary=2000):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return rng.choices([f'w{rank}' for rank in range(vocabulary)], weights, k=length)
+
+
+def test_exact_when_distinct_items_fit():
+    stream = _zipf_stream(vocabulary=50)
+    sketch = SpaceSaving(60)
+    for item in stream:
+        sketch.add(item)
+    assert dict(sketch.counts) == Counter(stream)
+    assert sketch.error_bound == 0
+    assert sketch.top(5) == Counter(stream).most_common(5)
+
+
+@pytest.mark.parametrize('capacity', [20, 100, 500])
+def test_overestimate_is_bounded(capacity):
+    """每個估計值不低估，最多高估 total / capacity，且高估量不超過記錄的 errors"""
+    stream = _zipf_stream()
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+
+    assert len(sketch.counts) == capacity
+    assert sketch.total == len(stream)
+    assert sketch.error_bound == len(stream) / capacity
+    for item, estimate in sketch.counts.items():
+        assert exact[item] <= estimate <= exact[item] + sketch.error_bound
+        assert estimate - sketch.errors[item] <= exact[item]
+
+
+@pytest.mark.parametrize('capacity', [20, 100, 500])
+def test_frequent_items_are_kept(capacity):
+    """真實次數超過 total / capacity 的詞一定保留在摘要中"""
+    stream = _zipf_stream(seed=1)
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+    for item, count in Counter(stream).items():
+        if count > len(stream) / capacity:
+            assert item in sketch.counts
+
+
+def test_weighted_updates_match_unit_updates_bound():
+    exact = Counter(_zipf_stream(seed=2))
+    sketch = SpaceSaving.from_error(0.01)
+    assert sketch.capacity == 100
+    sketch.update(exact)
+    assert sketch.total == sum(exact.values())
+    for item, estimate in sketch.counts.items():
+        assert exact[item] <= estimate <= exact[item] + sketch.error_bound
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from ptt_dcard_crawler import PTTDcardCrawler
+from utils.article import Article
+from utils.parallel_counter import count_terms_per_article
+from utils.token_cache import TokenCache
+
+CONTENT = '颱風要來了，各縣市還沒宣布停班停課，大家覺得明天會放假嗎？'
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    crawler = PTTDcardCrawler(db_path=str(tmp_path / 'articles.db'), tokenize_workers=1)
+    yield crawler
+    crawler.close()
+
+
+def _article():
+    return Article(title='[問卦] 颱風假', url='https://www.ptt.cc/bbs/Test/M.1718000000.A.1B2.html',
+                   publish_time='Mon Jun 10 14:13:20 2024', source='PTT-Test', author='tester01',
+                   content=CONTENT)
+
+
+def test_round_trip(crawler):
+    counts = {'颱風': 2, '停班停課': 1}
+    crawler.token_cache.put_many([CONTENT], [counts])
+    crawler.conn.commit()
+    assert crawler.token_cache.get_many([CONTENT, '沒有快取的內容']) == [counts, None]
+    assert TokenCache(crawler.conn).get_many([CONTENT]) == [counts]
+
+
+def test_rollback_does_not_leave_stale_term_ids(crawler, monkeypatch):
+    """保存失敗回滾後，回滾前新增的詞彙 id 被其他詞彙重用，快取與文章詞頻仍對應到正確的詞"""
+    expected = count_terms_per_article([CONTENT], workers=1)[0]
+
+    def fail(articles_by_id):
+        raise sqlite3.OperationalError('database or disk is full')
+
+    # 斷詞結果與新詞彙在保存的交易中寫入，之後整批回滾
+    monkeypatch.setattr(crawler, '_index_search', fail)
+    assert crawler.save_articles([_article()]) == 0
+    assert crawler.last_save_stats['errors'] == 1
+    monkeypatch.undo()
+
+    # SQLite 把回滾掉的 id 分配給其他詞彙
+    other = {'捷運': 1, '高鐵': 3, '便當': 2}
+    crawler.token_cache.put_many(['另一篇文章'], [other])
+    crawler.conn.commit()
+
+    assert crawler.save_articles([_article()]) == 1
+    assert crawler.token_cache.get_many([CONTENT, '另一篇文章']) == [expected, other]
+    assert TokenCache(crawler.conn).get_many([CONTENT, '另一篇文章']) == [expected, other]
+    stored = dict(crawler.conn.execute('''
+        SELECT t.term, at.count FROM article_terms at JOIN terms t ON t.id = at.term_id
+    ''').fetchall())
+    assert stored == expected
@@ -0,0 +1,94 @@
+# 寫入前預先計算的欄位，不屬於文章資料
+_DERIVED = ('term_counts', 'segments')
+
+
+class Article:
+    """一篇抓取到的文章
+
+    以 __slots__ 存放欄位，比字典省記憶體；同時支援 article['title']、article.get('remote_rev')
+    等字典式存取，既有以字典處理文章的程式碼不需修改。
+    term_counts 為管線斷詞階段預先算好的詞頻，segments 為預先算好的全文檢索斷詞結果，
+    寫入資料庫時直接使用。
+    """
+
+    __slots__ = ('title', 'url', 'publish_time', 'source', 'author', 'content', 'remote_rev',
+                 'term_counts', 'segments')
+
+    def __init__(self, title, url, publish_time, source, author, content, remote_rev=None,
+                 term_counts=None, segments=None):
+        self.title = title
+        self.url = url
+        self.publish_time = publish_time
+        self.source = source
+        self.author = author
+        self.content = content
+        self.remote_rev = remote_rev
+        self.term_counts = term_counts
+        self.segments = segments
+
+    @classmethod
+    def from_dict(cls, data):
+        """由文章字典建立，已是 Article 時直接回傳"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self):
+        """轉為字典（不含 term_counts 與 segments）"""
+        return {field: getattr(self, field) for field in self.__slots__ if field not in _DERIVED}
+
+    def keys(self):
+        return [field for field in self.__slots__ if field not in _DERIVED]
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Article(source={self.source!r}, url={self.url!r}, title={self.title!r})"
+
+
+class ArticleSink:
+    """抓取階段產生文章的去處
+
+    每批文章轉交給 on_articles；collect 為 False 時不保留文章，
+    串流寫入資料庫時記憶體用量不隨抓取量增加。
+    """
+
+    def __init__(self, on_articles=None, collect=True):
+        """
+        Args:
+            on_articles (callable): 以文章列表呼叫的回呼
+            collect (bool): 是否保留所有文章，抓取結束後由 articles 取得
+        """
+        self.on_articles = on_articles
+        self.collect = collect
+        self.articles = []
+        self.count = 0
+
+    def emit(self, articles):
+        """送出一批文章"""
+        if not articles:
+            return
+        self.count += len(articles)
+        if self.on_articles:
+            self.on_articles(articles)
+        if self.collect:
+            self.articles.extend(articles)
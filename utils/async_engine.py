@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncFetcher:
+    """以 asyncio 排程、執行緒池送出請求的抓取引擎
+
+    全域並發由執行緒池大小控制；每個主機的並發上限、速率、重試與斷路器由 HttpTransport 處理，
+    取代原本每篇文章後固定的 time.sleep。
+    transport 帶有 cancel_event 時，取消後尚未送出的請求直接回傳 None，重試等待也會立即中止。
+    """
+
+    def __init__(self, transport, max_concurrency=16):
+        """
+        Args:
+            transport (HttpTransport): 共用的 HTTP 傳輸層
+            max_concurrency (int): 全域同時請求數上限
+        """
+        self.transport = transport
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        # 已送出但尚未完成的請求，取消後關閉時逐一取消（Python 3.8 的 shutdown 沒有 cancel_futures）
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """是否已取消"""
+        return self.transport.cancelled
+
+    def get(self, url, board=''):
+        """以同步方式抓取單一網址，同樣受並發與禮貌預算限制
+
+        Args:
+            url (str): 網址
+            board (str): 看板名稱，用於斷路器與指標標籤
+
+        Returns:
+            requests.Response: 成功時的回應，失敗時為 None
+        """
+        return self.transport.get(url, board)
+
+    async def fetch(self, url, board=''):
+        """非同步抓取單一網址
+
+        Returns:
+            requests.Response: 成功時的回應，失敗時為 None
+        """
+        if self.cancelled:
+            return None
+        future = self._executor.submit(self.get, url, board)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return await asyncio.wrap_future(future)
+
+    def _discard(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    async def fetch_all(self, urls, board=''):
+        """並發抓取多個網址，結果順序與輸入相同"""
+        return await asyncio.gather(*(self.fetch(url, board) for url in urls))
+
+    def close(self):
+        """關閉執行緒池，已取消時捨棄尚未開始的請求"""
+        if self.cancelled:
+            with self._pending_lock:
+                pending = list(self._pending)
+            for future in pending:
+                # 已開始執行的請求無法取消，cancel() 只對仍在排隊的請求有效
+                future.cancel()
+        self._executor.shutdown(wait=True)
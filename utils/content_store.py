@@ -0,0 +1,336 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 各壓縮方式的預設壓縮等級
+COMPRESSION_LEVELS = {'zlib': 6, 'zstd': 3}
+
+# 短於此長度（字元）的內容壓縮效益低，維持文字
+MIN_COMPRESS_LENGTH = 64
+
+# 訓練字典的大小上限（位元組）；zlib 的預設字典只有最後 32KB 有效
+DICTIONARY_SIZE = {'zlib': 32 * 1024, 'zstd': 112 * 1024}
+
+# 訓練字典時取樣的文章數
+DICTIONARY_SAMPLES = 2000
+
+# 單一區段檔的大小上限，超過時改寫入下一個區段
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+# 壓縮內容以 BLOB 存放，開頭為 1 位元組的種類：
+#   z / s：zlib / zstd 壓縮，其後為 4 位元組的字典 id（0 表示未使用字典）
+#   a：已封存到區段檔的指標，其後為區段編號、位移與長度
+# 未壓縮的內容仍以 TEXT 存放，讀取時依型別與種類還原
+_COMPRESSED_HEADER = struct.Struct('>cI')
+_ARCHIVE_POINTER = struct.Struct('>cIQI')
+_CODEC_KINDS = {'zlib': b'z', 'zstd': b's'}
+_KIND_CODECS = {kind: codec for codec, kind in _CODEC_KINDS.items()}
+ARCHIVED_KIND = b'a'
+
+# 區段檔中每筆記錄的標頭：文章 id 與內容長度，可在索引遺失時掃描區段檔重建
+_RECORD_HEADER = struct.Struct('>QI')
+_SEGMENT_NAME = re.compile(r'^segment-(\d+)\.dat$')
+
+
+def available_codecs():
+    """目前環境可用的壓縮方式"""
+    return ['zlib'] + (['zstd'] if zstandard is not None else [])
+
+
+def train_dictionary(codec, samples, size=None):
+    """由文章樣本訓練壓縮字典
+
+    zstd 使用 zstandard 的字典訓練；zlib 沒有訓練工具，改以多篇文章共有的行
+    （例如轉錄標頭、發信站資訊）加上近期文章內容組成預設字典，共有的行放在最後，
+    距離壓縮視窗最近。
+
+    Args:
+        codec (str): 'zlib' 或 'zstd'
+        samples (list): 文章內容列表
+        size (int): 字典大小上限，預設為 DICTIONARY_SIZE
+
+    Returns:
+        bytes: 字典內容
+    """
+    size = size or DICTIONARY_SIZE[codec]
+    samples = [sample for sample in samples if sample]
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError('未安裝 zstandard')
+        return zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples]).as_bytes()
+    if codec != 'zlib':
+        raise ValueError(f"不支援的壓縮方式: {codec}")
+
+    line_counts = Counter()
+    for sample in samples:
+        line_counts.update({line.strip() for line in sample.split('\n') if len(line.strip()) >= 4})
+    common = [line for line, count in sorted(line_counts.items(), key=lambda item: item[1] * len(item[0]))
+              if count >= 2]
+    tail = '\n'.join(common).encode('utf-8')[-size:]
+    filler = '\n'.join(samples).encode('utf-8')[-(size - len(tail)):] if len(tail) < size else b''
+    return filler + tail
+
+
+class SegmentStore:
+    """僅附加寫入的封存區段檔，以記憶體映射讀取
+
+    每筆記錄為 (文章 id, 長度) 標頭加上內容，已寫入的位元組不再修改；
+    記錄的位置由呼叫端保存（見 ContentStore.archive），讀取時直接以位移切片。
+    """
+
+    def __init__(self, directory, max_bytes=SEGMENT_MAX_BYTES):
+        """
+        Args:
+            directory (str): 區段檔所在目錄，首次寫入時建立
+            max_bytes (int): 單一區段檔的大小上限
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:06d}.dat')
+
+    def _last_segment(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        numbers = [int(match.group(1)) for match in map(_SEGMENT_NAME.match, os.listdir(self.directory))
+                   if match]
+        return max(numbers, default=0)
+
+    def append(self, records):
+        """附加寫入記錄並同步到磁碟
+
+        Args:
+            records (list): (文章 id, 內容位元組) 元組的列表
+
+        Returns:
+            list: 與輸入順序相同的 (區段編號, 位移, 長度) 元組列表
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        locations = []
+        with self._lock:
+            segment = self._last_segment() or 1
+            handle = open(self._path(segment), 'ab')
+            try:
+                for article_id, data in records:
+                    if handle.tell() and handle.tell() + _RECORD_HEADER.size + len(data) > self.max_bytes:
+                        handle.flush()
+                        os.fsync(handle.fileno())
+                        handle.close()
+                        segment += 1
+                        handle = open(self._path(segment), 'ab')
+                    handle.write(_RECORD_HEADER.pack(article_id, len(data)))
+                    locations.append((segment, handle.tell(), len(data)))
+                    handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            finally:
+                handle.close()
+        return locations
+
+    def read(self, segment, offset, length):
+        """讀取一筆記錄的內容"""
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < offset + length:
+                # 區段檔在映射後又附加寫入時重新映射
+                if mapped is not None:
+                    mapped.close()
+                with open(self._path(segment), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped[offset:offset + length]
+
+    def scan(self, segment):
+        """依序列出區段檔中的記錄，用於檢查或重建位置
+
+        Yields:
+            tuple: (文章 id, 位移, 長度)
+        """
+        with open(self._path(segment), 'rb') as f:
+            data = f.read()
+        position = 0
+        while position + _RECORD_HEADER.size <= len(data):
+            article_id, length = _RECORD_HEADER.unpack_from(data, position)
+            position += _RECORD_HEADER.size
+            if position + length > len(data):
+                break
+            yield article_id, position, length
+            position += length
+
+    def close(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+class ContentStore:
+    """文章內容的壓縮、封存與還原
+
+    compression 為 None 時新內容以文字存放；為 'zlib' 或 'zstd' 時壓縮後以 BLOB 存放，
+    並使用該壓縮方式最新訓練的字典。讀取時依內容開頭的種類還原，
+    不同時期以不同方式、不同字典寫入的文章可以混合存在。
+    字典存放於 content_dictionaries 資料表，寫入不提交交易。
+    """
+
+    def __init__(self, conn, compression=None, archive_dir=None, level=None):
+        """
+        Args:
+            conn (sqlite3.Connection): 資料庫連線
+            compression (str): None、'zlib' 或 'zstd'
+            archive_dir (str): 封存區段檔的目錄
+            level (int): 壓縮等級，預設為 COMPRESSION_LEVELS
+        """
+        if compression is not None and compression not in _CODEC_KINDS:
+            raise ValueError(f"不支援的壓縮方式: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError('未安裝 zstandard，無法使用 zstd 壓縮')
+        self.conn = conn
+        self.compression = compression
+        self.level = level
+        self.segments = SegmentStore(archive_dir) if archive_dir else None
+        self._lock = threading.Lock()
+        self._zstd_compressors = {}
+        self._zstd_decompressors = {}
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS content_dictionaries (
+                id INTEGER PRIMARY KEY,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+        self._dictionaries = {dictionary_id: (codec, data) for dictionary_id, codec, data in
+                              cursor.execute('SELECT id, codec, data FROM content_dictionaries')}
+
+    def _current_dictionary(self, codec):
+        ids = [dictionary_id for dictionary_id, (name, _) in self._dictionaries.items() if name == codec]
+        return max(ids, default=0)
+
+    def train(self, samples, codec=None):
+        """以文章樣本訓練新字典，之後壓縮的內容改用新字典
+
+        Args:
+            samples (list): 文章內容列表
+            codec (str): 壓縮方式，預設為目前的 compression
+
+        Returns:
+            int: 新字典的 id
+        """
+        codec = codec or self.compression
+        if codec is None:
+            raise ValueError('未指定壓縮方式')
+        data = train_dictionary(codec, samples)
+        cursor = self.conn.cursor()
+        cursor.execute('INSERT INTO content_dictionaries (codec, data) VALUES (?, ?)', (codec, data))
+        self._dictionaries[cursor.lastrowid] = (codec, data)
+        return cursor.lastrowid
+
+    def compress(self, text, codec=None):
+        """壓縮文字，回傳含標頭的位元組"""
+        codec = codec or self.compression or 'zlib'
+        level = self.level or COMPRESSION_LEVELS[codec]
+        dictionary_id = self._current_dictionary(codec)
+        data = text.encode('utf-8')
+        if codec == 'zlib':
+            if dictionary_id:
+                compressor = zlib.compressobj(level, zdict=self._dictionaries[dictionary_id][1])
+            else:
+                compressor = zlib.compressobj(level)
+            body = compressor.compress(data) + compressor.flush()
+        else:
+            with self._lock:
+                compressor = self._zstd_compressors.get(dictionary_id)
+                if compressor is None:
+                    dict_data = (zstandard.ZstdCompressionDict(self._dictionaries[dictionary_id][1])
+                                 if dictionary_id else None)
+                    compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+                    self._zstd_compressors[dictionary_id] = compressor
+                body = compressor.compress(data)
+        return _COMPRESSED_HEADER.pack(_CODEC_KINDS[codec], dictionary_id) + body
+
+    def encode(self, text):
+        """依目前的儲存方式轉為寫入資料庫的值"""
+        if self.compression is None or text is None or len(text) < MIN_COMPRESS_LENGTH:
+            return text
+        return self.compress(text)
+
+    def _decompress(self, value):
+        kind, dictionary_id = _COMPRESSED_HEADER.unpack_from(value)
+        body = value[_COMPRESSED_HEADER.size:]
+        codec = _KIND_CODECS.get(kind)
+        if codec is None:
+            raise ValueError(f"無法辨識的內容格式: {kind!r}")
+        if dictionary_id and dictionary_id not in self._dictionaries:
+            raise ValueError(f"找不到壓縮字典: {dictionary_id}")
+        if codec == 'zlib':
+            if dictionary_id:
+                decompressor = zlib.decompressobj(zdict=self._dictionaries[dictionary_id][1])
+            else:
+                decompressor = zlib.decompressobj()
+            data = decompressor.decompress(body) + decompressor.flush()
+        else:
+            if zstandard is None:
+                raise ImportError('未安裝 zstandard，無法讀取 zstd 壓縮的內容')
+            with self._lock:
+                decompressor = self._zstd_decompressors.get(dictionary_id)
+                if decompressor is None:
+                    dict_data = (zstandard.ZstdCompressionDict(self._dictionaries[dictionary_id][1])
+                                 if dictionary_id else None)
+                    decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+                    self._zstd_decompressors[dictionary_id] = decompressor
+                data = decompressor.decompress(body)
+        return data.decode('utf-8')
+
+    def decode(self, value):
+        """將資料庫中的值還原為文字，可註冊為 SQLite 函式在查詢中使用"""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:1] == ARCHIVED_KIND:
+            if self.segments is None:
+                raise ValueError('內容已封存，但未設定封存目錄')
+            _, segment, offset, length = _ARCHIVE_POINTER.unpack_from(value)
+            value = self.segments.read(segment, offset, length)
+        return self._decompress(value)
+
+    @staticmethod
+    def is_archived(value):
+        """資料庫中的值是否為封存指標"""
+        return isinstance(value, bytes) and value[:1] == ARCHIVED_KIND
+
+    def archive(self, contents):
+        """將內容壓縮後附加到封存區段檔
+
+        Args:
+            contents (dict): 文章 id 對應內容文字的字典
+
+        Returns:
+            dict: 文章 id 對應封存指標的字典，寫回 content 欄位後讀取時即由區段檔還原
+        """
+        if self.segments is None:
+            raise ValueError('未設定封存目錄')
+        article_ids = list(contents)
+        locations = self.segments.append(
+            [(article_id, self.compress(contents[article_id])) for article_id in article_ids])
+        return {article_id: _ARCHIVE_POINTER.pack(ARCHIVED_KIND, *location)
+                for article_id, location in zip(article_ids, locations)}
+
+    def close(self):
+        if self.segments is not None:
+            self.segments.close()
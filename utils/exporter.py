@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+import time
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+except ImportError:
+    Workbook = None
+
+# 副檔名對應的匯出格式
+EXTENSIONS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.xlsx': 'xlsx'
+}
+
+# 整數欄位，Parquet 以 int64 存放，其餘欄位為字串
+INTEGER_COLUMNS = {'id', 'published_at', 'canonical_id'}
+
+# Excel 單一儲存格的字元數上限
+XLSX_CELL_LIMIT = 32767
+
+
+def detect_format(path):
+    """由副檔名判斷匯出格式
+
+    Returns:
+        str: 'jsonl'、'csv'、'parquet' 或 'xlsx'
+    """
+    fmt = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"無法由副檔名判斷匯出格式: {path}")
+    return fmt
+
+
+class JsonlWriter:
+    """每行一篇文章的 JSON"""
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.writelines(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n'
+                              for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter:
+    """含標題列的 CSV，以 UTF-8 BOM 開頭讓 Excel 正確辨識中文"""
+
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """欄式儲存的 Parquet，每批寫成一個 row group（需另外安裝 pyarrow）"""
+
+    def __init__(self, path, columns):
+        if pyarrow is None:
+            raise ImportError('未安裝 pyarrow，無法匯出 Parquet')
+        self.columns = columns
+        self.schema = pyarrow.schema(
+            [(column, pyarrow.int64() if column in INTEGER_COLUMNS else pyarrow.string())
+             for column in columns])
+        self._writer = pyarrow_parquet.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        if not rows:
+            return
+        data = {column: list(values) for column, values in zip(self.columns, zip(*rows))}
+        self._writer.write_table(pyarrow.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class XlsxWriter:
+    """以 openpyxl 的 write-only 模式逐列寫入 Excel，不在記憶體保留整份工作表"""
+
+    def __init__(self, path, columns):
+        if Workbook is None:
+            raise ImportError('未安裝 openpyxl，無法匯出 Excel')
+        self.path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet('articles')
+        self._sheet.append(list(columns))
+
+    @staticmethod
+    def _cell(value):
+        if not isinstance(value, str):
+            return value
+        # 移除 Excel 不接受的控制字元，過長的內容截斷到儲存格上限
+        return ILLEGAL_CHARACTERS_RE.sub('', value)[:XLSX_CELL_LIMIT]
+
+    def write(self, rows):
+        for row in rows:
+            self._sheet.append([self._cell(value) for value in row])
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+WRITERS = {
+    'jsonl': JsonlWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+    'xlsx': XlsxWriter
+}
+
+
+def available_formats():
+    """目前環境可用的匯出格式"""
+    return [fmt for fmt in WRITERS
+            if (fmt != 'parquet' or pyarrow is not None) and (fmt != 'xlsx' or Workbook is not None)]
+
+
+def write_export(path, batches, columns, fmt=None):
+    """將逐批產生的列寫入檔案
+
+    先寫入暫存檔，全部完成後才取代目標檔案，中途失敗不會留下不完整的檔案。
+
+    Args:
+        path (str): 輸出路徑
+        batches: 產生列列表的可迭代物件，每個列表寫入一次
+        columns (tuple): 欄位名稱
+        fmt (str): 匯出格式，預設由副檔名判斷
+
+    Returns:
+        int: 寫入的列數
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"不支援的匯出格式: {fmt}")
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    writer = WRITERS[fmt](tmp_path, columns)
+    count = 0
+    try:
+        for rows in batches:
+            writer.write(rows)
+            count += len(rows)
+        writer.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+class ExportState:
+    """各匯出目標的增量水位，記錄上次匯出到的最大文章 id
+
+    寫入不提交交易，由呼叫端在檔案寫入完成後提交。
+    """
+
+    def __init__(self, conn):
+        """
+        Args:
+            conn (sqlite3.Connection): 資料庫連線
+        """
+        self.conn = conn
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS export_state (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                exported_at INTEGER NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def get(self, name):
+        """上次匯出到的最大文章 id，從未匯出時為 0"""
+        row = self.conn.execute('SELECT last_id FROM export_state WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    def set(self, name, last_id, rows):
+        self.conn.execute('''
+            INSERT INTO export_state (name, last_id, rows, exported_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                last_id = excluded.last_id,
+                rows = excluded.rows,
+                exported_at = excluded.exported_at
+        ''', (name, last_id, rows, int(time.time())))
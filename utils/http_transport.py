@@ -0,0 +1,336 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from utils.metrics import METRICS
+
+# 會重試的狀態碼，其餘 4xx（例如已刪除文章的 404）直接回傳失敗
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# 表示主機壅塞、需要降低請求速率的狀態碼
+CONGESTION_STATUS = {429, 503}
+
+# 指數退避的基準與上限秒數，實際等待為 0 到該值之間的隨機值（full jitter）
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# 伺服器要求等待（Retry-After）的最長秒數
+MAX_RETRY_AFTER = 120
+
+# AIMD：無壅塞時每秒約增加的請求速率，壅塞時乘上的比例與速率下限
+ADDITIVE_INCREASE = 0.5
+MULTIPLICATIVE_DECREASE = 0.5
+MIN_RATE = 0.2
+
+# 延遲指數移動平均的權重；平均延遲超過基準的倍數且超過下限秒數時視為壅塞
+LATENCY_ALPHA = 0.2
+LATENCY_FACTOR = 3.0
+MIN_CONGESTED_LATENCY = 0.5
+
+# 斷路器：連續失敗次數達門檻即開啟，冷卻秒數後放行一個試探請求
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+
+
+def interruptible_sleep(seconds, cancel_event=None):
+    """等待指定秒數，取消事件觸發時立即返回
+
+    Returns:
+        bool: 等待期間是否已取消
+    """
+    if cancel_event is None:
+        time.sleep(seconds)
+        return False
+    return cancel_event.wait(seconds)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """第 attempt 次重試前的等待秒數（指數退避加上 full jitter）"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 標頭，可為秒數或 HTTP 日期
+
+    Returns:
+        float: 需等待的秒數（限制在 0 到 MAX_RETRY_AFTER 之間），無法解析時為 None
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+class HostState:
+    """單一主機的並發上限、請求速率與暫停狀態
+
+    速率以 AIMD 調整：成功且延遲正常時緩慢增加，遇到 429/503、逾時或延遲明顯升高時減半，
+    上限為設定的每秒請求數。伺服器回傳 Retry-After 時，該主機的所有請求暫停到指定時間。
+    """
+
+    def __init__(self, host, requests_per_second, concurrency, adaptive=True):
+        """
+        Args:
+            host (str): 主機名稱，僅用於指標標籤
+            requests_per_second (float): 每秒最多送出的請求數，0 或 None 表示不限制（不調整速率）
+            concurrency (int): 同時進行中的請求上限
+            adaptive (bool): 是否依延遲與錯誤調整速率
+        """
+        self.host = host
+        self.max_rate = requests_per_second or 0.0
+        self.rate = self.max_rate
+        self.adaptive = adaptive and self.max_rate > 0
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.latency = None
+        self.latency_baseline = None
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    def wait(self, cancel_event=None):
+        """等待下一個可用的發送時段，取消事件觸發時提前返回"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + (1.0 / self.rate if self.rate else 0.0)
+        delay = slot - now
+        if delay > 0:
+            interruptible_sleep(delay, cancel_event)
+
+    def pause(self, seconds):
+        """暫停此主機的所有請求指定秒數"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def on_success(self, latency):
+        """記錄成功請求的延遲，延遲正常時增加速率，明顯升高時降低速率"""
+        with self._lock:
+            self.latency = latency if self.latency is None else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency)
+            # 基準取觀察到的最低延遲，並緩慢上移以適應網路狀況改變
+            if self.latency_baseline is None or latency < self.latency_baseline:
+                self.latency_baseline = latency
+            else:
+                self.latency_baseline += (latency - self.latency_baseline) * 0.01
+            congested = (self.latency > MIN_CONGESTED_LATENCY
+                         and self.latency > LATENCY_FACTOR * self.latency_baseline)
+            if self.adaptive and not congested:
+                self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE / self.rate)
+        if congested:
+            self.on_congestion()
+
+    def on_congestion(self):
+        """主機壅塞時將速率減半，同一個請求間隔內只調整一次"""
+        if not self.adaptive:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < max(1.0 / self.rate, self.latency or 0.0):
+                return
+            self._last_decrease = now
+            self.rate = max(MIN_RATE, self.rate * MULTIPLICATIVE_DECREASE)
+            rate = self.rate
+        METRICS.inc('http_rate_decreases_total', host=self.host)
+        print(f"{self.host} 回應變慢或過載，請求速率降為每秒 {rate:.2f} 次")
+
+
+class CircuitBreaker:
+    """單一主機與看板的斷路器
+
+    連續失敗達門檻時開啟，開啟期間的請求直接失敗而不等待重試，
+    冷卻後只放行一個試探請求，成功即關閉，失敗則重新開啟。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        """
+        Args:
+            name (str): 名稱，用於訊息
+            threshold (int): 開啟前允許的連續失敗次數
+            cooldown (float): 開啟後到允許試探請求的秒數
+        """
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允許送出請求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self):
+        """放行的請求未送出時歸還試探機會"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"{self.name} 已恢復，斷路器關閉")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                print(f"{self.name} 連續失敗 {self.failures} 次，斷路器開啟 {self.cooldown} 秒")
+
+
+class HttpTransport:
+    """PTT 與 Dcard 共用的 HTTP 傳輸層
+
+    在共用連線池的 requests.Session 之上提供：每個主機的並發上限與 AIMD 調整的請求速率、
+    指數退避加隨機抖動的重試、遵守 Retry-After，以及以主機與看板為單位的斷路器，
+    讓單一失效的看板快速失敗而不拖慢其他看板。
+    """
+
+    def __init__(self, session, per_host_concurrency=4, requests_per_second=4.0, timeout=15,
+                 max_retries=3, cancel_event=None, adaptive=True):
+        """
+        Args:
+            session (requests.Session): 共用連線池的 HTTP session
+            per_host_concurrency (int): 每個主機同時請求數上限
+            requests_per_second (float): 每個主機每秒請求數上限，0 表示不限制
+            timeout (int): 單次請求逾時秒數
+            max_retries (int): 失敗時的最大嘗試次數
+            cancel_event (threading.Event): 觸發後不再送出請求，重試等待也立即中止
+            adaptive (bool): 是否依延遲與錯誤以 AIMD 調整請求速率
+        """
+        self.session = session
+        self.per_host_concurrency = per_host_concurrency
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cancel_event = cancel_event
+        self.adaptive = adaptive
+        self._hosts = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """是否已取消"""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def host_state(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostState(host, self.requests_per_second,
+                                              self.per_host_concurrency, self.adaptive)
+            return self._hosts[host]
+
+    def breaker(self, host, board=''):
+        key = (host, board)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(f"{host} {board}".strip())
+            return self._breakers[key]
+
+    def request(self, method, url, board='', **kwargs):
+        """送出請求，失敗時依策略重試
+
+        Args:
+            method (str): HTTP 方法
+            url (str): 網址
+            board (str): 看板名稱，用於斷路器與指標標籤
+            **kwargs: 傳給 requests 的其他參數
+
+        Returns:
+            requests.Response: 成功時的回應，失敗、斷路器開啟或已取消時為 None
+        """
+        host = urlsplit(url).netloc
+        state = self.host_state(host)
+        breaker = self.breaker(host, board)
+        kwargs.setdefault('timeout', self.timeout)
+        for retry in range(self.max_retries):
+            if self.cancelled:
+                return None
+            if not breaker.allow():
+                METRICS.inc('http_short_circuits_total', host=host, board=board)
+                return None
+            if retry:
+                METRICS.inc('http_retries_total', host=host, board=board)
+            retry_after = None
+            try:
+                with state.semaphore:
+                    state.wait(self.cancel_event)
+                    if self.cancelled:
+                        breaker.release()
+                        return None
+                    start = time.perf_counter()
+                    response = self.session.request(method, url, **kwargs)
+                latency = time.perf_counter() - start
+                METRICS.observe('http_request_seconds', latency, host=host)
+                METRICS.inc('http_requests_total', host=host, board=board, status=response.status_code)
+                if response.ok:
+                    breaker.record_success()
+                    state.on_success(latency)
+                    return response
+                if response.status_code in CONGESTION_STATUS:
+                    state.on_congestion()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after:
+                        state.pause(retry_after)
+                if response.status_code not in RETRYABLE_STATUS:
+                    # 主機仍正常回應，不計入斷路器失敗
+                    breaker.record_success()
+                    print(f"訪問失敗: {response.status_code} {url}")
+                    return None
+                breaker.record_failure()
+                print(f"訪問失敗 (嘗試 {retry + 1}/{self.max_retries}): {response.status_code} {url}")
+            except requests.exceptions.Timeout:
+                METRICS.inc('http_timeouts_total', host=host, board=board)
+                state.on_congestion()
+                breaker.record_failure()
+                print(f"訪問超時 (嘗試 {retry + 1}/{self.max_retries}): {url}")
+            except Exception as e:
+                METRICS.inc('http_errors_total', host=host, board=board)
+                breaker.record_failure()
+                print(f"訪問時發生錯誤 (嘗試 {retry + 1}/{self.max_retries}): {str(e)}")
+            if retry < self.max_retries - 1:
+                interruptible_sleep(max(retry_after or 0.0, backoff_delay(retry)), self.cancel_event)
+        METRICS.inc('http_failures_total', host=host, board=board)
+        return None
+
+    def get(self, url, board='', **kwargs):
+        """GET 請求，見 request()"""
+        return self.request('GET', url, board, **kwargs)
+
+    def post(self, url, board='', **kwargs):
+        """POST 請求，見 request()"""
+        return self.request('POST', url, board, **kwargs)
@@ -0,0 +1,235 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prometheus 指標名稱前綴
+METRIC_PREFIX = 'crawler_'
+
+# 延遲直方圖的上界（秒）
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metrics:
+    """執行緒安全的計數器與延遲直方圖
+
+    每次記錄只做一次加鎖與字典更新，可在正式環境常開。
+    可輸出為 Prometheus 文字格式或 JSON 摘要。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (tuple): 直方圖各區間的上界（秒），由小到大
+        """
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """累加計數器"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """記錄一次耗時"""
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """計時區塊並記錄到直方圖"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """清除所有指標"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def _snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(value[0]), value[1], value[2])
+                          for key, value in self._histograms.items()}
+        return counters, histograms
+
+    def snapshot(self):
+        """目前所有指標的複本，可傳到其他行程以 merge() 合併
+
+        Returns:
+            tuple: (計數器字典, 直方圖字典)
+        """
+        return self._snapshot()
+
+    def merge(self, snapshot):
+        """合併其他行程以 snapshot() 取得的指標，直方圖需使用相同的區間"""
+        counters, histograms = snapshot
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, (bucket_counts, total, count) in histograms.items():
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                histogram[0] = [a + b for a, b in zip(histogram[0], bucket_counts)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def _quantile(self, bucket_counts, count, q):
+        """以區間上界估計分位數
+
+        沒有記錄時回傳 None；落在最後一個區間之外時與 Prometheus 的 histogram_quantile
+        相同，回傳最大的有限上界，讓摘要保持為合法的 JSON。
+        """
+        if not count:
+            return None
+        target = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return self.buckets[-1]
+
+    def to_prometheus(self):
+        """輸出 Prometheus 文字格式"""
+        counters, histograms = self._snapshot()
+        lines = []
+        seen = set()
+        for (name, label_key), value in sorted(counters.items()):
+            metric = METRIC_PREFIX + name
+            if metric not in seen:
+                lines.append(f'# TYPE {metric} counter')
+                seen.add(metric)
+            lines.append(f'{metric}{_format_labels(label_key)} {value}')
+
+        for (name, label_key), (bucket_counts, total, count) in sorted(histograms.items()):
+            metric = METRIC_PREFIX + name
+            if metric not in seen:
+                lines.append(f'# TYPE {metric} histogram')
+                seen.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{_format_labels(label_key, [("le", str(bound))])} {cumulative}')
+            lines.append(f'{metric}_bucket{_format_labels(label_key, [("le", "+Inf")])} {count}')
+            lines.append(f'{metric}_sum{_format_labels(label_key)} {total:.6f}')
+            lines.append(f'{metric}_count{_format_labels(label_key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """輸出 JSON 可序列化的摘要
+
+        Returns:
+            dict: 包含 uptime_seconds、counters 與各直方圖 count/sum/mean/p50/p95 的字典，
+                沒有記錄的直方圖其 mean/p50/p95 為 None
+        """
+        counters, histograms = self._snapshot()
+
+        def series(name, label_key):
+            return name + (_format_labels(label_key) if label_key else '')
+
+        result = {
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'counters': {series(name, label_key): value
+                         for (name, label_key), value in sorted(counters.items())},
+            'timings': {}
+        }
+        def quantile_ms(bucket_counts, count, q):
+            seconds = self._quantile(bucket_counts, count, q)
+            return None if seconds is None else seconds * 1000
+
+        for (name, label_key), (bucket_counts, total, count) in sorted(histograms.items()):
+            result['timings'][series(name, label_key)] = {
+                'count': count,
+                'sum_seconds': round(total, 6),
+                'mean_ms': round(total * 1000 / count, 3) if count else None,
+                'p50_ms': quantile_ms(bucket_counts, count, 0.5),
+                'p95_ms': quantile_ms(bucket_counts, count, 0.95)
+            }
+        return result
+
+    def write_prometheus(self, path):
+        """寫入 Prometheus 文字檔（供 node_exporter textfile collector 讀取），以更名確保完整寫入"""
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def write_summary(self, path):
+        """寫入 JSON 摘要"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2, allow_nan=False)
+
+    def serve(self, port, host='127.0.0.1'):
+        """在背景執行緒提供 /metrics（Prometheus）與 /summary（JSON）端點
+
+        預設只監聽本機；需要由其他主機抓取時傳入 host='0.0.0.0' 或指定的網路介面。
+
+        Returns:
+            ThreadingHTTPServer: 伺服器，呼叫 shutdown() 停止
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith('/summary'):
+                    body = json.dumps(metrics.summary(), ensure_ascii=False, allow_nan=False).encode('utf-8')
+                    content_type = 'application/json'
+                elif self.path.startswith('/metrics') or self.path == '/':
+                    body = metrics.to_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# 全程式共用的指標
+METRICS = Metrics()
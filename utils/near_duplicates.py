@@ -0,0 +1,152 @@
+import hashlib
+
+# 指紋位元數與 LSH 分段：64 位元分為 4 段各 16 位元，
+# 漢明距離不超過 MAX_DISTANCE（3）的兩個指紋至少有一段完全相同（鴿籠原理），
+# 查詢時只需比對同一段數值相同的候選，不必與整個資料庫兩兩比較
+FINGERPRINT_BITS = 64
+BANDS = 4
+BAND_BITS = FINGERPRINT_BITS // BANDS
+MAX_DISTANCE = BANDS - 1
+
+# 不同詞彙少於此數的短文指紋不可靠，不列入比對
+MIN_FEATURES = 8
+
+_SIGN_BIT = 1 << (FINGERPRINT_BITS - 1)
+_BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _hash64(term):
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(term_counts):
+    """以詞頻計算文章內容的 SimHash 指紋
+
+    每個詞的雜湊值依出現次數加權投票決定各位元，轉錄、補充幾句或改動標點的文章
+    與原文的指紋只差少數位元。
+
+    Args:
+        term_counts (dict): {詞: 次數} 字典
+
+    Returns:
+        int: 64 位元指紋，不同詞彙少於 MIN_FEATURES 時為 None
+    """
+    if not term_counts or len(term_counts) < MIN_FEATURES:
+        return None
+    features = [(_hash64(term), count) for term, count in term_counts.items()]
+    half = sum(count for _, count in features) / 2
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        mask = 1 << bit
+        if sum(count for value, count in features if value & mask) > half:
+            fingerprint |= mask
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    """兩個指紋不同的位元數"""
+    return bin((a ^ b) & ((1 << FINGERPRINT_BITS) - 1)).count('1')
+
+
+def bands(fingerprint):
+    """指紋的各段數值
+
+    Returns:
+        list: (段編號, 數值) 元組的列表
+    """
+    return [(band, (fingerprint >> (band * BAND_BITS)) & _BAND_MASK) for band in range(BANDS)]
+
+
+def _to_signed(fingerprint):
+    """SQLite 的 INTEGER 為有號 64 位元，寫入前轉換"""
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint & _SIGN_BIT else fingerprint
+
+
+def _to_unsigned(value):
+    return value & ((1 << FINGERPRINT_BITS) - 1)
+
+
+class NearDuplicateIndex:
+    """以 SimHash 與 LSH 分段索引找出近似重複的文章
+
+    指紋存放於 article_fingerprints，各段數值存放於 fingerprint_bands，
+    查詢一篇文章的候選只需查詢 BANDS 次索引，成本與資料庫大小幾乎無關。
+    寫入不提交交易，由呼叫端與文章一併提交。
+    """
+
+    def __init__(self, conn, max_distance=MAX_DISTANCE):
+        """
+        Args:
+            conn (sqlite3.Connection): 資料庫連線
+            max_distance (int): 視為近似重複的最大漢明距離，不可超過 MAX_DISTANCE
+        """
+        if max_distance > MAX_DISTANCE:
+            raise ValueError(f"漢明距離上限不可超過 {MAX_DISTANCE}")
+        self.conn = conn
+        self.max_distance = max_distance
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_fingerprints (
+                article_id INTEGER PRIMARY KEY,
+                fingerprint INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fingerprint_bands (
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                article_id INTEGER NOT NULL,
+                PRIMARY KEY (band, value, article_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_fingerprint_bands_article ON fingerprint_bands(article_id)')
+        self.conn.commit()
+
+    def find(self, fingerprint):
+        """找出與指紋最接近的已索引文章
+
+        Args:
+            fingerprint (int): simhash() 的結果
+
+        Returns:
+            int: 漢明距離在上限內且最接近的文章 id（距離相同時取 id 最小者），沒有時為 None
+        """
+        cursor = self.conn.cursor()
+        candidates = {}
+        for band, value in bands(fingerprint):
+            cursor.execute('''
+                SELECT f.article_id, f.fingerprint FROM fingerprint_bands b
+                JOIN article_fingerprints f ON f.article_id = b.article_id
+                WHERE b.band = ? AND b.value = ?
+            ''', (band, value))
+            candidates.update(cursor.fetchall())
+        best = None
+        for article_id, value in candidates.items():
+            distance = hamming_distance(fingerprint, _to_unsigned(value))
+            if distance <= self.max_distance and (best is None or (distance, article_id) < best):
+                best = (distance, article_id)
+        return best[1] if best else None
+
+    def add(self, article_id, fingerprint):
+        """索引文章的指紋，覆蓋原有的指紋"""
+        self.remove([article_id])
+        cursor = self.conn.cursor()
+        cursor.execute('INSERT INTO article_fingerprints (article_id, fingerprint) VALUES (?, ?)',
+                       (article_id, _to_signed(fingerprint)))
+        cursor.executemany('INSERT INTO fingerprint_bands (band, value, article_id) VALUES (?, ?, ?)',
+                           [(band, value, article_id) for band, value in bands(fingerprint)])
+
+    def remove(self, article_ids):
+        """移除文章的指紋"""
+        params = [(article_id,) for article_id in article_ids]
+        cursor = self.conn.cursor()
+        cursor.executemany('DELETE FROM article_fingerprints WHERE article_id = ?', params)
+        cursor.executemany('DELETE FROM fingerprint_bands WHERE article_id = ?', params)
+
+    def clear(self):
+        """清空索引"""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM article_fingerprints')
+        cursor.execute('DELETE FROM fingerprint_bands')
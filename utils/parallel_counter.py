@@ -0,0 +1,109 @@
+import atexit
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import jieba
+
+# 短於此長度的詞不計入詞頻（單字多為虛詞與語助詞）
+MIN_TERM_LENGTH = 2
+
+# 文章數少於此值時直接在目前行程計算，避免行程間傳輸的成本
+PARALLEL_THRESHOLD = 2000
+
+# 每個工作行程平均分到的分片數，分片越多負載越平均
+SHARDS_PER_WORKER = 4
+
+_pool = None
+_pool_workers = None
+
+
+def _init_worker():
+    """工作行程初始化：每個行程只載入一次 jieba 字典"""
+    jieba.initialize()
+
+
+def _get_pool(workers):
+    """取得共用的行程池，工作行程數改變時重新建立"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """關閉共用的行程池"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+        _pool_workers = None
+
+
+atexit.register(shutdown_pool)
+
+
+def _shards(items, workers):
+    size = max(1, -(-len(items) // (workers * SHARDS_PER_WORKER)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def count_terms(text):
+    """以 jieba 精確模式斷詞並計算詞頻
+
+    略過長度不足 MIN_TERM_LENGTH 的詞與不含文字或數字的詞（空白、標點、符號）。
+
+    Args:
+        text (str): 文字內容
+
+    Returns:
+        dict: {詞: 次數} 字典
+    """
+    return dict(Counter(word for word in jieba.lcut(text or '')
+                        if len(word.strip()) >= MIN_TERM_LENGTH and any(ch.isalnum() for ch in word)))
+
+
+def _count_each(contents):
+    """分別計算每篇內容的詞頻"""
+    return [count_terms(content) for content in contents]
+
+
+def _resolve_workers(workers):
+    return workers or os.cpu_count() or 1
+
+
+def count_terms_per_article(contents, workers=None, threshold=PARALLEL_THRESHOLD, cache=None):
+    """計算每篇文章各自的詞頻，文章數達門檻時分散到行程池
+
+    Args:
+        contents (list): 文章內容字串列表
+        workers (int): 工作行程數，預設為 CPU 核心數
+        threshold (int): 啟用行程池的最少文章數
+        cache (TokenCache): 斷詞結果快取，命中的文章不再斷詞
+
+    Returns:
+        list: 與輸入順序相同的 {詞: 次數} 字典列表
+    """
+    contents = [content or '' for content in contents]
+    if cache is not None:
+        results = cache.get_many(contents)
+        missing = list(dict.fromkeys(content for content, result in zip(contents, results)
+                                     if result is None))
+        if missing:
+            computed = dict(zip(missing, count_terms_per_article(missing, workers, threshold)))
+            cache.put_many(missing, [computed[content] for content in missing])
+            results = [result if result is not None else computed[content]
+                       for content, result in zip(contents, results)]
+        return results
+
+    workers = _resolve_workers(workers)
+    if len(contents) < threshold or workers <= 1:
+        return _count_each(contents)
+
+    pool = _get_pool(workers)
+    results = []
+    for shard_counts in pool.map(_count_each, _shards(contents, workers)):
+        results.extend(shard_counts)
+    return results
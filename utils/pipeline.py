@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+
+# 每批寫入資料庫的文章數
+DEFAULT_BATCH_SIZE = 50
+
+# 批次未滿時，距上次送出超過此秒數且有新文章到達即送出
+FLUSH_INTERVAL = 2.0
+
+# 各階段之間最多暫存的批數，寫入跟不上時抓取會暫停等待
+QUEUE_BATCHES = 4
+
+# 等待佇列時檢查取消與結束狀態的間隔秒數
+POLL_INTERVAL = 0.5
+
+_DONE = object()
+
+
+def interruptible_put(target, item, cancel_event=None):
+    """放入佇列（執行緒或行程間的佇列皆可），佇列已滿時等待；取消後放棄並回傳 False"""
+    while True:
+        try:
+            target.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+
+
+def _drain(source, worker):
+    """逐一取出佇列項目直到結束標記，或產生項目的執行緒已結束且佇列已空"""
+    while True:
+        try:
+            item = source.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if not worker.is_alive() and source.empty():
+                return
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def stream_articles(crawler, source, board, pages, cancel_event=None, max_pending=None, **fetch_kwargs):
+    """以產生器逐篇取得抓取到的文章
+
+    抓取在背景執行緒進行，文章解析完成即可取得，不會先累積成完整列表；
+    呼叫端處理較慢時，最多暫存 max_pending 篇後抓取暫停。提前結束迭代時會停止抓取。
+
+    Args:
+        crawler (PTTDcardCrawler): 爬蟲
+        source (str): 'ptt' 或 'dcard'
+        board (str): 看板名稱
+        pages (int): 頁數
+        cancel_event (threading.Event): 取消事件
+        max_pending (int): 最多暫存的文章數，預設為 DEFAULT_BATCH_SIZE * QUEUE_BATCHES
+        **fetch_kwargs: 傳給 fetch_articles 的其他參數
+
+    Yields:
+        Article: 文章
+    """
+    cancel_event = cancel_event or threading.Event()
+    articles = queue.Queue(maxsize=max_pending or DEFAULT_BATCH_SIZE * QUEUE_BATCHES)
+
+    def on_articles(batch):
+        for article in batch:
+            if not interruptible_put(articles, article, cancel_event):
+                return
+
+    def run():
+        try:
+            crawler.fetch_articles(source, board, pages, on_articles=on_articles,
+                                   cancel_event=cancel_event, collect=False, **fetch_kwargs)
+        finally:
+            interruptible_put(articles, _DONE, cancel_event)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    finished = False
+    try:
+        yield from _drain(articles, worker)
+        finished = True
+    finally:
+        if not finished:
+            cancel_event.set()
+
+
+class ArticlePipeline:
+    """抓取 → 斷詞 → 寫入的串流管線
+
+    抓取階段每累積 batch_size 篇（或距上次送出超過 FLUSH_INTERVAL 秒）即送出一批，
+    斷詞階段在另一個執行緒預先計算詞頻，寫入階段在第三個執行緒以單一交易提交每一批。
+    三個階段同時進行，中途失敗時已提交的批次不會遺失；階段間的佇列有上限，
+    記憶體用量只與批次大小有關，與抓取總量無關。
+    """
+
+    def __init__(self, crawler, batch_size=DEFAULT_BATCH_SIZE, tokenize=True,
+                 flush_interval=FLUSH_INTERVAL):
+        """
+        Args:
+            crawler (PTTDcardCrawler): 爬蟲，寫入使用其資料庫連線
+            batch_size (int): 每批寫入的文章數
+            tokenize (bool): 是否在獨立的斷詞階段預先計算詞頻，False 時由寫入階段計算
+            flush_interval (float): 批次未滿時最長的累積秒數
+        """
+        self.crawler = crawler
+        self.batch_size = batch_size
+        self.tokenize = tokenize
+        self.flush_interval = flush_interval
+        self.stats = {}
+
+    def _tokenize_stage(self, batches, output):
+        for batch in _drain(batches, self._fetch_thread):
+            if self.tokenize:
+                try:
+                    self.crawler.precompute_terms(batch)
+                except Exception as e:
+                    # 未算出的詞頻留給寫入階段計算
+                    print(f"預先計算詞頻時發生錯誤: {str(e)}")
+            interruptible_put(output, batch)
+        interruptible_put(output, _DONE)
+
+    def _write_stage(self, batches):
+        for batch in _drain(batches, self._tokenize_thread):
+            try:
+                with self.crawler.db_lock:
+                    self.crawler.save_articles(batch)
+                    saved = self.crawler.last_save_stats
+                for key in ('new', 'updated', 'duplicate', 'near_duplicates', 'errors'):
+                    self.stats[key] += saved.get(key, 0)
+            except Exception as e:
+                self.stats['errors'] += len(batch)
+                print(f"寫入文章時發生錯誤: {str(e)}")
+            self.stats['batches'] += 1
+
+    def run(self, source, board, pages, cancel_event=None, **fetch_kwargs):
+        """抓取並串流寫入資料庫
+
+        Args:
+            source (str): 'ptt' 或 'dcard'
+            board (str): 看板名稱
+            pages (int): 頁數
+            cancel_event (threading.Event): 取消事件，取消後已送出的批次仍會寫入
+            **fetch_kwargs: 傳給 fetch_articles 的其他參數
+
+        Returns:
+            dict: fetched、new、updated、duplicate、near_duplicates、errors、batches 與 seconds
+        """
+        start = time.perf_counter()
+        self.stats = {'fetched': 0, 'new': 0, 'updated': 0, 'duplicate': 0, 'near_duplicates': 0,
+                      'errors': 0, 'batches': 0}
+        to_tokenize = queue.Queue(maxsize=QUEUE_BATCHES)
+        to_write = queue.Queue(maxsize=QUEUE_BATCHES)
+        pending = []
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal pending, last_flush
+            if pending:
+                interruptible_put(to_tokenize, pending)
+                pending = []
+            last_flush = time.monotonic()
+
+        def on_articles(articles):
+            self.stats['fetched'] += len(articles)
+            pending.extend(articles)
+            if len(pending) >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                flush()
+
+        self._fetch_thread = threading.current_thread()
+        self._tokenize_thread = threading.Thread(
+            target=self._tokenize_stage, args=(to_tokenize, to_write), daemon=True)
+        writer = threading.Thread(target=self._write_stage, args=(to_write,), daemon=True)
+        self._tokenize_thread.start()
+        writer.start()
+        try:
+            self.crawler.fetch_articles(source, board, pages, on_articles=on_articles,
+                                        cancel_event=cancel_event, collect=False, **fetch_kwargs)
+            flush()
+        finally:
+            interruptible_put(to_tokenize, _DONE)
+            self._tokenize_thread.join()
+            writer.join()
+        self.stats['seconds'] = round(time.perf_counter() - start, 3)
+        return self.stats
@@ -0,0 +1,294 @@
+import html as html_lib
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# PTT 頁面的預設編碼
+PTT_ENCODING = 'utf-8'
+
+# 略過內文的元素，與 BeautifulSoup 的 .text 一致
+_SKIPPED_TEXT_TAGS = ('script', 'style', 'template')
+
+# BeautifulSoup 將只含這些 ASCII 空白的文字節點換成單一換行（含換行時）或空格
+_ASCII_SPACES = ' \n\t\x0c\r'
+
+# 註解與 script/style 區塊移除後留下的空標籤，與 BeautifulSoup 一樣把前後的文字分成不同節點
+_HIDDEN_MARKER = '<!---->'
+
+_COMMENT_RE = re.compile(r'<!--.*?(?:-->|$)', re.S)
+_SKIPPED_RE = re.compile(r'<(script|style|template)\b[^>]*>.*?(?:</\1\s*>|$)', re.S | re.I)
+# 屬性值可能含有 >，以引號配對略過
+_ATTRS = r'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+_TAG_RE = re.compile(rf'''<[a-zA-Z/!?]{_ATTRS}>''')
+_DIV_TAG_RE = re.compile(rf'''<(/?)div\b{_ATTRS}>''', re.I)
+
+
+def _with_class(tag, name):
+    """開始標籤的 class 屬性含有指定類別（與 CSS 的 .name 相同，需完整比對類別名稱）"""
+    return (rf'''<{tag}\b{_ATTRS}?\bclass\s*=\s*["'](?:[^"']*\s)?{name}(?:\s[^"']*)?["']{_ATTRS}>''')
+
+
+_MAIN_CONTENT_RE = re.compile(rf'''<div\b{_ATTRS}?\bid\s*=\s*["']?main-content["'\s>]''', re.I)
+_META_VALUE_RE = re.compile(_with_class('span', 'article-meta-value') + r'(.*?)</span\s*>', re.S | re.I)
+_INDEX_ITEM_RE = re.compile(
+    rf'''(?P<sep>{_with_class('div', 'r-list-sep')})'''
+    rf'''|(?P<ent>{_with_class('div', 'r-ent')})'''
+    rf'''|{_with_class('div', 'nrec')}(?P<nrec>.*?)</div\s*>'''
+    rf'''|{_with_class('div', 'title')}\s*'''
+    rf'''<a\b{_ATTRS}?\bhref\s*=\s*["'](?P<href>[^"']*)["']{_ATTRS}>(?P<title>.*?)</a\s*>''',
+    re.S | re.I)
+_PAGING_RE = re.compile(_with_class('div', 'btn-group-paging') + r'(.*?)</div\s*>', re.S | re.I)
+_LINK_RE = re.compile(rf'''<a\b(?P<attrs>{_ATTRS})>(?P<text>.*?)</a\s*>''', re.S | re.I)
+_HREF_RE = re.compile(r'''\bhref\s*=\s*["']([^"']*)["']''', re.I)
+
+
+def decode(data, encoding=PTT_ENCODING):
+    """將回應的原始位元組解碼為文字，已是文字時直接使用
+
+    直接以已知編碼解碼，不經過 requests 的 response.text 編碼偵測。
+    與 HTML 規範的輸入前處理（以及 lxml）相同，CRLF 與單獨的 CR 一律換成 LF，
+    以 CRLF 換行的頁面在各解析器得到相同的文字。
+    """
+    text = data if isinstance(data, str) else data.decode(encoding, errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _collapse_blank(text):
+    """與 BeautifulSoup 相同：只含 ASCII 空白的文字節點換成單一換行或空格"""
+    if text and not text.strip(_ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+def _without_hidden(fragment):
+    """移除註解與 script/style 區塊，避免其中的文字被當成標籤或內文"""
+    return _SKIPPED_RE.sub(_HIDDEN_MARKER, _COMMENT_RE.sub(_HIDDEN_MARKER, fragment))
+
+
+def _strip_tags(fragment):
+    """移除標籤並還原實體，結果與 BeautifulSoup 的 .text 相同"""
+    return ''.join(_collapse_blank(html_lib.unescape(text)) for text in _TAG_RE.split(fragment))
+
+
+class SoupParser:
+    """以 BeautifulSoup html.parser 解析 PTT 頁面，速度最慢但最寬鬆，作為備援"""
+
+    name = 'bs4'
+
+    @staticmethod
+    def _nrec(entry):
+        node = entry.select_one('div.nrec') if entry else None
+        return node.text.strip() if node else ''
+
+    def parse_index(self, data):
+        """解析看板列表頁
+
+        推文數（nrec）為列表上顯示的文字，例如 ''、'12'、'爆' 或 'X1'。
+
+        Returns:
+            tuple: ((標題, 相對網址, 推文數) 列表, 置底文章開始的索引或 None, 上一頁相對網址或 None)
+        """
+        soup = BeautifulSoup(decode(data), 'html.parser')
+        links = []
+        pinned_from = None
+        for entry in soup.select('div.r-list-container > div'):
+            classes = entry.get('class', [])
+            if 'r-list-sep' in classes:
+                # 分隔線之後為置底文章
+                if pinned_from is None:
+                    pinned_from = len(links)
+            elif 'r-ent' in classes:
+                link = entry.select_one('div.title > a')
+                if link and link.get('href'):
+                    links.append((link.text.strip(), link['href'], self._nrec(entry)))
+        if not soup.select_one('div.r-list-container'):
+            links = [(link.text.strip(), link['href'], self._nrec(link.find_parent('div', class_='r-ent')))
+                     for link in soup.select('div.title > a') if link.get('href')]
+
+        prev_href = None
+        for button in soup.select('div.btn-group-paging a'):
+            if '上頁' in button.text and button.get('href'):
+                prev_href = button['href']
+        return links, pinned_from, prev_href
+
+    def parse_article(self, data):
+        """解析文章頁
+
+        Returns:
+            tuple: (作者, 發文時間, 主內容文字)，缺少的欄位為 None
+        """
+        soup = BeautifulSoup(decode(data), 'html.parser')
+        meta_values = soup.select('span.article-meta-value')
+        author = publish_time = None
+        if len(meta_values) >= 4:
+            author = meta_values[0].text.strip()
+            publish_time = meta_values[3].text.strip()
+        content_div = soup.select_one('div#main-content')
+        return author, publish_time, content_div.text.strip() if content_div else ''
+
+
+class FastParser:
+    """只擷取 PTT 已知版面所需欄位的正規表示式解析器
+
+    不建立文件樹，只以標籤配對找出列表連結、四個 article-meta-value 與
+    div#main-content 的文字，結果與 SoupParser 相同。
+    """
+
+    name = 'fast'
+
+    def parse_index(self, data):
+        """解析看板列表頁，回傳格式同 SoupParser.parse_index"""
+        text = _without_hidden(decode(data))
+        links = []
+        pinned_from = None
+        nrec = ''
+        for match in _INDEX_ITEM_RE.finditer(text):
+            if match.group('sep') is not None:
+                if pinned_from is None:
+                    pinned_from = len(links)
+                continue
+            if match.group('ent') is not None:
+                # 推文數只屬於同一個 r-ent
+                nrec = ''
+                continue
+            if match.group('nrec') is not None:
+                nrec = _strip_tags(match.group('nrec')).strip()
+                continue
+            links.append((_strip_tags(match.group('title')).strip(),
+                          html_lib.unescape(match.group('href')), nrec))
+
+        prev_href = None
+        paging = _PAGING_RE.search(text)
+        if paging:
+            for link in _LINK_RE.finditer(paging.group(1)):
+                href = _HREF_RE.search(link.group('attrs'))
+                if href and '上頁' in _strip_tags(link.group('text')):
+                    prev_href = html_lib.unescape(href.group(1))
+        return links, pinned_from, prev_href
+
+    def _main_content(self, text):
+        """以 div 起訖標籤的深度找出 div#main-content 的內部 HTML"""
+        found = _MAIN_CONTENT_RE.search(text)
+        start = _DIV_TAG_RE.match(text, found.start()) if found else None
+        if not start:
+            return None
+        depth = 1
+        for tag in _DIV_TAG_RE.finditer(text, start.end()):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                return text[start.end():tag.start()]
+        # 缺少結束標籤時延伸到文件結尾
+        return text[start.end():]
+
+    def parse_article(self, data):
+        """解析文章頁，回傳格式同 SoupParser.parse_article"""
+        text = _without_hidden(decode(data))
+        meta_values = [_strip_tags(value).strip() for value in _META_VALUE_RE.findall(text)]
+        author = publish_time = None
+        if len(meta_values) >= 4:
+            author = meta_values[0]
+            publish_time = meta_values[3]
+        inner = self._main_content(text)
+        return author, publish_time, _strip_tags(inner).strip() if inner is not None else ''
+
+
+class LxmlParser:
+    """以 lxml 的 C 解析器直接解析原始位元組（需另外安裝 lxml）"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        if lxml_html is None:
+            raise ImportError('未安裝 lxml')
+        self._parser = lxml_html.HTMLParser(encoding=PTT_ENCODING)
+
+    def _tree(self, data):
+        if isinstance(data, str):
+            data = data.encode(PTT_ENCODING)
+        return lxml_html.fromstring(data, parser=self._parser)
+
+    @staticmethod
+    def _has_class(name):
+        return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+    @staticmethod
+    def _text(element):
+        skipped = ' and '.join(f'not(parent::{tag})' for tag in _SKIPPED_TEXT_TAGS)
+        return ''.join(map(_collapse_blank, element.xpath(f'.//text()[{skipped}]')))
+
+    def _nrec(self, entry):
+        nodes = entry.xpath(f'.//div[{self._has_class("nrec")}]') if entry is not None else []
+        return self._text(nodes[0]).strip() if nodes else ''
+
+    def parse_index(self, data):
+        """解析看板列表頁，回傳格式同 SoupParser.parse_index"""
+        tree = self._tree(data)
+        links = []
+        pinned_from = None
+        entries = tree.xpath(f'//div[{self._has_class("r-list-container")}]/div')
+        for entry in entries:
+            classes = (entry.get('class') or '').split()
+            if 'r-list-sep' in classes:
+                if pinned_from is None:
+                    pinned_from = len(links)
+            elif 'r-ent' in classes:
+                for link in entry.xpath(f'.//div[{self._has_class("title")}]/a[@href]')[:1]:
+                    links.append((self._text(link).strip(), link.get('href'), self._nrec(entry)))
+        if not entries:
+            links = []
+            for link in tree.xpath(f'//div[{self._has_class("title")}]/a[@href]'):
+                parents = link.xpath(f'ancestor::div[{self._has_class("r-ent")}][1]')
+                links.append((self._text(link).strip(), link.get('href'),
+                              self._nrec(parents[0] if parents else None)))
+
+        prev_href = None
+        for button in tree.xpath(f'//div[{self._has_class("btn-group-paging")}]//a[@href]'):
+            if '上頁' in self._text(button):
+                prev_href = button.get('href')
+        return links, pinned_from, prev_href
+
+    def parse_article(self, data):
+        """解析文章頁，回傳格式同 SoupParser.parse_article"""
+        tree = self._tree(data)
+        meta_values = tree.xpath(f'//span[{self._has_class("article-meta-value")}]')
+        author = publish_time = None
+        if len(meta_values) >= 4:
+            author = self._text(meta_values[0]).strip()
+            publish_time = self._text(meta_values[3]).strip()
+        content_div = tree.xpath('//div[@id="main-content"]')
+        return author, publish_time, self._text(content_div[0]).strip() if content_div else ''
+
+
+PARSERS = {
+    'bs4': SoupParser,
+    'fast': FastParser,
+    'lxml': LxmlParser
+}
+
+
+def get_parser(name='auto'):
+    """取得 PTT 頁面解析器
+
+    Args:
+        name (str): 'auto'、'lxml'、'fast' 或 'bs4'；'auto' 在已安裝 lxml 時使用 lxml，否則使用 fast
+
+    Returns:
+        解析器實例
+    """
+    if name == 'auto':
+        name = 'lxml' if lxml_html is not None else 'fast'
+    if name not in PARSERS:
+        raise ValueError(f"不支援的解析器: {name}")
+    return PARSERS[name]()
+
+
+def available_parsers():
+    """目前環境可用的解析器名稱"""
+    return [name for name in PARSERS if name != 'lxml' or lxml_html is not None]
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import METRICS
+
+# 每次抓取希望取得的新文章數，約為 PTT 一個列表頁
+TARGET_NEW_PER_CRAWL = 20
+
+# 發文速率指數移動平均的權重，越大越快反映最近一次的觀察
+RATE_ALPHA = 0.3
+
+# 排程迴圈閒置時最長的等待秒數
+MAX_IDLE_WAIT = 60
+
+DEFAULT_BOARD_CONFIG = {
+    'pages': 3,
+    'interval': 600,
+    'min_interval': 120,
+    'max_interval': 3600
+}
+
+
+def load_board_config(path):
+    """讀取看板設定檔
+
+    設定檔為 JSON，可為看板列表，或含 defaults 與 boards 的物件，例如：
+    {"defaults": {"pages": 3}, "boards": [{"site": "ptt", "board": "Gossiping"}]}
+
+    Returns:
+        list: 套用預設值後的看板設定字典列表
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {'boards': config}
+
+    defaults = dict(DEFAULT_BOARD_CONFIG, **config.get('defaults', {}))
+    boards = []
+    for entry in config.get('boards', []):
+        board = dict(defaults, **entry)
+        board['site'] = board.get('site', 'ptt').lower()
+        if board['site'] not in ('ptt', 'dcard'):
+            raise ValueError(f"不支援的來源: {board['site']}")
+        boards.append(board)
+    return boards
+
+
+class BoardState:
+    """單一看板的排程狀態"""
+
+    def __init__(self, config, last_crawled_at=None):
+        self.site = config['site']
+        self.board = config['board']
+        self.pages = config['pages']
+        self.interval = config['interval']
+        self.min_interval = config['min_interval']
+        self.max_interval = config['max_interval']
+        self.last_crawled_at = last_crawled_at
+        self.rate = None
+
+    @property
+    def key(self):
+        return (self.site, self.board)
+
+    def observe(self, new_count, crawled_at):
+        """以本次抓到的新文章數更新發文速率，並依速率調整下次抓取的間隔
+
+        Returns:
+            float: 調整後的抓取間隔（秒）
+        """
+        if self.last_crawled_at is not None and crawled_at > self.last_crawled_at:
+            rate = new_count / (crawled_at - self.last_crawled_at)
+            self.rate = rate if self.rate is None else RATE_ALPHA * rate + (1 - RATE_ALPHA) * self.rate
+        self.last_crawled_at = crawled_at
+
+        if self.rate is not None:
+            interval = TARGET_NEW_PER_CRAWL / self.rate if self.rate > 0 else self.max_interval
+            self.interval = min(self.max_interval, max(self.min_interval, interval))
+        return self.interval
+
+
+class CrawlScheduler:
+    """長時間執行的多看板抓取排程器
+
+    以優先佇列依下次抓取時間排序各看板，依每個看板觀察到的發文速率調整抓取間隔：
+    熱門看板縮短間隔，冷門看板逐步拉長到 max_interval。
+    所有工作共用爬蟲的 HTTP session、抓取引擎與資料庫連線，同一看板不會同時執行兩次。
+    """
+
+    def __init__(self, crawler, boards, max_jobs=2, metrics_file=None):
+        """
+        Args:
+            crawler (PTTDcardCrawler): 共用的爬蟲
+            boards (list): load_board_config 回傳的看板設定
+            max_jobs (int): 同時執行的抓取工作數
+            metrics_file (str): 每次抓取後寫入 Prometheus 文字格式指標的路徑
+        """
+        self.crawler = crawler
+        self.max_jobs = max_jobs
+        self.metrics_file = metrics_file
+        self.stop_event = threading.Event()
+        self._queue = []
+        self._counter = itertools.count()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.states = {}
+
+        now = time.time()
+        for config in boards:
+            checkpoint = crawler.get_checkpoint(self._source(config['site'], config['board']))
+            last_crawled_at = checkpoint['last_crawled_at'] if checkpoint else None
+            state = BoardState(config, last_crawled_at)
+            if state.key in self.states:
+                continue
+            self.states[state.key] = state
+            # 重新啟動時，最近才抓過的看板等到原本的間隔到期再抓
+            due = last_crawled_at + state.interval if last_crawled_at else now
+            self._push(max(now, due), state)
+
+    @staticmethod
+    def _source(site, board):
+        return f"{'PTT' if site == 'ptt' else 'Dcard'}-{board}"
+
+    def _push(self, due, state):
+        with self._lock:
+            heapq.heappush(self._queue, (due, next(self._counter), state.key))
+        self._wakeup.set()
+
+    def _pop_due(self):
+        """取出已到期且未在執行中的看板，沒有時回傳 (None, 最近的到期時間)"""
+        with self._lock:
+            now = time.time()
+            while self._queue and self._queue[0][0] <= now:
+                due, _, key = heapq.heappop(self._queue)
+                if key in self._running:
+                    # 同一看板仍在執行，完成後會自行重新排入
+                    continue
+                self._running.add(key)
+                return self.states[key], None
+            return None, self._queue[0][0] if self._queue else None
+
+    def _crawl(self, state):
+        """執行單一看板的抓取並重新排入佇列"""
+        source = self._source(state.site, state.board)
+        start = time.perf_counter()
+        try:
+            print(f"開始抓取 {source}")
+            stats = self.crawler.crawl_to_db(
+                state.site, state.board, state.pages, incremental=(state.site == 'ptt'))
+            new_count = stats['new']
+            crawled_at = time.time()
+            if not self.stop_event.is_set():
+                self.crawler.mark_crawled(source, crawled_at)
+            interval = state.observe(new_count, crawled_at)
+            METRICS.inc('scheduler_jobs_total', source=source, result='ok')
+            print(f"{source} 新增 {new_count} 篇文章，{int(interval)} 秒後再次抓取")
+        except Exception as e:
+            interval = state.interval
+            METRICS.inc('scheduler_jobs_total', source=source, result='error')
+            print(f"排程抓取 {source} 時發生錯誤: {str(e)}")
+        finally:
+            METRICS.observe('scheduler_job_seconds', time.perf_counter() - start, source=source)
+            with self._lock:
+                self._running.discard(state.key)
+            self._write_metrics()
+        if not self.stop_event.is_set():
+            self._push(time.time() + interval, state)
+
+    def _write_metrics(self):
+        if not self.metrics_file:
+            return
+        try:
+            METRICS.write_prometheus(self.metrics_file)
+        except Exception as e:
+            print(f"寫入指標時發生錯誤: {str(e)}")
+
+    def run_forever(self):
+        """持續執行排程，直到收到 SIGINT/SIGTERM 或呼叫 stop()"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+
+        print(f"排程器啟動，共 {len(self.states)} 個看板")
+        self.crawler.open_session(self.stop_event)
+        executor = ThreadPoolExecutor(max_workers=self.max_jobs)
+        try:
+            while not self.stop_event.is_set():
+                # 先清除喚醒旗標再檢查佇列，檢查之後才完成的工作仍會喚醒下一次等待
+                self._wakeup.clear()
+                with self._lock:
+                    busy = len(self._running) >= self.max_jobs
+                state, next_due = (None, None) if busy else self._pop_due()
+                if state is not None:
+                    executor.submit(self._crawl, state)
+                    continue
+
+                timeout = MAX_IDLE_WAIT
+                if not busy and next_due is not None:
+                    timeout = min(timeout, max(0, next_due - time.time()))
+                # 有工作完成或新排入時提前醒來
+                self._wakeup.wait(timeout)
+        except KeyboardInterrupt:
+            self.stop()
+        finally:
+            print("排程器停止，等待進行中的抓取結束...")
+            executor.shutdown(wait=True)
+            self.crawler.close_session()
+
+    def stop(self):
+        """停止排程，進行中的抓取不再送出新請求"""
+        self.stop_event.set()
+        self._wakeup.set()
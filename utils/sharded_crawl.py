@@ -0,0 +1,334 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+
+import jieba
+
+from utils.metrics import METRICS
+from utils.parallel_counter import count_terms_per_article
+from utils.pipeline import (DEFAULT_BATCH_SIZE, FLUSH_INTERVAL, POLL_INTERVAL, QUEUE_BATCHES,
+                            interruptible_put)
+
+# 以 spawn 啟動子行程：不繼承父行程已開啟的 SQLite 連線、HTTP 連線池與背景執行緒
+_CONTEXT = multiprocessing.get_context('spawn')
+
+# 任務與寫入佇列的結束標記（跨行程傳遞，不能使用 object()）
+_STOP = None
+
+
+def parse_board_list(value, default_site='ptt'):
+    """解析以逗號分隔的看板清單
+
+    看板可加上來源前綴，例如 'Gossiping,Stock,dcard/funny'；未加前綴時使用 default_site。
+
+    Returns:
+        list: 不重複的 (來源, 看板) 元組列表，順序與輸入相同
+    """
+    boards = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        site, _, board = entry.rpartition('/')
+        site = (site or default_site).lower()
+        if site not in ('ptt', 'dcard'):
+            raise ValueError(f"不支援的來源: {site}")
+        if (site, board) not in boards:
+            boards.append((site, board))
+    return boards
+
+
+def _source(site, board):
+    return f"{'PTT' if site == 'ptt' else 'Dcard'}-{board}"
+
+
+def _ignore_interrupt():
+    """子行程忽略 Ctrl-C，改由協調行程透過取消事件通知停止，讓已送出的文章仍能寫入"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _tokenize_thread(crawler, pending, articles, results, cancel_event):
+    """抓取行程內的斷詞執行緒：計算詞頻與全文檢索斷詞後轉送到寫入行程
+
+    與抓取同時進行，斷詞不會阻塞抓取引擎送出下一個請求；
+    看板結束的訊息經由同一佇列依序轉送，寫入行程收到時該看板的文章都已送達。
+    """
+    # 行程啟動後立即載入 jieba 字典，與 over18 驗證及第一批請求的網路等待重疊
+    jieba.initialize()
+    fetched = {}
+    while True:
+        item = pending.get()
+        if item is _STOP:
+            return
+        if item[0] == 'articles':
+            _, source, batch = item
+            try:
+                with METRICS.timer('tokenize_seconds'):
+                    counts = count_terms_per_article([article['content'] for article in batch],
+                                                     workers=1)
+                METRICS.inc('tokenized_articles_total', len(batch))
+                for article, term_counts in zip(batch, counts):
+                    article['term_counts'] = term_counts
+                crawler.precompute_segments(batch)
+            except Exception as e:
+                # 未算出的斷詞結果留給寫入行程計算
+                print(f"預先計算詞頻時發生錯誤: {str(e)}")
+            if interruptible_put(articles, ('articles', batch), cancel_event):
+                fetched[source] = fetched.get(source, 0) + len(batch)
+        else:
+            _, source, completed, newest = item
+            if completed:
+                # 寫入行程提交此看板的文章後才記錄完成時間並推進檢查點
+                interruptible_put(articles, ('done', source, time.time(), newest), cancel_event)
+            results.put(('board', source, fetched.pop(source, 0), completed))
+
+
+def _worker_main(crawler_class, options, tasks, articles, results, cancel_event, batch_size,
+                 flush_interval, fetch_kwargs):
+    """抓取行程：依序從任務佇列取出看板抓取，斷詞後送到寫入行程
+
+    每個抓取行程有自己的爬蟲、HTTP session、over18 cookie 與禮貌預算；
+    資料庫連線只用於讀取（增量抓取的已知文章、Dcard 的 updatedAt），不寫入。
+    PTT 逐篇送出文章，與 ArticlePipeline 相同，每累積 batch_size 篇（或距上次送出超過
+    flush_interval 秒）才送出一批，佇列上限與寫入行程一樣以批數計算。
+    """
+    _ignore_interrupt()
+    crawler = crawler_class(**dict(options, init_schema=False))
+    pending_batches = queue.Queue(maxsize=QUEUE_BATCHES)
+    tokenizer = threading.Thread(target=_tokenize_thread,
+                                 args=(crawler, pending_batches, articles, results, cancel_event),
+                                 daemon=True)
+    tokenizer.start()
+    try:
+        crawler.open_session(cancel_event)
+        while not cancel_event.is_set():
+            task = tasks.get()
+            if task is _STOP:
+                break
+            site, board, pages = task
+            source = _source(site, board)
+            start = time.perf_counter()
+            pending = []
+            last_flush = time.monotonic()
+
+            def flush():
+                nonlocal pending, last_flush
+                if pending:
+                    interruptible_put(pending_batches, ('articles', source, pending), cancel_event)
+                    pending = []
+                last_flush = time.monotonic()
+
+            def on_articles(batch):
+                pending.extend(batch)
+                if len(pending) >= batch_size or time.monotonic() - last_flush >= flush_interval:
+                    flush()
+
+            crawler.fetch_articles(site, board, pages, cancel_event=cancel_event, collect=False,
+                                   on_articles=on_articles, **fetch_kwargs)
+            flush()
+            # 完整抓完的增量抓取留下的檢查點，交給寫入行程在文章保存後推進
+            newest = crawler.pending_checkpoints.pop(source, None)
+            interruptible_put(pending_batches, ('done', source, not cancel_event.is_set(), newest),
+                              cancel_event)
+            METRICS.observe('shard_board_seconds', time.perf_counter() - start, source=source)
+    except Exception as e:
+        print(f"抓取行程發生錯誤: {str(e)}")
+    finally:
+        pending_batches.put(_STOP)
+        tokenizer.join()
+        crawler.close()
+        results.put(('metrics', METRICS.snapshot()))
+        if cancel_event.is_set():
+            # 取消時寫入行程可能已結束，不等待佇列中的資料送出
+            articles.cancel_join_thread()
+
+
+def _writer_main(crawler_class, options, articles, results, batch_size, flush_interval):
+    """寫入行程：唯一寫入資料庫的行程，累積各抓取行程送來的文章後批次提交"""
+    _ignore_interrupt()
+    stats = {'fetched': 0, 'new': 0, 'updated': 0, 'duplicate': 0, 'near_duplicates': 0,
+             'errors': 0, 'batches': 0}
+    crawler = crawler_class(**dict(options, init_schema=False))
+    pending = []
+    finished = []
+    # 有文章寫入失敗的看板，完成時不推進檢查點，下次增量抓取會補抓
+    failed = set()
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal pending, last_flush
+        if pending:
+            try:
+                crawler.save_articles(pending)
+                saved = crawler.last_save_stats
+                for key in ('new', 'updated', 'duplicate', 'near_duplicates', 'errors'):
+                    stats[key] += saved.get(key, 0)
+                if saved.get('errors'):
+                    failed.update(article['source'] for article in pending)
+                # 抓取行程算好的詞頻寫入斷詞快取，之後重新計算詞頻時不必再斷詞
+                counted = [article for article in pending if article['term_counts'] is not None]
+                crawler.token_cache.put_many([article['content'] or '' for article in counted],
+                                             [article['term_counts'] for article in counted])
+                crawler.conn.commit()
+            except Exception as e:
+                stats['errors'] += len(pending)
+                failed.update(article['source'] for article in pending)
+                print(f"寫入文章時發生錯誤: {str(e)}")
+            stats['batches'] += 1
+            pending = []
+        for source, crawled_at, newest in finished:
+            crawler.mark_crawled(source, crawled_at)
+            if newest is not None and source not in failed:
+                crawler.advance_checkpoint(source, *newest)
+        finished.clear()
+        last_flush = time.monotonic()
+
+    try:
+        while True:
+            try:
+                item = articles.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not multiprocessing.parent_process().is_alive():
+                    # 協調行程已異常結束，寫入已收到的文章後結束
+                    break
+                if (pending or finished) and time.monotonic() - last_flush >= flush_interval:
+                    flush()
+                continue
+            if item is _STOP:
+                break
+            if item[0] == 'articles':
+                pending.extend(item[1])
+                stats['fetched'] += len(item[1])
+            elif item[0] == 'done':
+                finished.append(item[1:])
+            if len(pending) >= batch_size or time.monotonic() - last_flush >= flush_interval:
+                flush()
+        flush()
+    except Exception as e:
+        print(f"寫入行程發生錯誤: {str(e)}")
+    finally:
+        crawler.close()
+        results.put(('writer', stats, METRICS.snapshot()))
+
+
+class ShardedCrawl:
+    """以多個行程同時抓取多個看板，單一寫入行程批次提交
+
+    協調行程把看板放入任務佇列，各抓取行程抓完一個看板再取下一個，
+    發文多、頁數多的看板不會讓其他行程閒置。抓取行程在自己的行程內解析與斷詞，
+    只有寫入行程持有資料庫的寫入連線，每 batch_size 篇（或距上次提交超過 FLUSH_INTERVAL 秒）
+    提交一次，不會發生多個連線競爭寫入鎖的 "database is locked"。
+    各行程間的佇列有上限，寫入跟不上時抓取會暫停等待。
+    """
+
+    def __init__(self, crawler_class, options, workers=2, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        """
+        Args:
+            crawler_class (type): 爬蟲類別，在每個子行程以 options 建立
+            options (dict): 建立爬蟲的參數，禮貌預算應已依行程數分配
+            workers (int): 抓取行程數
+            batch_size (int): 每批寫入的文章數
+            flush_interval (float): 批次未滿時最長的累積秒數
+        """
+        self.crawler_class = crawler_class
+        self.options = options
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cancel_event = _CONTEXT.Event()
+        self.stats = {}
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == 'board':
+            _, source, fetched, completed = message
+            self.stats['boards'][source] = fetched
+            if completed:
+                print(f"{source} 抓取完成，共 {fetched} 篇")
+            else:
+                print(f"{source} 已取消，已送出 {fetched} 篇")
+        elif kind == 'metrics':
+            METRICS.merge(message[1])
+        elif kind == 'writer':
+            self.stats.update(message[1])
+            METRICS.merge(message[2])
+
+    def _collect(self, results, timeout=POLL_INTERVAL):
+        try:
+            self._handle(results.get(timeout=timeout))
+            while True:
+                self._handle(results.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _wait(self, processes, results, writer):
+        """等待行程結束並處理回報；寫入行程異常結束時取消抓取"""
+        while any(process.is_alive() for process in processes):
+            try:
+                self._collect(results)
+            except KeyboardInterrupt:
+                if not self.cancel_event.is_set():
+                    print("收到中斷，停止抓取並等待已抓到的文章寫入...")
+                    self.cancel_event.set()
+            if writer is not None and not writer.is_alive():
+                self.cancel_event.set()
+
+    def run(self, boards, pages=1, **fetch_kwargs):
+        """抓取多個看板並寫入資料庫
+
+        Args:
+            boards (list): (來源, 看板) 元組列表，見 parse_board_list
+            pages (int): 每個看板的頁數
+            **fetch_kwargs: 傳給 fetch_articles 的其他參數（mode、incremental、refresh 等）
+
+        Returns:
+            dict: fetched、new、updated、duplicate、near_duplicates、errors、batches、seconds，
+                以及 boards（各看板送出的文章數）
+        """
+        start = time.perf_counter()
+        self.stats = {'fetched': 0, 'new': 0, 'updated': 0, 'duplicate': 0, 'near_duplicates': 0,
+                      'errors': 0, 'batches': 0, 'boards': {}}
+        # 在協調行程建立資料表並升級結構一次，子行程開啟資料庫時略過
+        self.crawler_class(**self.options).close()
+        tasks = _CONTEXT.Queue()
+        for site, board in boards:
+            tasks.put((site, board, pages))
+        worker_count = min(self.workers, len(boards))
+        for _ in range(worker_count):
+            tasks.put(_STOP)
+        # 抓取行程送出的是整批文章，佇列上限以批數計算
+        articles = _CONTEXT.Queue(maxsize=QUEUE_BATCHES)
+        results = _CONTEXT.Queue()
+
+        writer = _CONTEXT.Process(
+            target=_writer_main, name='crawl-writer',
+            args=(self.crawler_class, self.options, articles, results, self.batch_size,
+                  self.flush_interval))
+        writer.start()
+        workers = [
+            _CONTEXT.Process(
+                target=_worker_main, name=f'crawl-worker-{i}',
+                args=(self.crawler_class, self.options, tasks, articles, results,
+                      self.cancel_event, self.batch_size, self.flush_interval, fetch_kwargs))
+            for i in range(worker_count)
+        ]
+        for worker in workers:
+            worker.start()
+
+        self._wait(workers, results, writer)
+        while writer.is_alive():
+            try:
+                articles.put(_STOP, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                self._collect(results, timeout=0)
+        self._wait([writer], results, None)
+        self._collect(results, timeout=0)
+        for process in workers + [writer]:
+            process.join()
+
+        self.stats['seconds'] = round(time.perf_counter() - start, 3)
+        return self.stats
@@ -0,0 +1,88 @@
+import heapq
+import math
+
+# 串流模式預設的相對誤差：估計值最多高估總詞數 × DEFAULT_EPSILON
+DEFAULT_EPSILON = 1e-4
+
+
+class SpaceSaving:
+    """Space-Saving top-k 摘要
+
+    最多只保留 capacity 個詞，每個詞的計數最多高估 total / capacity。
+    不同詞數未超過 capacity 時不會淘汰任何詞，結果與精確計數相同。
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): 保留的詞數上限
+        """
+        if capacity < 1:
+            raise ValueError("capacity 必須大於 0")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = None
+
+    @classmethod
+    def from_error(cls, epsilon=DEFAULT_EPSILON):
+        """依允許的相對誤差建立摘要，capacity = ceil(1 / epsilon)"""
+        return cls(math.ceil(1 / epsilon))
+
+    @property
+    def error_bound(self):
+        """任一詞計數的最大高估量"""
+        return self.total / self.capacity if len(self.counts) >= self.capacity else 0
+
+    def _pop_min(self):
+        """取出目前計數最小的詞，堆積中過期的項目會在浮到頂端時更新"""
+        heap = self._heap
+        while True:
+            count, item = heap[0]
+            current = self.counts.get(item)
+            if current == count:
+                return count, item
+            if current is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (current, item))
+
+    def add(self, item, count=1):
+        """累加一個詞的出現次數"""
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            if self._heap is not None:
+                heapq.heappush(self._heap, (count, item))
+            return
+
+        if self._heap is None:
+            self._heap = [(value, key) for key, value in counts.items()]
+            heapq.heapify(self._heap)
+        min_count, victim = self._pop_min()
+        del counts[victim]
+        del self.errors[victim]
+        counts[item] = min_count + count
+        self.errors[item] = min_count
+        heapq.heapreplace(self._heap, (min_count + count, item))
+
+    def update(self, counts):
+        """累加 {詞: 次數} 字典"""
+        for item, count in counts.items():
+            self.add(item, count)
+
+    def top(self, n=None):
+        """回傳計數最高的詞
+
+        Returns:
+            list: 包含 (詞, 估計次數) 元組的列表
+        """
+        if n is None:
+            return sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=lambda entry: entry[1])
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import sys
+import time
+from array import array
+
+import jieba
+
+import utils.parallel_counter
+from utils.metrics import METRICS
+
+# 每次淘汰時額外清出的比例，避免每次寫入都觸發淘汰
+EVICTION_SLACK = 0.1
+
+# 命中時只在上次使用時間早於此秒數時更新 last_used，淘汰只需要以天為單位的新舊順序
+LAST_USED_RESOLUTION = 86400
+
+
+def tokenizer_version():
+    """回傳斷詞器版本識別字串
+
+    包含 jieba 版本、主字典檔與 utils.parallel_counter（詞頻的計算規則）的檔案資訊，
+    任一項改變時快取鍵隨之改變，舊結果不再命中。
+    """
+    parts = [jieba.__version__]
+    default_dict = os.path.join(os.path.dirname(jieba.__file__), jieba.DEFAULT_DICT_NAME)
+    paths = [jieba.dt.dictionary or default_dict,
+             utils.parallel_counter.__file__]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f'{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}')
+        except (OSError, TypeError):
+            parts.append(str(path))
+    return '|'.join(parts)
+
+
+class TokenCache:
+    """以內容雜湊為鍵的斷詞結果快取
+
+    詞頻以 (詞彙 id, 次數) 的整數陣列存放在 SQLite，詞彙 id 與 terms 資料表共用，
+    超過 max_entries 時淘汰最久未使用的項目。
+
+    get_many 與 put_many 不提交交易，由呼叫端與其他寫入一併提交。
+    """
+
+    def __init__(self, conn, max_entries=200000, version=None):
+        """
+        Args:
+            conn (sqlite3.Connection): 資料庫連線
+            max_entries (int): 快取項目數上限
+            version (str): 斷詞器版本，預設由 tokenizer_version() 產生
+        """
+        self.conn = conn
+        self.max_entries = max_entries
+        self.version = version or tokenizer_version()
+        self.hits = 0
+        self.misses = 0
+        self._term_ids = {}
+        self._terms = {}
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS token_cache (
+                key BLOB PRIMARY KEY,
+                terms BLOB NOT NULL,
+                last_used INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_token_cache_last_used ON token_cache(last_used)')
+        self.conn.commit()
+        self._size = cursor.execute('SELECT COUNT(*) FROM token_cache').fetchone()[0]
+
+    def key(self, content):
+        """計算內容的快取鍵"""
+        digest = hashlib.sha1(self.version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((content or '').encode('utf-8'))
+        return digest.digest()
+
+    def _encode(self, counts):
+        term_ids = self.term_ids(counts)
+        packed = array('I')
+        for term, count in counts.items():
+            packed.append(term_ids[term])
+            packed.append(count)
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        return packed.tobytes()
+
+    def _decode(self, blob):
+        packed = array('I')
+        packed.frombytes(blob)
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        ids = packed[0::2]
+        terms = self._get_terms(ids)
+        return {terms[term_id]: count for term_id, count in zip(ids, packed[1::2])}
+
+    def term_ids(self, terms):
+        """取得詞彙在 terms 資料表中的 id，不存在的詞彙會先新增（不提交交易）
+
+        爬蟲寫入文章詞頻時也經由此方法取得 id，兩者共用同一份記憶體中的對照表。
+
+        Returns:
+            dict: 詞對應 id 的字典
+        """
+        missing = list({term for term in terms if term not in self._term_ids})
+        if missing:
+            cursor = self.conn.cursor()
+            cursor.executemany('INSERT OR IGNORE INTO terms (term) VALUES (?)',
+                               [(term,) for term in missing])
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for term, term_id in cursor.execute(
+                        f'SELECT term, id FROM terms WHERE term IN ({placeholders})', chunk):
+                    self._term_ids[term] = term_id
+                    self._terms[term_id] = term
+        return {term: self._term_ids[term] for term in terms}
+
+    def _get_terms(self, term_ids):
+        missing = list({term_id for term_id in term_ids if term_id not in self._terms})
+        cursor = self.conn.cursor()
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for term_id, term in cursor.execute(
+                    f'SELECT id, term FROM terms WHERE id IN ({placeholders})', chunk):
+                self._terms[term_id] = term
+                self._term_ids[term] = term_id
+        return self._terms
+
+    def get_many(self, contents):
+        """查詢多篇內容的斷詞結果
+
+        Returns:
+            list: 與輸入順序相同，命中時為 {詞: 次數} 字典，未命中時為 None
+        """
+        keys = [self.key(content) for content in contents]
+        found = {}
+        stale = []
+        now = int(time.time())
+        cursor = self.conn.cursor()
+        unique_keys = list(set(keys))
+        for i in range(0, len(unique_keys), 500):
+            chunk = unique_keys[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, blob, last_used in cursor.execute(
+                    f'SELECT key, terms, last_used FROM token_cache WHERE key IN ({placeholders})',
+                    chunk):
+                found[key] = self._decode(blob)
+                if now - last_used >= LAST_USED_RESOLUTION:
+                    stale.append(key)
+
+        if stale:
+            cursor.executemany('UPDATE token_cache SET last_used = ? WHERE key = ?',
+                               [(now, key) for key in stale])
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        METRICS.inc('token_cache_hits_total', hits)
+        METRICS.inc('token_cache_misses_total', len(results) - hits)
+        return results
+
+    def put_many(self, contents, counts_list):
+        """寫入多篇內容的斷詞結果，必要時淘汰最久未使用的項目（不提交交易）"""
+        if not contents:
+            return
+        now = int(time.time())
+        rows = {self.key(content): self._encode(counts)
+                for content, counts in zip(contents, counts_list)}
+        cursor = self.conn.cursor()
+        before = self.conn.total_changes
+        cursor.executemany(
+            'INSERT OR IGNORE INTO token_cache (key, terms, last_used) VALUES (?, ?, ?)',
+            [(key, blob, now) for key, blob in rows.items()])
+        self._size += self.conn.total_changes - before
+
+        if self._size > self.max_entries:
+            # 呼叫端回滾過交易時計數可能偏高，淘汰前重新計算
+            self._size = cursor.execute('SELECT COUNT(*) FROM token_cache').fetchone()[0]
+        if self._size > self.max_entries:
+            excess = self._size - int(self.max_entries * (1 - EVICTION_SLACK))
+            cursor.execute('''
+                DELETE FROM token_cache WHERE key IN (
+                    SELECT key FROM token_cache ORDER BY last_used LIMIT ?
+                )
+            ''', (excess,))
+            self._size -= cursor.rowcount
+
+    def invalidate(self):
+        """捨棄記憶體中的詞彙 id 對照表，下次使用時由資料庫重新讀取
+
+        新增詞彙的交易回滾後，對照表可能含有未寫入的 id，之後 SQLite 可能把同一個 id
+        分配給其他詞彙；呼叫端回滾交易後必須呼叫。
+        """
+        self._term_ids.clear()
+        self._terms.clear()
+
+    def clear(self):
+        """清空快取"""
+        self.conn.execute('DELETE FROM token_cache')
+        self.conn.commit()
+        self._size = 0
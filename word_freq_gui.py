@@ -1,19 +1,31 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-from ptt_dcard_crawler import PTTDcardCrawler
-from utils.word_counter import count_keywords, get_word_frequency_stats
+import queue
+import threading
+import time
+from ptt_dcard_crawler import PTTDcardCrawler, source_label, window_start_day
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.font_manager as fm
-import os
+from matplotlib.figure import Figure
 
 # 設定中文字體
 plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'Microsoft JhengHei', 'SimHei', 'sans-serif']
 plt.rcParams['axes.unicode_minus'] = False  # 用來正常顯示負號
 
+# 主執行緒檢查背景工作佇列的間隔（毫秒）
+POLL_INTERVAL_MS = 200
+
+# 每累積幾篇文章保存並更新一次中間結果
+PROGRESS_BATCH = 10
+
+# 本機資料在多少分鐘內視為最新，不重新抓取
+DEFAULT_FRESHNESS_MINUTES = 10
+
+# 顯示的熱門關鍵詞數
+TOP_N = 10
+
 class WordFreqAnalyzerGUI:
-    def __init__(self, root):
+    def __init__(self, root, freshness_minutes=DEFAULT_FRESHNESS_MINUTES):
         self.root = root
         self.root.title("PTT/Dcard 詞頻分析器")
         self.root.geometry("800x600")
@@ -21,6 +33,19 @@ class WordFreqAnalyzerGUI:
         # 初始化爬蟲
         self.crawler = PTTDcardCrawler()
         
+        # 背景分析的狀態：工作執行緒經由 events 佇列回報，主執行緒以 after() 輪詢
+        self.events = queue.Queue()
+        self.worker = None
+        self.cancel_event = None
+        self.run_id = 0
+        self.running = False
+        self.latest_stats = None
+        
+        # 詞頻結果快取：(來源, 看板, 天數) 對應 (統計結果, 計算時間)，
+        # 該看板在計算之後又有新抓取的資料時失效
+        self.result_cache = {}
+        self.freshness_var = tk.StringVar(value=str(freshness_minutes))
+        
         # 建立主框架
         self.main_frame = ttk.Frame(root, padding="10")
         self.main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -36,6 +61,8 @@ class WordFreqAnalyzerGUI:
         root.rowconfigure(0, weight=1)
         self.main_frame.columnconfigure(1, weight=1)
         self.main_frame.rowconfigure(1, weight=1)
+        
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_control_panel(self):
         """建立控制面板"""
@@ -60,9 +87,31 @@ class WordFreqAnalyzerGUI:
         self.pages_spinbox = ttk.Spinbox(control_frame, from_=1, to=10, textvariable=self.pages_var, width=5)
         self.pages_spinbox.grid(row=2, column=1, sticky=tk.W, padx=5)
         
+        # 時間窗與資料新鮮度
+        ttk.Label(control_frame, text="最近天數:").grid(row=3, column=0, padx=5, pady=5)
+        self.days_var = tk.StringVar(value="0")
+        self.days_spinbox = ttk.Spinbox(control_frame, from_=0, to=365, textvariable=self.days_var, width=5)
+        self.days_spinbox.grid(row=3, column=1, sticky=tk.W, padx=5)
+        ttk.Label(control_frame, text="(0 為全部)").grid(row=3, column=2, sticky=tk.W)
+        
+        ttk.Label(control_frame, text="更新間隔(分):").grid(row=4, column=0, padx=5, pady=5)
+        self.freshness_spinbox = ttk.Spinbox(control_frame, from_=0, to=1440,
+                                             textvariable=self.freshness_var, width=5)
+        self.freshness_spinbox.grid(row=4, column=1, sticky=tk.W, padx=5)
+        
+        # 轉錄與複製貼上的文章只計算一次
+        self.exclude_duplicates_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="排除近似重複文章",
+                        variable=self.exclude_duplicates_var).grid(row=5, column=0, columnspan=3,
+                                                                   sticky=tk.W, padx=5, pady=5)
+        
         # 分析按鈕
         self.analyze_btn = ttk.Button(control_frame, text="分析", command=self.analyze)
         self.analyze_btn.grid(row=2, column=2, padx=5)
+        
+        # 取消按鈕
+        self.cancel_btn = ttk.Button(control_frame, text="取消", command=self.cancel, state=tk.DISABLED)
+        self.cancel_btn.grid(row=2, column=3, padx=5)
     
     def create_result_panel(self):
         """建立結果顯示面板"""
@@ -84,6 +133,12 @@ class WordFreqAnalyzerGUI:
         self.chart_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.chart_frame, text="圖表")
         
+        # 圖表只建立一次，之後每次更新重畫同一個座標軸
+        self.figure = Figure(figsize=(8, 4))
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
+        self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
         # 設定網格權重
         result_frame.columnconfigure(0, weight=1)
         result_frame.rowconfigure(0, weight=1)
@@ -93,67 +148,205 @@ class WordFreqAnalyzerGUI:
         self.chart_frame.rowconfigure(0, weight=1)
     
     def analyze(self):
-        """執行分析"""
+        """先以本機資料庫回答，資料過期時才在背景執行緒抓取新文章"""
+        if self.running:
+            return
+        if self.worker is not None and self.worker.is_alive():
+            # 已取消的抓取仍在等待進行中的請求結束，避免兩個執行緒同時使用資料庫連線
+            messagebox.showinfo("提示", "上一次的抓取正在停止，請稍候再試")
+            return
+        
+        # 獲取參數
+        source = self.source_var.get()
+        board = self.board_var.get()
         try:
-            # 清空結果
-            self.result_text.delete(1.0, tk.END)
-            
-            # 獲取參數
-            source = self.source_var.get()
-            board = self.board_var.get()
             pages = int(self.pages_var.get())
+            days = int(self.days_var.get())
+            freshness = float(self.freshness_var.get()) * 60
+        except ValueError:
+            messagebox.showerror("錯誤", "頁數、天數與更新間隔必須是數字")
+            return
+        exclude_duplicates = self.exclude_duplicates_var.get()
+        
+        # 清空結果並顯示進度
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, f"正在分析 {source} {board} 板的文章...\n")
+        self.latest_stats = None
+        
+        self.run_id += 1
+        self.running = True
+        self.cancel_event = threading.Event()
+        self.analyze_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        
+        self.worker = threading.Thread(
+            target=self._run_analysis,
+            args=(self.run_id, source, board, pages, days, exclude_duplicates, freshness,
+                  self.cancel_event),
+            daemon=True
+        )
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_events, self.run_id)
+    
+    def cancel(self):
+        """取消目前的分析，保留已顯示的中間結果"""
+        if not self.running:
+            return
+        self.cancel_event.set()
+        self._finish_run()
+        if self.latest_stats:
+            self.show_stats(self.latest_stats, "已取消，以下為取消前的結果")
+        else:
+            self.result_text.insert(tk.END, "已取消\n")
+    
+    def on_close(self):
+        """關閉視窗時一併停止背景抓取"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.root.destroy()
+    
+    def _run_analysis(self, run_id, site, board, pages, days, exclude_duplicates, freshness,
+                      cancel_event):
+        """背景執行緒：讀取本機統計，資料過期時增量抓取並逐批保存，進度放入 events 佇列"""
+        try:
+            source = source_label(site, board)
+            checkpoint = self.crawler.get_checkpoint(source)
+            crawled_at = checkpoint['last_crawled_at'] if checkpoint else None
+            stats = self._local_stats(site, board, days, exclude_duplicates, crawled_at)
             
-            # 顯示進度
-            self.result_text.insert(tk.END, f"正在分析 {source} {board} 板的文章...\n")
-            self.root.update()
-            
-            # 獲取文章
-            articles = self.crawler.fetch_articles(source=source, board=board, pages=pages)
-            
-            if not articles:
-                messagebox.showwarning("警告", "沒有找到任何文章")
+            if crawled_at is not None and time.time() - crawled_at < freshness:
+                minutes = int((time.time() - crawled_at) // 60)
+                self.events.put((run_id, 'done', dict(stats, status=f"本機資料（{minutes} 分鐘前更新）")))
                 return
             
-            # 合併所有文章內容
-            all_text = " ".join(article['content'] for article in articles)
+            if stats['articles']:
+                self.events.put((run_id, 'progress', dict(stats, status="本機資料，正在抓取新文章...")))
             
-            # 分析詞頻
-            stats = get_word_frequency_stats(all_text)
+            pending = []
+            save_errors = 0
             
-            # 顯示結果
-            self.result_text.insert(tk.END, f"\n總字數: {stats['total_words']}\n")
-            self.result_text.insert(tk.END, f"不重複詞數: {stats['unique_words']}\n\n")
-            self.result_text.insert(tk.END, "熱門關鍵詞:\n")
+            def flush():
+                nonlocal save_errors
+                if not pending:
+                    return
+                # 取消時仍保存已抓到的文章，檢查點只在完整抓完後推進，不會略過未保存的文章
+                self.crawler.save_articles(pending)
+                save_errors += self.crawler.last_save_stats.get('errors', 0)
+                pending.clear()
+                if cancel_event.is_set():
+                    return
+                progress = self._local_stats(site, board, days, exclude_duplicates)
+                self.events.put((run_id, 'progress', dict(progress, status="正在抓取新文章...")))
             
-            for word, freq in stats['top_keywords']:
-                self.result_text.insert(tk.END, f"{word}: {freq}\n")
+            def on_articles(articles):
+                pending.extend(articles)
+                if len(pending) >= PROGRESS_BATCH:
+                    flush()
             
-            # 繪製圖表
-            self.plot_word_frequency(stats['top_keywords'])
+            articles = self.crawler.fetch_articles(
+                source=site, board=board, pages=pages, incremental=True,
+                on_articles=on_articles, cancel_event=cancel_event
+            )
+            flush()
+            if save_errors:
+                self.crawler.pending_checkpoints.pop(source, None)
+            else:
+                self.crawler.commit_checkpoint(source)
+            if not cancel_event.is_set():
+                self.crawler.mark_crawled(source)
             
+            stats = self._local_stats(site, board, days, exclude_duplicates)
+            self.events.put((run_id, 'done', dict(stats, status=f"分析完成，新抓取 {len(articles)} 篇文章")))
         except Exception as e:
-            messagebox.showerror("錯誤", f"分析時發生錯誤: {str(e)}")
+            self.events.put((run_id, 'error', str(e)))
+    
+    def _local_stats(self, site, board, days, exclude_duplicates=False, crawled_at=None):
+        """由資料庫計算詞頻統計，快取在該看板下次抓取前有效
+        
+        快取鍵包含統計範圍的第一天，「最近 N 天」的範圍跨日移動後不會沿用舊結果。
+        
+        Args:
+            exclude_duplicates (bool): 是否排除近似重複的文章
+            crawled_at (int): 該看板最後抓取時間，None 表示不使用快取
+        """
+        key = (site, board, window_start_day(days) if days else None, exclude_duplicates)
+        cached = self.result_cache.get(key)
+        if cached and crawled_at is not None and cached[1] >= crawled_at:
+            return cached[0]
+        
+        computed_at = time.time()
+        stats = self.crawler.get_word_frequency_stats(source_label(site, board), days or None, TOP_N,
+                                                      exclude_duplicates=exclude_duplicates)
+        self.result_cache[key] = (stats, computed_at)
+        return stats
+    
+    def _poll_events(self, run_id):
+        """主執行緒：取出背景工作的進度，每次輪詢只重畫最新的一份結果"""
+        if run_id != self.run_id or not self.running:
+            return
+        
+        latest = None
+        finished = None
+        try:
+            while True:
+                event_run_id, kind, payload = self.events.get_nowait()
+                if event_run_id != run_id:
+                    continue
+                if kind == 'progress':
+                    latest = payload
+                else:
+                    finished = (kind, payload)
+        except queue.Empty:
+            pass
+        
+        if finished is None:
+            if latest is not None:
+                self.latest_stats = latest
+                self.show_stats(latest, latest['status'])
+            self.root.after(POLL_INTERVAL_MS, self._poll_events, run_id)
+            return
+        
+        self._finish_run()
+        kind, payload = finished
+        if kind == 'error':
+            messagebox.showerror("錯誤", f"分析時發生錯誤: {payload}")
+        elif not payload['articles']:
+            messagebox.showwarning("警告", "沒有找到任何文章")
+        else:
+            self.show_stats(payload, payload['status'])
+    
+    def _finish_run(self):
+        self.running = False
+        self.analyze_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+    
+    def show_stats(self, stats, status):
+        """顯示詞頻結果並更新圖表"""
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, f"{status}\n")
+        self.result_text.insert(tk.END, f"文章數: {stats['articles']}\n")
+        self.result_text.insert(tk.END, f"\n總字數: {stats['total_words']}\n")
+        self.result_text.insert(tk.END, f"不重複詞數: {stats['unique_words']}\n\n")
+        self.result_text.insert(tk.END, "熱門關鍵詞:\n")
+        
+        for word, freq in stats['top_keywords']:
+            self.result_text.insert(tk.END, f"{word}: {freq}\n")
+        
+        # 繪製圖表
+        self.plot_word_frequency(stats['top_keywords'])
     
     def plot_word_frequency(self, word_freq):
         """繪製詞頻圖表"""
-        # 清除舊圖表
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-        
         # 準備數據
         words = [item[0] for item in word_freq]
         freqs = [item[1] for item in word_freq]
         
-        # 建立圖表
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.barh(words, freqs)
-        ax.set_xlabel('頻率')
-        ax.set_title('熱門關鍵詞頻率分布')
-        
-        # 將圖表加入GUI
-        canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # 重畫既有的座標軸
+        self.ax.clear()
+        self.ax.barh(words, freqs)
+        self.ax.set_xlabel('頻率')
+        self.ax.set_title('熱門關鍵詞頻率分布')
+        self.canvas.draw_idle()
 
 def main():
     root = tk.Tk()